@@ -0,0 +1,27 @@
+"""Order list keyset index
+
+Revision ID: a1f3c9d2e4b7
+Revises: 5c50fc6bc3de
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1f3c9d2e4b7'
+down_revision: Union[str, Sequence[str], None] = '5c50fc6bc3de'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_service_orders_created_at_id', 'service_orders', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_service_orders_created_at_id', table_name='service_orders')
@@ -0,0 +1,103 @@
+"""Trigram search indexes (pg_trgm; FTS5 on SQLite)
+
+Revision ID: a7d3e9f2b6c4
+Revises: f1c6a8e3d5b2
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e9f2b6c4'
+down_revision: Union[str, Sequence[str], None] = 'f1c6a8e3d5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, column) - one GIN trigram index per searched column
+TRGM_INDEXES = [
+    ('ix_service_orders_title_trgm', 'service_orders', 'title'),
+    ('ix_service_orders_description_trgm', 'service_orders', 'description'),
+    ('ix_service_orders_relatorio_tecnico_trgm', 'service_orders', 'relatorio_tecnico'),
+    ('ix_clients_name_trgm', 'clients', 'name'),
+    ('ix_clients_document_trgm', 'clients', 'document'),
+    ('ix_equipments_name_trgm', 'equipments', 'name'),
+    ('ix_equipments_serial_number_trgm', 'equipments', 'serial_number'),
+]
+
+# SQLite: FTS5 trigram table kept in sync by triggers; rowid = id * 4 + kind.
+# (table, kind, titulo, subtitulo, conteudo) - frozen copy of busca.SQLITE_SOURCES
+SQLITE_SOURCES = [
+    ('service_orders', 1, 'title', 'description', 'relatorio_tecnico'),
+    ('clients', 2, 'name', 'document', None),
+    ('equipments', 3, 'name', 'serial_number', None),
+]
+
+
+def _sqlite_values(row, kind, title, subtitle, content):
+    return f"{row}.id * 4 + {kind}, {row}.{title}, {row}.{subtitle}, {row + '.' + content if content else 'NULL'}"
+
+
+def _create_sqlite_search_index(bind):
+    # init_db may have created it already; the backfill below must run only once
+    exists = bind.execute(sa.text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+    )).first()
+    if exists:
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "titulo, subtitulo, conteudo, tokenize = 'trigram')"
+    )
+    columns = 'search_index(rowid, titulo, subtitulo, conteudo)'
+    for table, kind, *fields in SQLITE_SOURCES:
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS search_index_{table}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {columns} VALUES ({_sqlite_values('new', kind, *fields)}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS search_index_{table}_au AFTER UPDATE ON {table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 4 + {kind}; "
+            f"INSERT INTO {columns} VALUES ({_sqlite_values('new', kind, *fields)}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS search_index_{table}_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 4 + {kind}; END"
+        )
+        op.execute(f"INSERT INTO {columns} SELECT {_sqlite_values(table, kind, *fields)} FROM {table}")
+
+
+def _drop_sqlite_search_index():
+    for table, *_ in SQLITE_SOURCES:
+        for suffix in ('ai', 'au', 'ad'):
+            op.execute(f"DROP TRIGGER IF EXISTS search_index_{table}_{suffix}")
+    op.execute("DROP TABLE IF EXISTS search_index")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        _create_sqlite_search_index(bind)
+        return
+    if bind.dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRGM_INDEXES:
+        op.create_index(name, table, [column], unique=False,
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        _drop_sqlite_search_index()
+        return
+    if bind.dialect.name != 'postgresql':
+        return
+    for name, table, _ in TRGM_INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,55 @@
+"""Stat counters for dashboards
+
+Revision ID: b3f8d1c5e7a2
+Revises: a7d3e9f2b6c4
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f8d1c5e7a2'
+down_revision: Union[str, Sequence[str], None] = 'a7d3e9f2b6c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ORDER_STATUSES = [
+    'aberto', 'pendente', 'orcamento', 'aprovado', 'agendado',
+    'em_andamento', 'concluido', 'finalizado', 'faturado', 'cancelado'
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stat_counters',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # Seed from the current tables
+    op.execute("""
+        INSERT INTO stat_counters (name, value, updated_at)
+        SELECT 'orders:total', COUNT(*), CURRENT_TIMESTAMP FROM service_orders
+        UNION ALL SELECT 'clients:total', COUNT(*), CURRENT_TIMESTAMP FROM clients
+        UNION ALL SELECT 'users:total', COUNT(*), CURRENT_TIMESTAMP FROM users
+        UNION ALL SELECT 'orders:status:' || status, COUNT(*), CURRENT_TIMESTAMP
+            FROM service_orders WHERE status IS NOT NULL GROUP BY status
+    """)
+    # Zero rows for known statuses, so the first order in one of them is counted
+    # (frozen copy of counter_utils.ORDER_STATUSES)
+    for status in ORDER_STATUSES:
+        op.execute(sa.text(
+            "INSERT INTO stat_counters (name, value, updated_at) "
+            "SELECT :name, 0, CURRENT_TIMESTAMP "
+            "WHERE NOT EXISTS (SELECT 1 FROM stat_counters WHERE name = :name)"
+        ).bindparams(name=f"orders:status:{status}"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stat_counters')
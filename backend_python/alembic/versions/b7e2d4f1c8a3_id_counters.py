@@ -0,0 +1,41 @@
+"""Id counters for sequential_id allocation
+
+Revision ID: b7e2d4f1c8a3
+Revises: a1f3c9d2e4b7
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d4f1c8a3'
+down_revision: Union[str, Sequence[str], None] = 'a1f3c9d2e4b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('id_counters',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # Seed from the current numbering so new IDs continue where MAX()+1 left off
+    op.execute(
+        "INSERT INTO id_counters (name, value) "
+        "SELECT 'service_orders', COALESCE(MAX(sequential_id), 100) FROM service_orders"
+    )
+    op.execute(
+        "INSERT INTO id_counters (name, value) "
+        "SELECT 'clients', COALESCE(MAX(sequential_id), 0) FROM clients"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('id_counters')
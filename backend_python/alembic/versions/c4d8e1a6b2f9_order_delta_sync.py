@@ -0,0 +1,43 @@
+"""Order delta sync: updated_at and tombstones
+
+Revision ID: c4d8e1a6b2f9
+Revises: b7e2d4f1c8a3
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e1a6b2f9'
+down_revision: Union[str, Sequence[str], None] = 'b7e2d4f1c8a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('service_orders', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE service_orders SET updated_at = COALESCE(completed_at, created_at)")
+    op.create_index('ix_service_orders_user_id_updated_at', 'service_orders', ['user_id', 'updated_at'], unique=False)
+    op.create_table('service_order_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_service_order_tombstones_id'), 'service_order_tombstones', ['id'], unique=False)
+    op.create_index('ix_service_order_tombstones_user_id_deleted_at', 'service_order_tombstones', ['user_id', 'deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_service_order_tombstones_user_id_deleted_at', table_name='service_order_tombstones')
+    op.drop_index(op.f('ix_service_order_tombstones_id'), table_name='service_order_tombstones')
+    op.drop_table('service_order_tombstones')
+    op.drop_index('ix_service_orders_user_id_updated_at', table_name='service_orders')
+    op.drop_column('service_orders', 'updated_at')
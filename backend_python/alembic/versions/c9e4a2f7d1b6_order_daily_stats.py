@@ -0,0 +1,50 @@
+"""Daily order rollup for analytics
+
+Revision ID: c9e4a2f7d1b6
+Revises: b3f8d1c5e7a2
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e4a2f7d1b6'
+down_revision: Union[str, Sequence[str], None] = 'b3f8d1c5e7a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('order_daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('service_type', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('opened', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'service_type', 'user_id')
+    )
+    # Backfill from existing orders (same aggregation as analytics_utils.rebuild_daily_stats)
+    op.execute("""
+        INSERT INTO order_daily_stats (day, service_type, user_id, opened, completed, revenue)
+        SELECT day, service_type, user_id, SUM(opened), SUM(completed), SUM(revenue) FROM (
+            SELECT DATE(created_at) AS day, COALESCE(service_type, '') AS service_type,
+                   COALESCE(user_id, 0) AS user_id, 1 AS opened, 0 AS completed, 0.0 AS revenue
+            FROM service_orders WHERE created_at IS NOT NULL
+            UNION ALL
+            SELECT DATE(completed_at), COALESCE(service_type, ''), COALESCE(user_id, 0),
+                   0, 1, COALESCE(valor_total, 0.0)
+            FROM service_orders WHERE completed_at IS NOT NULL
+        ) contributions
+        GROUP BY day, service_type, user_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('order_daily_stats')
@@ -0,0 +1,86 @@
+"""Order history events (append-only)
+
+Revision ID: d2a7f5c3e9b1
+Revises: c4d8e1a6b2f9
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+from datetime import datetime
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7f5c3e9b1'
+down_revision: Union[str, Sequence[str], None] = 'c4d8e1a6b2f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _parse_date(value):
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '')).replace(tzinfo=None)
+    except Exception:
+        return None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    events = op.create_table('service_order_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('tipo', sa.String(), nullable=True),
+    sa.Column('descricao', sa.Text(), nullable=True),
+    sa.Column('usuario', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['service_orders.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_service_order_events_id'), 'service_order_events', ['id'], unique=False)
+    op.create_index('ix_service_order_events_order_id_id', 'service_order_events', ['order_id', 'id'], unique=False)
+
+    # Copy the legacy JSON history into events, preserving order (historico_json is kept)
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT id, historico_json FROM service_orders "
+        "WHERE historico_json IS NOT NULL ORDER BY id"
+    )).fetchall()
+    batch = []
+    for order_id, historico in rows:
+        if isinstance(historico, str):
+            try:
+                historico = json.loads(historico)
+            except ValueError:
+                continue
+        for item in historico or []:
+            if not isinstance(item, dict):
+                continue
+            batch.append({
+                'order_id': order_id,
+                'created_at': _parse_date(item.get('data')),
+                'tipo': item.get('tipo'),
+                'descricao': item.get('descricao'),
+                'usuario': item.get('usuario')
+            })
+        if len(batch) >= 1000:
+            op.bulk_insert(events, batch)
+            batch = []
+    if batch:
+        op.bulk_insert(events, batch)
+    op.execute(
+        "UPDATE service_order_events SET created_at = "
+        "(SELECT created_at FROM service_orders WHERE service_orders.id = service_order_events.order_id) "
+        "WHERE created_at IS NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_service_order_events_order_id_id', table_name='service_order_events')
+    op.drop_index(op.f('ix_service_order_events_id'), table_name='service_order_events')
+    op.drop_table('service_order_events')
@@ -0,0 +1,133 @@
+"""Service order photos table (out of fotos_os)
+
+Revision ID: e5b9c2d7a4f8
+Revises: d2a7f5c3e9b1
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+import json
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9c2d7a4f8'
+down_revision: Union[str, Sequence[str], None] = 'd2a7f5c3e9b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def _require_remote_blob_store() -> None:
+    """Refuse to extract photos to this machine's disk when migrating a shared database"""
+    from blob_store import BLOB_STORE_DIR, SupabaseBlobStore, get_blob_store
+    from photo_utils import PHOTO_BUCKET
+
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    if not isinstance(get_blob_store(PHOTO_BUCKET), SupabaseBlobStore):
+        raise RuntimeError(
+            "SUPABASE_SERVICE_KEY is not set: inline photos would be extracted to the local blob store "
+            f"({BLOB_STORE_DIR}), which deployed instances cannot serve. Set it and run the migration again."
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Checked before any DDL so a misconfigured run leaves the database untouched
+    _require_remote_blob_store()
+
+    photos = op.create_table('service_order_photos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('thumbnail_url', sa.String(), nullable=True),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['service_orders.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_service_order_photos_id'), 'service_order_photos', ['id'], unique=False)
+    op.create_index(op.f('ix_service_order_photos_order_id'), 'service_order_photos', ['order_id'], unique=False)
+
+    # Copy fotos_os entries into rows; inline base64 images are extracted to the blob store.
+    # fotos_os itself is left intact (the column is deferred and no longer read) and is
+    # only cleared by a later migration, once the extracted photos have been verified.
+    from photo_utils import decode_data_url, store_photo
+
+    bind = op.get_bind()
+    order_ids = [row[0] for row in bind.execute(sa.text(
+        "SELECT id FROM service_orders WHERE fotos_os IS NOT NULL ORDER BY id"
+    ))]
+    for order_id in order_ids:
+        # One order at a time: base64 payloads can be several MB each
+        fotos = bind.execute(
+            sa.text("SELECT fotos_os FROM service_orders WHERE id = :id"),
+            {"id": order_id}
+        ).scalar()
+        if isinstance(fotos, str):
+            try:
+                fotos = json.loads(fotos)
+            except ValueError:
+                fotos = None
+        if not isinstance(fotos, list):
+            continue
+
+        rows = []
+        for foto in fotos:
+            if not isinstance(foto, dict):
+                continue
+            url = foto.get('url') or foto.get('image_url')
+            if not url:
+                continue
+            thumbnail_url = None
+            decoded = decode_data_url(url)
+            if decoded:
+                try:
+                    url, thumbnail_url = store_photo(*decoded)
+                except Exception as e:
+                    # Skip the order; its photos stay in fotos_os only
+                    logger.error(f"Order {order_id}: could not extract photo ({e})")
+                    rows = None
+                    break
+            rows.append({
+                'order_id': order_id,
+                'url': url,
+                'thumbnail_url': thumbnail_url,
+                'description': foto.get('description')
+            })
+        if rows is None:
+            continue
+        if rows:
+            op.bulk_insert(photos, rows)
+
+    op.execute(
+        "UPDATE service_order_photos SET created_at = "
+        "(SELECT created_at FROM service_orders WHERE service_orders.id = service_order_photos.order_id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Orders migrated by upgrade() still have their original fotos_os; photos added
+    # afterwards only exist as rows, so their URLs go back into fotos_os
+    bind = op.get_bind()
+    by_order = {}
+    for order_id, url, description in bind.execute(sa.text(
+        "SELECT p.order_id, p.url, p.description FROM service_order_photos p "
+        "JOIN service_orders o ON o.id = p.order_id WHERE o.fotos_os IS NULL ORDER BY p.id"
+    )).fetchall():
+        by_order.setdefault(order_id, []).append({'url': url, 'description': description})
+    service_orders = sa.table('service_orders', sa.column('id', sa.Integer()), sa.column('fotos_os', sa.JSON()))
+    for order_id, fotos in by_order.items():
+        bind.execute(service_orders.update().where(service_orders.c.id == order_id).values(fotos_os=fotos))
+
+    op.drop_index(op.f('ix_service_order_photos_order_id'), table_name='service_order_photos')
+    op.drop_index(op.f('ix_service_order_photos_id'), table_name='service_order_photos')
+    op.drop_table('service_order_photos')
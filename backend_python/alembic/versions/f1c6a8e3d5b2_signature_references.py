@@ -0,0 +1,107 @@
+"""Signatures by reference (inline base64 -> blob store)
+
+Revision ID: f1c6a8e3d5b2
+Revises: e5b9c2d7a4f8
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c6a8e3d5b2'
+down_revision: Union[str, Sequence[str], None] = 'e5b9c2d7a4f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# (table, column) pairs holding signatures
+SIGNATURE_COLUMNS = [
+    ('users', 'signature_url'),
+    ('service_orders', 'assinatura_cliente'),
+    ('service_orders', 'assinatura_tecnico'),
+]
+
+
+def _require_remote_blob_store() -> None:
+    """Refuse to extract signatures to this machine's disk when migrating a shared database"""
+    from blob_store import BLOB_STORE_DIR, SupabaseBlobStore, get_blob_store
+    from signature_utils import SIGNATURE_BUCKET
+
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    if not isinstance(get_blob_store(SIGNATURE_BUCKET), SupabaseBlobStore):
+        raise RuntimeError(
+            "SUPABASE_SERVICE_KEY is not set: inline signatures would be extracted to the local blob store "
+            f"({BLOB_STORE_DIR}), which deployed instances cannot serve. Set it and run the migration again."
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Checked before any DDL so a misconfigured run leaves the database untouched
+    _require_remote_blob_store()
+
+    from signature_utils import store_signature
+
+    # The inline values are copied here before being replaced by references;
+    # a separate, later migration drops this table once the blobs are verified
+    backups = op.create_table('signature_backups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('column_name', sa.String(), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('inline_value', sa.Text(), nullable=False),
+    sa.Column('reference', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    bind = op.get_bind()
+    for table, column in SIGNATURE_COLUMNS:
+        ids = [row[0] for row in bind.execute(sa.text(
+            f"SELECT id FROM {table} WHERE {column} LIKE 'data:%' ORDER BY id"
+        ))]
+        for row_id in ids:
+            value = bind.execute(
+                sa.text(f"SELECT {column} FROM {table} WHERE id = :id"), {"id": row_id}
+            ).scalar()
+            try:
+                reference = store_signature(value)
+            except Exception as e:
+                # Leave the inline value in place; it still renders
+                logger.error(f"{table}.{column} id={row_id}: could not extract signature ({e})")
+                continue
+            op.bulk_insert(backups, [{
+                'table_name': table,
+                'column_name': column,
+                'row_id': row_id,
+                'inline_value': value,
+                'reference': reference
+            }])
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {column} = :ref WHERE id = :id"),
+                {"ref": reference, "id": row_id}
+            )
+        logger.info(f"{table}.{column}: {len(ids)} inline signatures moved to the blob store")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Restore the inline values, except where the signature changed after the upgrade
+    bind = op.get_bind()
+    for table, column in SIGNATURE_COLUMNS:
+        bind.execute(sa.text(
+            f"UPDATE {table} SET {column} = ("
+            "SELECT b.inline_value FROM signature_backups b "
+            f"WHERE b.table_name = '{table}' AND b.column_name = '{column}' AND b.row_id = {table}.id) "
+            "WHERE EXISTS ("
+            "SELECT 1 FROM signature_backups b "
+            f"WHERE b.table_name = '{table}' AND b.column_name = '{column}' "
+            f"AND b.row_id = {table}.id AND b.reference = {table}.{column})"
+        ))
+    op.drop_table('signature_backups')
@@ -0,0 +1,91 @@
+"""
+Analytics
+Séries temporais de receita e produtividade a partir de order_daily_stats
+(rollup diário mantido pelos eventos em models.py), sem varrer service_orders.
+"""
+import logging
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+from models import OrderDailyStats
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ("day", "week", "month")
+
+# Same contribution rules as the mapper events, as one set-based statement
+_REBUILD_SQL = """
+    INSERT INTO order_daily_stats (day, service_type, user_id, opened, completed, revenue)
+    SELECT day, service_type, user_id, SUM(opened), SUM(completed), SUM(revenue) FROM (
+        SELECT DATE(created_at) AS day, COALESCE(service_type, '') AS service_type,
+               COALESCE(user_id, 0) AS user_id, 1 AS opened, 0 AS completed, 0.0 AS revenue
+        FROM service_orders WHERE created_at IS NOT NULL
+        UNION ALL
+        SELECT DATE(completed_at), COALESCE(service_type, ''), COALESCE(user_id, 0),
+               0, 1, COALESCE(valor_total, 0.0)
+        FROM service_orders WHERE completed_at IS NOT NULL
+    ) contributions
+    GROUP BY day, service_type, user_id
+"""
+
+
+def rebuild_daily_stats(db: Session):
+    """Reconstrói o rollup inteiro a partir de service_orders (reparo / backfill)"""
+    db.execute(delete(OrderDailyStats))
+    db.execute(text(_REBUILD_SQL))
+    db.commit()
+    logger.info("order_daily_stats rebuilt")
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())  # Monday
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def get_series(
+    db: Session,
+    inicio: date,
+    fim: date,
+    bucket: str = "day",
+    service_type: Optional[str] = None,
+    tecnico_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Uma linha por período (inclusive os vazios) entre inicio e fim.
+    Lê no máximo um registro agregado por dia do intervalo.
+    """
+    query = select(
+        OrderDailyStats.day,
+        func.sum(OrderDailyStats.opened).label("opened"),
+        func.sum(OrderDailyStats.completed).label("completed"),
+        func.sum(OrderDailyStats.revenue).label("revenue")
+    ).where(OrderDailyStats.day >= inicio, OrderDailyStats.day <= fim)
+    if service_type is not None:
+        query = query.where(OrderDailyStats.service_type == service_type)
+    if tecnico_id is not None:
+        query = query.where(OrderDailyStats.user_id == tecnico_id)
+    query = query.group_by(OrderDailyStats.day)
+
+    # Empty buckets first, so gaps show up as zeros
+    series = {}
+    day = bucket_start(inicio, bucket)
+    while day <= fim:
+        series[day] = {"periodo": day.isoformat(), "abertas": 0, "concluidas": 0, "receita": 0.0}
+        day = bucket_start(day + timedelta(days=1 if bucket == "day" else 7 if bucket == "week" else 32), bucket)
+
+    for row in db.execute(query):
+        day = row.day if isinstance(row.day, date) else date.fromisoformat(str(row.day))
+        point = series[bucket_start(day, bucket)]
+        point["abertas"] += row.opened or 0
+        point["concluidas"] += row.completed or 0
+        point["receita"] += row.revenue or 0.0
+
+    for point in series.values():
+        point["receita"] = round(point["receita"], 2)
+    return list(series.values())
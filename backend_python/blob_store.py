@@ -0,0 +1,140 @@
+"""
+Blob Store - armazenamento de artefatos gerados (PDFs, miniaturas...)
+Local em disco para dev/testes, Supabase Storage em produção.
+"""
+import os
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Diretório do store local (no Vercel apenas /tmp é gravável)
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "/tmp/inovar-blobs")
+
+
+class BlobStore:
+    """Interface mínima: chaves são caminhos relativos (ex.: 'pdf/<hash>.pdf')"""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def put(self, key: str, content: bytes, content_type: str = "application/octet-stream") -> bool:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def public_url(self, key: str) -> Optional[str]:
+        """URL servível ao navegador (None para buckets privados)"""
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: str = BLOB_STORE_DIR, bucket: Optional[str] = None):
+        self.root = root
+        self.bucket = bucket
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, content: bytes, content_type: str = "application/octet-stream") -> bool:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            logger.error(f"Local blob store write failed ({key}): {e}")
+            return False
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def public_url(self, key: str) -> Optional[str]:
+        from supabase_storage import PRIVATE_BUCKETS
+        if not self.bucket or self.bucket in PRIVATE_BUCKETS:
+            return None
+        # Served by GET /api/blobs/{bucket}/{key} (dev only)
+        return f"/api/blobs/{self.bucket}/{key}"
+
+
+class SupabaseBlobStore(BlobStore):
+    """Bucket privado no Supabase Storage, acessado com a service key"""
+
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+
+    def _url(self, key: str) -> str:
+        from supabase_storage import SUPABASE_URL
+        return f"{SUPABASE_URL}/storage/v1/object/{self.bucket}/{key}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        from supabase_storage import get_headers
+        try:
+            with httpx.Client(timeout=15.0) as client:
+                response = client.get(self._url(key), headers=get_headers())
+            if response.status_code == 200:
+                return response.content
+        except Exception as e:
+            logger.error(f"Supabase blob read failed ({key}): {e}")
+        return None
+
+    def put(self, key: str, content: bytes, content_type: str = "application/octet-stream") -> bool:
+        from supabase_storage import get_headers
+        headers = get_headers()
+        headers["Content-Type"] = content_type
+        headers["x-upsert"] = "true"
+        try:
+            with httpx.Client(timeout=30.0) as client:
+                response = client.post(self._url(key), content=content, headers=headers)
+            if response.status_code in [200, 201]:
+                return True
+            logger.warning(f"Supabase blob write failed: {response.status_code} - {response.text}")
+        except Exception as e:
+            logger.error(f"Supabase blob write failed ({key}): {e}")
+        return False
+
+    def exists(self, key: str) -> bool:
+        from supabase_storage import get_headers
+        try:
+            with httpx.Client(timeout=15.0) as client:
+                response = client.head(self._url(key), headers=get_headers())
+            return response.status_code == 200
+        except Exception as e:
+            logger.error(f"Supabase blob lookup failed ({key}): {e}")
+        return False
+
+    def public_url(self, key: str) -> Optional[str]:
+        from supabase_storage import PRIVATE_BUCKETS, get_public_url
+        if self.bucket in PRIVATE_BUCKETS:
+            return None
+        return get_public_url(self.bucket, key)
+
+
+_stores = {}
+
+def get_blob_store(bucket: str = "os-pdfs") -> BlobStore:
+    """Supabase Storage quando configurado, senão disco local"""
+    if bucket not in _stores:
+        from supabase_storage import SUPABASE_SERVICE_KEY
+        if SUPABASE_SERVICE_KEY:
+            _stores[bucket] = SupabaseBlobStore(bucket)
+        else:
+            _stores[bucket] = LocalBlobStore(os.path.join(BLOB_STORE_DIR, bucket), bucket)
+    return _stores[bucket]
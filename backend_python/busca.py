@@ -0,0 +1,178 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import select, literal, func, or_, case, union_all, text
+from database import get_db
+from models import ServiceOrder, Client, Equipment, User
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+from auth import get_operational_user
+
+MIN_QUERY_LENGTH = 3 # Trigrams: shorter terms match nothing useful
+MAX_PAGE_SIZE = 100
+SUBTITLE_LENGTH = 160
+
+# tipo -> (model, title column, subtitle column, searched columns)
+SEARCH_TARGETS = {
+    "os": (ServiceOrder, ServiceOrder.title, ServiceOrder.description,
+           [ServiceOrder.title, ServiceOrder.description, ServiceOrder.relatorio_tecnico]),
+    "cliente": (Client, Client.name, Client.document,
+                [Client.name, Client.document]),
+    "equipamento": (Equipment, Equipment.name, Equipment.serial_number,
+                    [Equipment.name, Equipment.serial_number]),
+}
+
+# ============= POSTGRESQL (pg_trgm) =============
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _pg_target_select(tipo: str, q: str):
+    model, title_col, subtitle_col, columns = SEARCH_TARGETS[tipo]
+    pattern = f"%{_escape_like(q)}%"
+
+    # `col %> q` (word similarity) and ILIKE are both served by the GIN trigram indexes
+    similar = [col.op("%>")(q) for col in columns]
+    contains = [col.ilike(pattern, escape="\\") for col in columns]
+    # Best word similarity across the columns; exact substrings rank first
+    score = func.greatest(*[func.coalesce(func.word_similarity(q, col), 0.0) for col in columns]) + case(
+        (or_(*contains), 1.0), else_=0.0
+    )
+    return select(
+        literal(tipo).label("tipo"),
+        model.id.label("id"),
+        title_col.label("titulo"),
+        subtitle_col.label("subtitulo"),
+        score.label("score")
+    ).where(or_(*similar, *contains))
+
+def _search_postgres(db: Session, q: str, tipos: List[str], limit: int, offset: int):
+    query = union_all(*[_pg_target_select(tipo, q) for tipo in tipos]).subquery()
+    stmt = select(query).order_by(
+        query.c.score.desc(), query.c.tipo, query.c.id.desc()
+    ).limit(limit + 1).offset(offset)
+    return db.execute(stmt).all()
+
+# ============= SQLITE (FTS5 fallback) =============
+
+# rowid = id * 4 + kind, so triggers can update a single entry by rowid
+SQLITE_KINDS = {"os": 1, "cliente": 2, "equipamento": 3}
+SQLITE_KIND_NAMES = {kind: tipo for tipo, kind in SQLITE_KINDS.items()}
+
+# tipo -> (table, title column, subtitle column, extra content column)
+SQLITE_SOURCES = {
+    "os": ("service_orders", "title", "description", "relatorio_tecnico"),
+    "cliente": ("clients", "name", "document", None),
+    "equipamento": ("equipments", "name", "serial_number", None),
+}
+
+def _sqlite_values(tipo: str, row: str) -> str:
+    """Expressões (rowid, titulo, subtitulo, conteudo) para a linha `row` (new, old ou a tabela)"""
+    _, title, subtitle, content = SQLITE_SOURCES[tipo]
+    content_expr = f"{row}.{content}" if content else "NULL"
+    return f"{row}.id * 4 + {SQLITE_KINDS[tipo]}, {row}.{title}, {row}.{subtitle}, {content_expr}"
+
+def create_sqlite_search_index(connection):
+    """
+    Cria o índice FTS5 (tokenizer trigram) e os triggers que o mantêm.
+    Faz parte da criação do schema (init_db); nunca roda durante uma busca.
+    A migração a7d3e9f2b6c4 tem uma cópia congelada deste DDL: mudanças aqui
+    precisam de uma nova revisão.
+    """
+    exists = connection.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+    )).first()
+    if exists:
+        return
+    connection.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "titulo, subtitulo, conteudo, tokenize = 'trigram')"
+    ))
+    columns = "search_index(rowid, titulo, subtitulo, conteudo)"
+    for tipo, (table, *_) in SQLITE_SOURCES.items():
+        kind = SQLITE_KINDS[tipo]
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS search_index_{table}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {columns} VALUES ({_sqlite_values(tipo, 'new')}); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS search_index_{table}_au AFTER UPDATE ON {table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 4 + {kind}; "
+            f"INSERT INTO {columns} VALUES ({_sqlite_values(tipo, 'new')}); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS search_index_{table}_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 4 + {kind}; END"
+        ))
+        connection.execute(text(f"INSERT INTO {columns} SELECT {_sqlite_values(tipo, table)} FROM {table}"))
+    logger.info("SQLite FTS5 search index created")
+
+def drop_sqlite_search_index(connection):
+    for table, *_ in SQLITE_SOURCES.values():
+        for suffix in ("ai", "au", "ad"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS search_index_{table}_{suffix}"))
+    connection.execute(text("DROP TABLE IF EXISTS search_index"))
+
+def _search_sqlite(db: Session, q: str, tipos: List[str], limit: int, offset: int):
+    kinds = ", ".join(str(SQLITE_KINDS[tipo]) for tipo in tipos)
+    phrase = '"' + q.replace('"', '""') + '"'
+    rows = db.execute(text(
+        "SELECT rowid, titulo, subtitulo, -bm25(search_index) AS score FROM search_index "
+        f"WHERE search_index MATCH :phrase AND rowid % 4 IN ({kinds}) "
+        "ORDER BY score DESC, rowid DESC LIMIT :limit OFFSET :offset"
+    ), {"phrase": phrase, "limit": limit + 1, "offset": offset}).all()
+    return [
+        {
+            "tipo": SQLITE_KIND_NAMES[row.rowid % 4],
+            "id": row.rowid // 4,
+            "titulo": row.titulo,
+            "subtitulo": row.subtitulo,
+            "score": row.score
+        }
+        for row in rows
+    ]
+
+# ============= ROUTES =============
+
+@router.get("/busca")
+def search(
+    q: str = Query(..., min_length=MIN_QUERY_LENGTH),
+    tipo: Optional[List[str]] = Query(None),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_operational_user)
+):
+    """
+    Busca por similaridade em OS (título, descrição, relatório), clientes
+    (nome, documento) e equipamentos (nome, nº de série), ordenada por relevância.
+    """
+    q = q.strip()
+    if len(q) < MIN_QUERY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Informe ao menos {MIN_QUERY_LENGTH} caracteres")
+    tipos = tipo or list(SEARCH_TARGETS)
+    invalid = [t for t in tipos if t not in SEARCH_TARGETS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Tipo de busca inválido: {', '.join(invalid)}")
+
+    if db.get_bind().dialect.name == "sqlite":
+        rows = _search_sqlite(db, q, tipos, limit, offset)
+    else:
+        rows = [row._asdict() for row in _search_postgres(db, q, tipos, limit, offset)]
+
+    has_more = len(rows) > limit
+    items = [
+        {
+            "tipo": row["tipo"],
+            "id": row["id"],
+            "titulo": row["titulo"],
+            "subtitulo": (row["subtitulo"] or "")[:SUBTITLE_LENGTH] or None,
+            "score": round(float(row["score"] or 0), 4)
+        }
+        for row in rows[:limit]
+    ]
+    return {"items": items, "next_offset": offset + limit if has_more else None}
@@ -0,0 +1,143 @@
+"""
+Cache Codec - serialização binária e compressão dos valores em cache
+Codec escolhido por namespace da chave; bibliotecas opcionais com fallback.
+"""
+import os
+import json
+import zlib
+import logging
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+# Payloads smaller than this are stored uncompressed (not worth the CPU)
+COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+
+# Header: MAGIC + serializer id + compression id. Entries written before the
+# codec layer are plain JSON text and never start with MAGIC.
+MAGIC = b"\x00"
+
+# ============= SERIALIZERS =============
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, default=str).encode()
+
+def _orjson_dumps(value: Any) -> bytes:
+    # Datetimes go through default=str, matching what json.dumps stored
+    return orjson.dumps(value, default=str, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, default=str, use_bin_type=True)
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+# name -> (id, dumps, loads, available)
+SERIALIZERS = {
+    "json": (b"j", _json_dumps, json.loads, True),
+    "orjson": (b"o", _orjson_dumps, orjson.loads if ORJSON_AVAILABLE else None, ORJSON_AVAILABLE),
+    "msgpack": (b"m", _msgpack_dumps, _msgpack_loads, MSGPACK_AVAILABLE),
+}
+
+# ============= COMPRESSION =============
+
+_zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if ZSTD_AVAILABLE else None
+_zstd_decompressor = zstandard.ZstdDecompressor() if ZSTD_AVAILABLE else None
+
+def _identity(data: bytes) -> bytes:
+    return data
+
+# name -> (id, compress, decompress, available)
+COMPRESSORS = {
+    "none": (b"n", _identity, _identity, True),
+    "zstd": (b"z", _zstd_compressor.compress if ZSTD_AVAILABLE else None,
+             _zstd_decompressor.decompress if ZSTD_AVAILABLE else None, ZSTD_AVAILABLE),
+    "lz4": (b"l", lz4.frame.compress if LZ4_AVAILABLE else None,
+            lz4.frame.decompress if LZ4_AVAILABLE else None, LZ4_AVAILABLE),
+    "zlib": (b"d", lambda data: zlib.compress(data, ZLIB_LEVEL), zlib.decompress, True),
+}
+
+SERIALIZER_IDS = {spec[0]: name for name, spec in SERIALIZERS.items()}
+COMPRESSOR_IDS = {spec[0]: name for name, spec in COMPRESSORS.items()}
+
+# ============= POLICY =============
+
+def _first_available(options: list, registry: dict) -> str:
+    return next(name for name in options if registry[name][3])
+
+DEFAULT_SERIALIZER = _first_available(["orjson", "json"], SERIALIZERS)
+DEFAULT_COMPRESSION = _first_available(["zstd", "lz4", "zlib"], COMPRESSORS)
+
+# namespace -> (serializer, compression); the longest matching namespace wins.
+# Missing libraries fall back to DEFAULT_SERIALIZER / DEFAULT_COMPRESSION.
+CACHE_CODECS: Dict[str, Tuple[str, str]] = {
+    "": ("orjson", "zstd"),
+    "dashboard": ("orjson", "lz4"),  # Read several times a second: cheapest decompression
+    "export": ("json", "none"),  # Tiny progress dicts, rewritten constantly
+}
+
+def codec_for(key: str) -> Tuple[str, str]:
+    """(serializador, compressão) para a chave, com fallback se a lib não estiver instalada"""
+    name = key[len("cache:"):] if key.startswith("cache:") else key
+    best = ""
+    for namespace in CACHE_CODECS:
+        if len(namespace) > len(best) and (name == namespace or name.startswith(namespace + ":")):
+            best = namespace
+    serializer, compression = CACHE_CODECS[best]
+    if not SERIALIZERS[serializer][3]:
+        serializer = DEFAULT_SERIALIZER
+    if not COMPRESSORS[compression][3]:
+        compression = DEFAULT_COMPRESSION
+    return serializer, compression
+
+# ============= ENCODE / DECODE =============
+
+def encode(key: str, value: Any, serializer: str = None, compression: str = None) -> bytes:
+    default_serializer, default_compression = codec_for(key)
+    serializer = serializer or default_serializer
+    compression = compression or default_compression
+    serializer_id, dumps, _, _ = SERIALIZERS[serializer]
+    data = dumps(value)
+    if len(data) < COMPRESS_MIN_BYTES:
+        compression = "none"
+    compression_id, compress, _, _ = COMPRESSORS[compression]
+    return MAGIC + serializer_id + compression_id + compress(data)
+
+def decode(payload: bytes) -> Any:
+    if isinstance(payload, str):
+        payload = payload.encode()
+    if not payload.startswith(MAGIC):
+        return json.loads(payload)  # Legacy JSON text entry
+    serializer = SERIALIZER_IDS[payload[1:2]]
+    compression = COMPRESSOR_IDS[payload[2:3]]
+    loads = SERIALIZERS[serializer][2]
+    decompress = COMPRESSORS[compression][2]
+    if loads is None or decompress is None:
+        raise ValueError(f"Codec de cache indisponível: {serializer}/{compression}")
+    return loads(decompress(payload[3:]))
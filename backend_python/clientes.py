@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
 from database import get_db
 from models import Client, Location, User
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
-from redis_utils import get_cache, set_cache, delete_cache
+from redis_utils import cached, delete_cache
+from sequence_utils import sequence_allocator
 import logging
 
 logger = logging.getLogger(__name__)
@@ -99,24 +99,14 @@ class ClientResponse(ClientBase):
 
 # Routes - Clients
 @router.get("/clientes", response_model=List[ClientResponse])
+@cached(ttl=300, tags=["clientes"])
 def list_clients(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_operational_user)
 ):
-    cache_key = "cache:clientes:all"
-    cached = get_cache(cache_key)
-    if cached:
-        return cached
-
     clients = db.query(Client).options(joinedload(Client.locations)).all()
-    
-    # We need to manually serialize if using joinedload or just let set_cache handle it if it's a list of models
-    # Actually, set_cache uses json.dumps which might fail on SQLAlchemy models if not converted.
-    # But ClientResponse is the response_model, so FastAPI handles it. 
-    # For caching, we should store the serialized version.
-    
-    set_cache(cache_key, clients, ttl_seconds=300)
-    return clients
+    # Serialized here: @cached stores the JSON-ready value, not ORM objects
+    return [ClientResponse.model_validate(c).model_dump(mode="json") for c in clients]
 
 @router.post("/clientes", response_model=ClientResponse)
 def create_client(
@@ -137,8 +127,7 @@ def create_client(
             raise HTTPException(status_code=400, detail="Cliente já cadastrado com este documento")
 
     # Sequential ID
-    max_id = db.query(func.max(Client.sequential_id)).scalar()
-    sequential_id = (max_id or 0) + 1
+    sequential_id = sequence_allocator.next_id(db, "clients")
 
     db_client = Client(
         name=client.nome,
@@ -249,6 +238,7 @@ def update_client(
     db.commit()
     db.refresh(db_client)
     delete_cache("clientes")
+    delete_cache("orders:detail") # Client data is embedded in order details
 
     # Real-time Broadcast
     try:
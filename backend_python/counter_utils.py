@@ -0,0 +1,74 @@
+"""
+Stat Counters
+Leituras O(1) para dashboards a partir da tabela stat_counters, semeada pela
+migração, mantida pelos eventos em models.py e reparada por reconcile_counters().
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models import StatCounter, ServiceOrder, Client, User, order_status_counter
+
+logger = logging.getLogger(__name__)
+
+# Statuses seeded with a zero row, so the first order in a new status is counted
+# right away (anything else is picked up by the next reconciliation)
+ORDER_STATUSES = [
+    "aberto", "pendente", "orcamento", "aprovado", "agendado",
+    "em_andamento", "concluido", "finalizado", "faturado", "cancelado"
+]
+
+
+def _actual_counts(db: Session) -> Dict[str, int]:
+    """Valores verdadeiros via COUNT(*) (varredura completa: só para semear/reconciliar)"""
+    counts = {
+        "orders:total": db.query(func.count(ServiceOrder.id)).scalar() or 0,
+        "clients:total": db.query(func.count(Client.id)).scalar() or 0,
+        "users:total": db.query(func.count(User.id)).scalar() or 0,
+    }
+    for status in ORDER_STATUSES:
+        counts[order_status_counter(status)] = 0
+    for status, total in db.query(ServiceOrder.status, func.count(ServiceOrder.id)).group_by(ServiceOrder.status):
+        counts[order_status_counter(status)] = total
+    return counts
+
+
+def reconcile_counters(db: Session) -> Dict[str, dict]:
+    """
+    Recalcula todos os contadores e corrige divergências.
+    Retorna {nome: {"stored": x, "actual": y}} para os que estavam errados.
+    """
+    # Lock first: increments committed meanwhile wait, instead of being overwritten
+    stored = {c.name: c for c in db.query(StatCounter).with_for_update()}
+    actual = _actual_counts(db)
+
+    drift = {}
+    for name in set(actual) | set(stored):
+        value = actual.get(name, 0)
+        counter = stored.get(name)
+        if counter is None:
+            db.add(StatCounter(name=name, value=value))
+        elif counter.value != value:
+            drift[name] = {"stored": counter.value, "actual": value}
+            counter.value = value
+            counter.updated_at = datetime.utcnow()
+    db.commit()
+
+    if drift:
+        logger.warning(f"Stat counters reconciled, drift found: {drift}")
+    return drift
+
+
+def get_counters(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Lê contadores (uma consulta à tabela, poucas linhas). Somente leitura:
+    a migração e a reconciliação semeiam a tabela; linhas ausentes valem 0.
+    """
+    names = list(names)
+    rows = dict(db.execute(
+        select(StatCounter.name, StatCounter.value).where(StatCounter.name.in_(names))
+    ).all())
+    return {name: rows.get(name, 0) for name in names}
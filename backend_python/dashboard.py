@@ -1,20 +1,25 @@
 import logging
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from typing import Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy import func
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from auth import get_current_user, get_admin_user, get_operational_user
 from database import get_db
-from models import Client, ServiceOrder, User, SystemSettings
-from redis_utils import get_cache, set_cache
+from models import Client, ServiceOrder, User, SystemSettings, order_status_counter
+from redis_utils import cache_key, get_or_compute
+from analytics_utils import get_series
+from counter_utils import get_counters
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+MAX_ANALYTICS_DAYS = 3660
+
 class DashboardStats(BaseModel):
     total_users: int
     total_clients: int
@@ -30,16 +35,16 @@ def get_admin_dashboard(
     Retorna estatísticas simplificadas para o Admin.
     Focado em gestão de sistema, sem dados operacionais detalhados.
     """
-    cache_key = "dashboard:admin:v6"
-    cached = get_cache(cache_key)
-    if cached:
-        return cached
+    # Single-flight: on expiry only one request recomputes, the rest get the stale copy
+    return get_or_compute("cache:dashboard:admin:v8", lambda: _build_admin_dashboard(db), ttl_seconds=60)
 
-    # 1. Overview
-    total_usuarios = db.query(User).count()
+def _build_admin_dashboard(db: Session) -> dict:
+    # 1. Overview (incremental counters, no table scans)
+    counters = get_counters(db, ["users:total", "clients:total", "orders:total"])
+    total_usuarios = counters["users:total"]
     # We can show total clients/OS as system stats, but not list them
-    total_clientes = db.query(Client).count()
-    total_os = db.query(ServiceOrder).count()
+    total_clientes = counters["clients:total"]
+    total_os = counters["orders:total"]
     
     # System Health / Status (Mocked for now, or real if available)
     # Admin doesn't need "Recent Service Orders"
@@ -53,8 +58,6 @@ def get_admin_dashboard(
         },
         "recent_orders": [] # Empty list to satisfy frontend contract if needed
     }
-
-    set_cache(cache_key, result, ttl_seconds=60)
     return result
 
 @router.get("/dashboard/prestador")
@@ -63,33 +66,45 @@ def get_prestador_dashboard(
     db: Session = Depends(get_db)
 ):
     """Dashboard para prestadores de serviço (Visão Geral)"""
-    cache_key = f"dashboard:prestador:v5"
-    cached = get_cache(cache_key)
-    if cached:
-        return cached
-
-    # Contagens básicas
-    total_clientes = db.query(Client).count()
-    total_servicos = db.query(ServiceOrder).count()
-
-    # Serviços por status
-    servicos_aberto = db.query(ServiceOrder).filter(ServiceOrder.status == "pendente").count()
-    servicos_agendado = db.query(ServiceOrder).filter(ServiceOrder.status == "agendado").count()
-    servicos_em_andamento = db.query(ServiceOrder).filter(ServiceOrder.status == "em_andamento").count()
-    servicos_concluido = db.query(ServiceOrder).filter(ServiceOrder.status.in_(["concluido", "faturado"])).count()
-
-    # Serviços recentes
-    recent_os = db.query(ServiceOrder).order_by(ServiceOrder.created_at.desc()).limit(5).all()
-
-    recent_os_list = []
-    for os in recent_os:
-        recent_os_list.append({
+    return get_or_compute("cache:dashboard:prestador:v7", lambda: _build_prestador_dashboard(db), ttl_seconds=60)
+
+def _build_prestador_dashboard(db: Session) -> dict:
+    # Contagens básicas + serviços por status (incremental counters, no table scans)
+    counters = get_counters(db, [
+        "clients:total", "orders:total",
+        order_status_counter("pendente"), order_status_counter("agendado"),
+        order_status_counter("em_andamento"), order_status_counter("concluido"),
+        order_status_counter("faturado")
+    ])
+    total_clientes = counters["clients:total"]
+    total_servicos = counters["orders:total"]
+
+    servicos_aberto = counters[order_status_counter("pendente")]
+    servicos_agendado = counters[order_status_counter("agendado")]
+    servicos_em_andamento = counters[order_status_counter("em_andamento")]
+    servicos_concluido = counters[order_status_counter("concluido")] + counters[order_status_counter("faturado")]
+
+    # Serviços recentes (client name joined in the same query, no lazy loads)
+    recent_os = db.execute(
+        select(
+            ServiceOrder.id, ServiceOrder.sequential_id, ServiceOrder.title,
+            ServiceOrder.status, Client.name.label("client_name")
+        )
+        .outerjoin(Client, ServiceOrder.client_id == Client.id)
+        .order_by(ServiceOrder.created_at.desc(), ServiceOrder.id.desc())
+        .limit(5)
+    ).all()
+
+    recent_os_list = [
+        {
             "id": os.id,
             "sequential_id": os.sequential_id,
             "titulo": os.title or f"OS #{os.sequential_id}",
             "status": os.status,
-            "client_name": os.client.name if os.client else None
-        })
+            "client_name": os.client_name
+        }
+        for os in recent_os
+    ]
 
     result = {
         "stats": {
@@ -100,8 +115,54 @@ def get_prestador_dashboard(
         },
         "recent_orders": recent_os_list
     }
+    return result
 
-    set_cache(cache_key, result, ttl_seconds=60)
+@router.get("/dashboard/analytics")
+def get_dashboard_analytics(
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    bucket: str = Query("month", pattern="^(day|week|month)$"),
+    service_type: Optional[str] = None,
+    tecnico_id: Optional[int] = None,
+    current_user: User = Depends(get_operational_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Receita e OS abertas/concluídas por dia, semana ou mês (UTC).
+    Lido do rollup diário: custo proporcional ao intervalo, não ao volume de OS.
+    """
+    fim = fim or datetime.utcnow().date()
+    inicio = inicio or fim.replace(day=1) - timedelta(days=365)
+    if inicio > fim:
+        raise HTTPException(status_code=400, detail="Data inicial maior que a final")
+    if (fim - inicio).days > MAX_ANALYTICS_DAYS:
+        raise HTTPException(status_code=400, detail="Intervalo máximo de 10 anos")
+
+    cache_key_str = cache_key(
+        "dashboard:analytics:v2",
+        inicio=inicio.isoformat(), fim=fim.isoformat(), bucket=bucket,
+        service_type=service_type, tecnico_id=tecnico_id
+    )
+    return get_or_compute(
+        cache_key_str,
+        lambda: _build_analytics(db, inicio, fim, bucket, service_type, tecnico_id),
+        ttl_seconds=60
+    )
+
+def _build_analytics(db: Session, inicio: date, fim: date, bucket: str,
+                     service_type: Optional[str], tecnico_id: Optional[int]) -> dict:
+    series = get_series(db, inicio, fim, bucket, service_type, tecnico_id)
+    result = {
+        "bucket": bucket,
+        "inicio": inicio.isoformat(),
+        "fim": fim.isoformat(),
+        "series": series,
+        "totais": {
+            "abertas": sum(p["abertas"] for p in series),
+            "concluidas": sum(p["concluidas"] for p in series),
+            "total_revenue": round(sum(p["receita"] for p in series), 2)
+        }
+    }
     return result
 
 @router.get("/dashboard")
@@ -98,6 +98,15 @@ def init_db():
     except Exception as e:
         logger.error(f"❌ Error creating tables: {e}")
 
+    # Índice de busca FTS5 (no PostgreSQL os índices trigram vêm da migração)
+    if engine.dialect.name == "sqlite":
+        try:
+            from busca import create_sqlite_search_index
+            with engine.begin() as connection:
+                create_sqlite_search_index(connection)
+        except Exception as e:
+            logger.error(f"❌ Error creating search index: {e}")
+
     # Inserir SystemSettings padrão se não existir
     db = next(get_db())
     try:
@@ -116,3 +125,17 @@ def init_db():
         db.rollback()
     finally:
         db.close()
+
+    # Contadores do dashboard (bancos criados sem a migração b3f8d1c5e7a2)
+    db = next(get_db())
+    try:
+        from models import StatCounter
+        from counter_utils import reconcile_counters
+        if not db.query(StatCounter).first():
+            reconcile_counters(db)
+            logger.info("✅ Stat counters seeded")
+    except Exception as e:
+        logger.error(f"❌ Error seeding stat counters: {e}")
+        db.rollback()
+    finally:
+        db.close()
@@ -5,7 +5,7 @@ from models import Equipment, Location, User
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
-from redis_utils import get_cache, set_cache, delete_cache
+from redis_utils import cached, delete_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -46,17 +46,13 @@ class EquipmentResponse(EquipmentBase):
     location_name: Optional[str] = None
 
 @router.get("/equipamentos", response_model=List[EquipmentResponse])
+@cached(ttl=120, tags=["equipamentos"])
 def listar_equipamentos(
     locationId: Optional[int] = None,
     clientId: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_operational_user)
 ):
-    cache_key = f"cache:equipamentos:list:{locationId or 'all'}:{clientId or 'all'}"
-    cached = get_cache(cache_key)
-    if cached:
-        return cached
-
     query = db.query(Equipment).options(joinedload(Equipment.location).joinedload(Location.client))
     if locationId:
         query = query.filter(Equipment.location_id == locationId)
@@ -65,7 +61,7 @@ def listar_equipamentos(
 
     equipments = query.all()
 
-    result = [
+    return [
         {
             "id": e.id,
             "nome": e.name,
@@ -81,9 +77,6 @@ def listar_equipamentos(
         for e in equipments
     ]
 
-    set_cache(cache_key, result, ttl_seconds=120)
-    return result
-
 @router.post("/equipamentos", response_model=EquipmentResponse)
 def criar_equipamento(
     equip: EquipmentCreate, 
@@ -115,8 +108,7 @@ def criar_equipamento(
     db.commit()
     db.refresh(db_equip)
 
-    delete_cache("equipamentos")
-    delete_cache("maintenance")
+    delete_cache("equipamentos", "maintenance", "orders:detail")
     return {
         "id": db_equip.id,
         "nome": db_equip.name,
@@ -154,8 +146,7 @@ def atualizar_equipamento(
             pass
 
     db.commit()
-    delete_cache("equipamentos")
-    delete_cache("maintenance")
+    delete_cache("equipamentos", "maintenance", "orders:detail") # Equipment data is embedded in order details
     return {"message": "Equipamento atualizado"}
 
 @router.delete("/equipamentos/{equip_id}")
@@ -170,6 +161,5 @@ def deletar_equipamento(
 
     db.delete(db_equip)
     db.commit()
-    delete_cache("equipamentos")
-    delete_cache("maintenance")
+    delete_cache("equipamentos", "maintenance", "orders:detail")
     return {"message": "Equipamento removido"}
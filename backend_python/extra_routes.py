@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import Notification, User, SystemSettings
 from auth import get_current_user
-from redis_utils import get_cache, set_cache, delete_cache
+from redis_utils import get_cache, set_cache, adelete_cache
 import logging
 from datetime import datetime
 
@@ -108,6 +108,7 @@ async def update_system_settings(
     if data.pix_key: settings.pix_key = data.pix_key
 
     db.commit()
+    await adelete_cache("settings", "orders:detail") # Company data is embedded in order details
     return {"message": "Configurações atualizadas", "success": True}
 
 # ============= CATALOGS =============
@@ -15,6 +15,7 @@ import logging
 import json
 import httpx
 import time
+import math
 from datetime import datetime
 import signal
 from dotenv import load_dotenv
@@ -43,6 +44,7 @@ from dashboard import router as dashboard_router
 from clientes import router as clientes_router
 from extra_routes import router as extra_router
 from equipamentos import router as equipamentos_router
+from busca import router as busca_router
 from scheduler import start_scheduler
 from notifications import router as notifications_router
 from routers.manutencao import router as maintenance_router
@@ -51,12 +53,13 @@ from routers.cron import router as cron_router
 
 # Redis Utilities
 from redis_utils import (
-    REDIS_AVAILABLE,
-    check_rate_limit,
+    redis_breaker,
     get_redis_stats,
+    get_cache_stats,
     get_cache,
     set_cache
 )
+from rate_limit_utils import RATE_LIMIT_ENABLED, EXEMPT_PATHS, acheck_request
 
 app = FastAPI(
     title="Inovar Refrigeração API",
@@ -177,29 +180,27 @@ async def fix_405_and_slashes(request: Request, call_next):
 # Rate Limiter Middleware
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
-    client_ip = request.client.host if request.client else "unknown"
-
-    if request.url.path in ["/", "/health", "/api/health", "/favicon.ico"]:
-        return await call_next(request)
-
-    # Rate Limit Configuration
-    rate_limit_enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
-    if not rate_limit_enabled:
+    if not RATE_LIMIT_ENABLED or request.url.path in EXEMPT_PATHS:
         return await call_next(request)
 
-    max_requests = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "1000"))
-    window_seconds = int(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60"))
-
-    allowed, remaining = check_rate_limit(client_ip, max_requests=max_requests, window_seconds=window_seconds)
+    client_ip = request.client.host if request.client else "unknown"
+    allowed, remaining, retry_after, limit = await acheck_request(
+        request.url.path, request.method, client_ip, request.headers.get("authorization")
+    )
 
     if not allowed:
         return JSONResponse(
             status_code=429,
             content={"detail": "Muitas requisições. Por favor, aguarde um momento."},
-            headers={"X-RateLimit-Remaining": "0"}
+            headers={
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Remaining": "0",
+                "Retry-After": str(max(1, math.ceil(retry_after)))
+            }
         )
 
     response = await call_next(request)
+    response.headers["X-RateLimit-Limit"] = str(limit)
     response.headers["X-RateLimit-Remaining"] = str(remaining)
     return response
 
@@ -225,12 +226,13 @@ def check_database_health() -> dict:
 def check_redis_health() -> dict:
     start = time.time()
     try:
-        from redis_utils import redis_client, REDIS_AVAILABLE
-        if not REDIS_AVAILABLE or redis_client is None:
+        from redis_utils import redis_client, ping_redis
+        if redis_client is None:
             return {"status": "disabled", "message": "Redis not configured"}
-        redis_client.ping()
+        if not ping_redis():
+            return {"status": "unhealthy", "circuit": redis_breaker.state}
         latency = round((time.time() - start) * 1000, 2)
-        return {"status": "healthy", "latency_ms": latency}
+        return {"status": "healthy", "latency_ms": latency, "circuit": redis_breaker.state}
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
 
@@ -270,7 +272,8 @@ async def health_check():
         "timestamp": datetime.utcnow().isoformat() + "Z",
         "version": "1.0.5",
         "services": services,
-        "rate_limiting": "enabled" if REDIS_AVAILABLE else "disabled"
+        "rate_limiting": ("redis" if services["redis"]["status"] == "healthy" else "local") if RATE_LIMIT_ENABLED else "disabled",
+        "cache": get_cache_stats()
     }
 
 @app.get("/api")
@@ -338,6 +341,32 @@ async def upload_file(file: UploadFile = File(...), bucket: str = "os-photos"):
         logger.error(f"Upload failed: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+# Local blob store files (dev / no Supabase). Supabase serves its own public URLs.
+@app.get("/api/blobs/{bucket}/{key:path}")
+def get_blob(bucket: str, key: str):
+    from blob_store import get_blob_store, LocalBlobStore
+    from supabase_storage import BUCKETS, PRIVATE_BUCKETS
+    import mimetypes
+
+    if bucket not in BUCKETS.values() or bucket in PRIVATE_BUCKETS:
+        raise HTTPException(status_code=404, detail="Not found")
+    store = get_blob_store(bucket)
+    if not isinstance(store, LocalBlobStore):
+        raise HTTPException(status_code=404, detail="Not found")
+    try:
+        content = store.get(key)
+    except ValueError:
+        content = None
+    if content is None:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    # Keys are content-addressed, so the bytes never change
+    return Response(
+        content=content,
+        media_type=mimetypes.guess_type(key)[0] or "application/octet-stream",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
 # Include Routers
 app.include_router(auth_router, prefix="/api")
 app.include_router(solicitacoes_router, prefix="/api")
@@ -346,6 +375,7 @@ app.include_router(dashboard_router, prefix="/api")
 app.include_router(clientes_router, prefix="/api")
 app.include_router(extra_router, prefix="/api")
 app.include_router(equipamentos_router, prefix="/api")
+app.include_router(busca_router, prefix="/api")
 app.include_router(notifications_router)
 app.include_router(maintenance_router)
 app.include_router(cron_router, prefix="/api")
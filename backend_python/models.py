@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Float, Text, JSON, Index
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy import event, inspect, insert, select
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -34,6 +35,32 @@ class SystemSettings(Base):
     certificate_path = Column(String, nullable=True)
     certificate_password = Column(String, nullable=True)
 
+class IdCounter(Base):
+    __tablename__ = "id_counters"
+
+    name = Column(String, primary_key=True) # e.g. "service_orders", "clients"
+    value = Column(Integer, nullable=False, default=0) # Último ID reservado
+
+class StatCounter(Base):
+    """Contadores mantidos incrementalmente (dashboards). Reconciliados por cron."""
+    __tablename__ = "stat_counters"
+
+    name = Column(String, primary_key=True) # e.g. "orders:total", "orders:status:agendado"
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class OrderDailyStats(Base):
+    """Rollup diário de OS (abertas, concluídas, receita) por tipo de serviço e técnico"""
+    __tablename__ = "order_daily_stats"
+
+    day = Column(Date, primary_key=True) # UTC
+    service_type = Column(String, primary_key=True, default="") # "" when unset
+    user_id = Column(Integer, primary_key=True, default=0) # 0 when unassigned
+
+    opened = Column(Integer, nullable=False, default=0) # Created that day
+    completed = Column(Integer, nullable=False, default=0) # completed_at that day
+    revenue = Column(Float, nullable=False, default=0.0) # valor_total of the completed ones
+
 class User(Base):
     __tablename__ = "users"
 
@@ -163,6 +190,12 @@ class Equipment(Base):
 
 class ServiceOrder(Base):
     __tablename__ = "service_orders"
+    __table_args__ = (
+        # Keyset pagination (ORDER BY created_at DESC, id DESC)
+        Index("ix_service_orders_created_at_id", "created_at", "id"),
+        # Technician delta sync (WHERE user_id = ? AND updated_at > ?)
+        Index("ix_service_orders_user_id_updated_at", "user_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     sequential_id = Column(Integer, nullable=True) # User-facing ID
@@ -186,6 +219,7 @@ class ServiceOrder(Base):
     data_inicio_real = Column(DateTime, nullable=True)
     data_fim_real = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Valores
     valor_total = Column(Float, default=0.0)
@@ -202,16 +236,61 @@ class ServiceOrder(Base):
     location = relationship("Location", back_populates="service_orders")
     equipment = relationship("Equipment", back_populates="service_orders")
     itens_os = relationship("ItemOS", back_populates="service_order", cascade="all, delete-orphan")
+    photos = relationship("ServiceOrderPhoto", back_populates="service_order", cascade="all, delete-orphan",
+                          order_by="ServiceOrderPhoto.id")
 
     # JSON
-    fotos_os = Column(JSON, nullable=True)
-    historico_json = Column(JSON, nullable=True)
+    fotos_os = deferred(Column(JSON, nullable=True)) # Legacy (could hold base64 images); photos now live in service_order_photos
+    historico_json = Column(JSON, nullable=True) # Legacy; history now lives in service_order_events
     nfse_json = Column(JSON, nullable=True)
 
     # Assinaturas
     assinatura_cliente = Column(Text, nullable=True)
     assinatura_tecnico = Column(Text, nullable=True)
 
+class ServiceOrderPhoto(Base):
+    """Foto de OS: apenas URLs do storage (o arquivo fica no blob store)"""
+    __tablename__ = "service_order_photos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("service_orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    url = Column(String, nullable=False)
+    thumbnail_url = Column(String, nullable=True)
+    description = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    service_order = relationship("ServiceOrder", back_populates="photos")
+
+class ServiceOrderEvent(Base):
+    """Histórico da OS: um evento por linha (append-only)"""
+    __tablename__ = "service_order_events"
+    __table_args__ = (
+        Index("ix_service_order_events_order_id_id", "order_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("service_orders.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    tipo = Column(String, nullable=True) # e.g. "status", "nota", "conclusao"
+    descricao = Column(Text)
+    usuario = Column(String, nullable=True) # Display name at the time of the event
+
+class ServiceOrderTombstone(Base):
+    """Registro de OS removidas da lista de um técnico (exclusão ou reatribuição)"""
+    __tablename__ = "service_order_tombstones"
+    __table_args__ = (
+        Index("ix_service_order_tombstones_user_id_deleted_at", "user_id", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
 class ItemOS(Base):
     __tablename__ = "service_order_items"
 
@@ -244,3 +323,162 @@ class Notification(Base):
     user = relationship("User")
 
 
+# Tombstones for technician delta sync (ORM deletes and reassignments)
+@event.listens_for(ServiceOrder, "after_delete")
+def _tombstone_deleted_order(mapper, connection, target):
+    connection.execute(insert(ServiceOrderTombstone).values(
+        order_id=target.id, user_id=target.user_id, deleted_at=datetime.utcnow()
+    ))
+
+@event.listens_for(ServiceOrder, "after_update")
+def _tombstone_reassigned_order(mapper, connection, target):
+    history = inspect(target).attrs.user_id.history
+    for old_user_id in history.deleted or ():
+        if old_user_id is not None and old_user_id != target.user_id:
+            connection.execute(insert(ServiceOrderTombstone).values(
+                order_id=target.id, user_id=old_user_id, deleted_at=datetime.utcnow()
+            ))
+
+
+# ============= STAT COUNTERS =============
+# Applied on the flush connection, so they commit or roll back with the change itself.
+# Missing counter rows are left alone; the migration and reconcile_counters() seed them.
+
+def increment_counters(connection, deltas: dict):
+    for name, delta in deltas.items():
+        if delta:
+            connection.execute(
+                StatCounter.__table__.update()
+                .where(StatCounter.name == name)
+                .values(value=StatCounter.value + delta, updated_at=datetime.utcnow())
+            )
+
+def order_status_counter(status) -> str:
+    return f"orders:status:{status}"
+
+@event.listens_for(ServiceOrder, "after_insert")
+def _count_inserted_order(mapper, connection, target):
+    increment_counters(connection, {"orders:total": 1, order_status_counter(target.status): 1})
+
+@event.listens_for(ServiceOrder, "after_delete")
+def _count_deleted_order(mapper, connection, target):
+    increment_counters(connection, {"orders:total": -1, order_status_counter(target.status): -1})
+
+@event.listens_for(ServiceOrder, "after_update")
+def _count_status_change(mapper, connection, target):
+    history = inspect(target).attrs.status.history
+    if not history.deleted or not history.added:
+        return
+    old_status, new_status = history.deleted[0], history.added[0]
+    if old_status != new_status:
+        increment_counters(connection, {
+            order_status_counter(old_status): -1,
+            order_status_counter(new_status): 1
+        })
+
+@event.listens_for(Client, "after_insert")
+def _count_inserted_client(mapper, connection, target):
+    increment_counters(connection, {"clients:total": 1})
+
+@event.listens_for(Client, "after_delete")
+def _count_deleted_client(mapper, connection, target):
+    increment_counters(connection, {"clients:total": -1})
+
+@event.listens_for(User, "after_insert")
+def _count_inserted_user(mapper, connection, target):
+    increment_counters(connection, {"users:total": 1})
+
+@event.listens_for(User, "after_delete")
+def _count_deleted_user(mapper, connection, target):
+    increment_counters(connection, {"users:total": -1})
+
+
+# ============= DAILY ROLLUPS =============
+# Each order contributes "opened" on its creation day and, once completed,
+# "completed" + revenue on its completion day. Changes replace the old
+# contribution with the new one on the flush connection.
+
+ROLLUP_ATTRS = ("created_at", "completed_at", "service_type", "user_id", "valor_total")
+
+def _rollup_contributions(values: dict, sign: int) -> dict:
+    deltas = {}
+    dims = (values["service_type"] or "", values["user_id"] or 0)
+    if values["created_at"]:
+        key = (values["created_at"].date(), *dims)
+        deltas[key] = [sign, 0, 0.0]
+    if values["completed_at"]:
+        key = (values["completed_at"].date(), *dims)
+        opened, _, _ = deltas.get(key, [0, 0, 0.0])
+        deltas[key] = [opened, sign, sign * float(values["valor_total"] or 0)]
+    return deltas
+
+def apply_rollup_deltas(connection, *contributions: dict):
+    merged = {}
+    for deltas in contributions:
+        for key, (opened, completed, revenue) in deltas.items():
+            total = merged.setdefault(key, [0, 0, 0.0])
+            total[0] += opened
+            total[1] += completed
+            total[2] += revenue
+
+    table = OrderDailyStats.__table__
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+
+    for (day, service_type, user_id), (opened, completed, revenue) in merged.items():
+        if not opened and not completed and not revenue:
+            continue
+        stmt = upsert(table).values(
+            day=day, service_type=service_type, user_id=user_id,
+            opened=opened, completed=completed, revenue=revenue
+        )
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.service_type, table.c.user_id],
+            set_={
+                "opened": table.c.opened + stmt.excluded.opened,
+                "completed": table.c.completed + stmt.excluded.completed,
+                "revenue": table.c.revenue + stmt.excluded.revenue,
+            }
+        ))
+
+def order_rollup_values(target) -> dict:
+    return {attr: getattr(target, attr) for attr in ROLLUP_ATTRS}
+
+@event.listens_for(ServiceOrder, "after_insert")
+def _rollup_inserted_order(mapper, connection, target):
+    apply_rollup_deltas(connection, _rollup_contributions(order_rollup_values(target), 1))
+
+@event.listens_for(ServiceOrder, "after_delete")
+def _rollup_deleted_order(mapper, connection, target):
+    apply_rollup_deltas(connection, _rollup_contributions(order_rollup_values(target), -1))
+
+@event.listens_for(ServiceOrder, "after_update")
+def _rollup_updated_order(mapper, connection, target):
+    state = inspect(target)
+    histories = {attr: state.attrs[attr].history for attr in ROLLUP_ATTRS}
+    if not any(h.has_changes() for h in histories.values()):
+        return
+
+    old, new = {}, {}
+    for attr, history in histories.items():
+        if history.deleted:
+            old[attr] = history.deleted[0]
+        elif history.unchanged:
+            old[attr] = history.unchanged[0]
+        else:
+            old[attr] = None # Not loaded before the change; reconciliation repairs it
+        new[attr] = history.added[0] if history.added else old[attr]
+
+    if new["completed_at"]:
+        # valor_total may have been set to a SQL expression; read what was stored
+        new["valor_total"] = connection.execute(
+            select(ServiceOrder.valor_total).where(ServiceOrder.id == target.id)
+        ).scalar()
+
+    apply_rollup_deltas(
+        connection,
+        _rollup_contributions(old, -1),
+        _rollup_contributions(new, 1)
+    )
@@ -4,10 +4,19 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
 from reportlab.lib.units import cm
 import io
+import os
+import json
+import hashlib
 import logging
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Iterable, Iterator, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Bump when the layout changes so cached PDFs are re-rendered
+PDF_TEMPLATE_VERSION = "2"
+
 def generate_os_pdf(os_data: dict, company_settings: dict):
     """
     Gera um PDF profissional para uma Ordem de Serviço ou Orçamento.
@@ -25,7 +34,7 @@ def generate_os_pdf(os_data: dict, company_settings: dict):
             'Header',
             parent=styles['Normal'],
             fontSize=16,
-            textColor=colors.hexColor("#1e293b"),
+            textColor=colors.HexColor("#1e293b"),
             spaceAfter=12,
             alignment=1, # Center
             fontName='Helvetica-Bold'
@@ -35,7 +44,7 @@ def generate_os_pdf(os_data: dict, company_settings: dict):
             'SubHeader',
             parent=styles['Normal'],
             fontSize=12,
-            textColor=colors.hexColor("#475569"),
+            textColor=colors.HexColor("#475569"),
             spaceAfter=6,
             fontName='Helvetica-Bold'
         )
@@ -44,7 +53,7 @@ def generate_os_pdf(os_data: dict, company_settings: dict):
             'Label',
             parent=styles['Normal'],
             fontSize=10,
-            textColor=colors.hexColor("#64748b"),
+            textColor=colors.HexColor("#64748b"),
             fontName='Helvetica-Bold'
         )
 
@@ -76,11 +85,11 @@ def generate_os_pdf(os_data: dict, company_settings: dict):
 
         # 3. Dados do Cliente
         elements.append(Paragraph("DADOS DO CLIENTE", subheader_style))
-        client = os_data.get("client", {})
+        client = os_data.get("cliente") or {}
         client_data = [
-            [Paragraph("Nome:", label_style), Paragraph(client.get("name", ""), value_style)],
-            [Paragraph("CPF/CNPJ:", label_style), Paragraph(client.get("document", ""), value_style)],
-            [Paragraph("Telefone:", label_style), Paragraph(client.get("phone", ""), value_style)],
+            [Paragraph("Nome:", label_style), Paragraph(client.get("nome") or "", value_style)],
+            [Paragraph("CPF/CNPJ:", label_style), Paragraph(client.get("documento") or "", value_style)],
+            [Paragraph("Telefone:", label_style), Paragraph(client.get("telefone") or "", value_style)],
         ]
         t_client = Table(client_data, colWidths=[4*cm, 12*cm])
         t_client.setStyle(TableStyle([
@@ -92,11 +101,11 @@ def generate_os_pdf(os_data: dict, company_settings: dict):
 
         # 4. Detalhes do Serviço / Equipamento
         elements.append(Paragraph("DETALHES DO SERVIÇO", subheader_style))
-        equipment = os_data.get("equipment", {})
+        equipment = os_data.get("equipamento") or {}
         service_data = [
-            [Paragraph("Equipamento:", label_style), Paragraph(equipment.get("name", "---"), value_style)],
-            [Paragraph("Marca/Modelo:", label_style), Paragraph(f"{equipment.get('brand','')} / {equipment.get('model','')}", value_style)],
-            [Paragraph("Descrição:", label_style), Paragraph(os_data.get("description", ""), value_style)],
+            [Paragraph("Equipamento:", label_style), Paragraph(equipment.get("nome") or "---", value_style)],
+            [Paragraph("Marca/Modelo:", label_style), Paragraph(f"{equipment.get('marca') or ''} / {equipment.get('modelo') or ''}", value_style)],
+            [Paragraph("Descrição:", label_style), Paragraph(os_data.get("description") or "", value_style)],
         ]
         t_service = Table(service_data, colWidths=[4*cm, 12*cm])
         t_service.setStyle(TableStyle([
@@ -108,23 +117,23 @@ def generate_os_pdf(os_data: dict, company_settings: dict):
 
         # 5. Itens e Valores
         elements.append(Paragraph("ITENS DO SERVIÇO", subheader_style))
-        items = os_data.get("itens_os", [])
+        items = os_data.get("itens") or []
         if items:
             table_data = [['Descrição', 'Qtd', 'Unitário', 'Total']]
             for item in items:
                 table_data.append([
-                    item.get("descricao_tarefa", ""),
-                    str(item.get("quantidade", 1)),
-                    f"R$ {item.get('valor_unitario', 0.0):.2f}",
-                    f"R$ {item.get('valor_total', 0.0):.2f}"
+                    item.get("descricao") or "",
+                    str(item.get("quantidade") or 1),
+                    f"R$ {item.get('valor_unitario') or 0.0:.2f}",
+                    f"R$ {item.get('valor_total') or 0.0:.2f}"
                 ])
 
-            table_data.append(['', '', 'TOTAL:', f"R$ {os_data.get('valor_total', 0.0):.2f}"])
+            table_data.append(['', '', 'TOTAL:', f"R$ {os_data.get('valor_total') or 0.0:.2f}"])
 
             t_items = Table(table_data, colWidths=[9*cm, 2*cm, 2.5*cm, 2.5*cm])
             t_items.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.hexColor("#f1f5f9")),
-                ('TEXTCOLOR', (0,0), (-1,0), colors.hexColor("#1e293b")),
+                ('BACKGROUND', (0,0), (-1,0), colors.HexColor("#f1f5f9")),
+                ('TEXTCOLOR', (0,0), (-1,0), colors.HexColor("#1e293b")),
                 ('ALIGN', (0,0), (-1,-1), 'LEFT'),
                 ('ALIGN', (1,0), (-1,-1), 'CENTER'),
                 ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
@@ -139,7 +148,7 @@ def generate_os_pdf(os_data: dict, company_settings: dict):
         elements.append(Spacer(1, 1*cm))
 
         # 6. Assinaturas (Se existirem)
-        if os_data.get("assinatura_cliente") or os_data.get("assinatura_tecnico"):
+        if os_data.get("client_signature") or os_data.get("tech_signature"):
              elements.append(Paragraph("ASSINATURAS", subheader_style))
              # Placeholder para fotos de assinaturas (Base64 ou URL)
              elements.append(Paragraph("Documento assinado digitalmente.", styles['Italic']))
@@ -152,3 +161,143 @@ def generate_os_pdf(os_data: dict, company_settings: dict):
     except Exception as e:
         logger.error(f"Erro ao gerar PDF: {e}")
         return None
+
+
+def pdf_cache_key(os_data: dict, company_settings: dict) -> str:
+    """Chave content-addressed: hash do documento da OS + dados da empresa + versão do layout"""
+    payload = json.dumps(
+        {"os": os_data, "company": company_settings, "template": PDF_TEMPLATE_VERSION},
+        sort_keys=True,
+        default=str
+    )
+    return f"pdf/{hashlib.sha256(payload.encode()).hexdigest()}.pdf"
+
+
+def get_or_generate_os_pdf(os_data: dict, company_settings: dict, store=None) -> Optional[bytes]:
+    """Retorna o PDF do blob store ou renderiza e grava (mesmo conteúdo -> mesma chave)"""
+    if store is None:
+        from blob_store import get_blob_store
+        store = get_blob_store("os-pdfs")
+
+    key = pdf_cache_key(os_data, company_settings)
+    cached = store.get(key)
+    if cached:
+        return cached
+
+    pdf_content = generate_os_pdf(os_data, company_settings)
+    if pdf_content:
+        store.put(key, pdf_content, "application/pdf")
+    return pdf_content
+
+
+# ==========================================
+# ZIP EXPORT (many PDFs)
+# ==========================================
+
+# Workers for bulk rendering (defaults to the CPU count)
+PDF_EXPORT_WORKERS = int(os.getenv("PDF_EXPORT_WORKERS", "0")) or (os.cpu_count() or 2)
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """Destino não-seekable do zipfile: acumula bytes até serem drenados"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _make_executor(max_workers: int):
+    # Serverless runtimes (e.g. Vercel/Lambda) lack POSIX semaphores for process pools
+    try:
+        return ProcessPoolExecutor(max_workers=max_workers)
+    except (OSError, NotImplementedError, ImportError) as e:
+        logger.warning(f"Process pool unavailable, rendering PDFs in threads: {e}")
+        return ThreadPoolExecutor(max_workers=max_workers)
+
+
+def iter_pdf_zip(
+    jobs: Iterable[Tuple[str, dict, dict]],
+    total: int,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    max_workers: int = PDF_EXPORT_WORKERS,
+    store=None
+) -> Iterator[bytes]:
+    """
+    Gera um ZIP em streaming a partir de (nome_arquivo, os_data, company_settings).
+    PDFs já presentes no blob store não são renderizados de novo; os demais são
+    renderizados em um pool de processos e gravados no ZIP conforme terminam.
+    No máximo 2x max_workers PDFs ficam em memória ao mesmo tempo.
+    """
+    if store is None:
+        from blob_store import get_blob_store
+        store = get_blob_store("os-pdfs")
+
+    buffer = _ZipStreamBuffer()
+    done = 0
+    max_in_flight = max_workers * 2
+
+    def add_to_zip(zf, filename, content):
+        nonlocal done
+        if content:
+            zf.writestr(filename, content)
+        else:
+            logger.error(f"PDF export: failed to render {filename}")
+        done += 1
+        if on_progress:
+            on_progress(done, total)
+
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as zf, \
+            _make_executor(max_workers) as executor:
+        in_flight = {}
+        jobs_iter = iter(jobs)
+        exhausted = False
+
+        while not exhausted or in_flight:
+            # Keep the pool busy without materializing every job
+            while not exhausted and len(in_flight) < max_in_flight:
+                try:
+                    filename, os_data, company_settings = next(jobs_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                key = pdf_cache_key(os_data, company_settings)
+                cached = store.get(key)
+                if cached:
+                    add_to_zip(zf, filename, cached)
+                    yield buffer.drain()
+                    continue
+
+                future = executor.submit(generate_os_pdf, os_data, company_settings)
+                in_flight[future] = (filename, key)
+
+            if not in_flight:
+                continue
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                filename, key = in_flight.pop(future)
+                content = future.result()
+                if content:
+                    store.put(key, content, "application/pdf")
+                add_to_zip(zf, filename, content)
+            yield buffer.drain()
+
+    # Central directory is written when the ZipFile closes
+    yield buffer.drain()
@@ -0,0 +1,83 @@
+"""
+Fotos de OS: armazenamento no blob store + miniaturas geradas no upload.
+"""
+import io
+import base64
+import hashlib
+import logging
+import mimetypes
+from typing import Optional, Tuple
+
+from blob_store import BlobStore, get_blob_store
+
+logger = logging.getLogger(__name__)
+
+PHOTO_BUCKET = "os-photos"
+
+# Lado maior da miniatura (px) e qualidade JPEG
+THUMBNAIL_SIZE = 320
+THUMBNAIL_QUALITY = 75
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    logger.warning("⚠️ Pillow not installed - photo thumbnails disabled (full image is used)")
+
+
+def make_thumbnail(content: bytes, size: int = THUMBNAIL_SIZE) -> Optional[bytes]:
+    """Reduz a imagem para JPEG de no máximo `size` px; None se não for possível"""
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        with Image.open(io.BytesIO(content)) as img:
+            img = ImageOps.exif_transpose(img)  # Fotos de celular vêm rotacionadas via EXIF
+            img.thumbnail((size, size))
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+            return buffer.getvalue()
+    except Exception as e:
+        logger.error(f"Thumbnail generation failed: {e}")
+        return None
+
+
+def decode_data_url(data_url: str) -> Optional[Tuple[bytes, str]]:
+    """'data:image/png;base64,...' -> (bytes, content_type)"""
+    if not data_url or not data_url.startswith("data:"):
+        return None
+    try:
+        header, encoded = data_url.split(",", 1)
+        content_type = header[5:].split(";")[0] or "application/octet-stream"
+        return base64.b64decode(encoded), content_type
+    except Exception as e:
+        logger.error(f"Invalid data URL: {e}")
+        return None
+
+
+def store_photo(content: bytes, content_type: str, store: Optional[BlobStore] = None) -> Tuple[str, str]:
+    """
+    Grava a foto e a miniatura (chaves pelo hash do conteúdo, então reenvios
+    não duplicam arquivos) e retorna (url, thumbnail_url).
+    """
+    store = store or get_blob_store(PHOTO_BUCKET)
+    digest = hashlib.sha256(content).hexdigest()
+    ext = mimetypes.guess_extension(content_type) or ".bin"
+
+    photo_key = f"fotos/{digest}{ext}"
+    if not store.exists(photo_key) and not store.put(photo_key, content, content_type):
+        raise RuntimeError("Falha ao gravar a foto")
+    url = store.public_url(photo_key)
+
+    thumbnail_url = url
+    thumb_key = f"thumbs/{digest}_{THUMBNAIL_SIZE}.jpg"
+    if store.exists(thumb_key):
+        thumbnail_url = store.public_url(thumb_key)
+    else:
+        thumbnail = make_thumbnail(content)
+        if thumbnail and store.put(thumb_key, thumbnail, "image/jpeg"):
+            thumbnail_url = store.public_url(thumb_key)
+
+    return url, thumbnail_url
@@ -1,8 +1,27 @@
 import crcmod
+import crcmod.predefined
+import io
 import logging
+from functools import lru_cache
+from typing import Optional
+
+import qrcode
+import qrcode.image.pure
+import qrcode.image.svg
 
 logger = logging.getLogger(__name__)
 
+# CRC16 do payload EMV: tabela construída uma única vez
+_crc16 = crcmod.predefined.mkCrcFun('crc-ccitt-false')
+
+# Entradas memoizadas (payloads e imagens de QR)
+PIX_CACHE_SIZE = 1024
+
+QRCODE_FORMATS = {
+    "png": ("image/png", qrcode.image.pure.PyPNGImage),
+    "svg": ("image/svg+xml", qrcode.image.svg.SvgPathImage),
+}
+
 class PixPayload:
     def __init__(self, chave_pix, valor, nome_recebedor, cidade_recebedor, txt_id="0500"):
         self.chave_pix = chave_pix
@@ -55,15 +74,36 @@ class PixPayload:
         )
 
         # Calcular CRC16
-        crc16_func = crcmod.predefined.mkCrcFun('crc-16-ccitt-false')
-        crc_val = hex(crc16_func(payload.encode('utf-8'))).upper().split('X')[-1].zfill(4)
+        crc_val = hex(_crc16(payload.encode('utf-8'))).upper().split('X')[-1].zfill(4)
 
         return f"{payload}{crc_val}"
 
+@lru_cache(maxsize=PIX_CACHE_SIZE)
+def _cached_payload(chave_pix, valor, nome_recebedor, cidade_recebedor, txt_id):
+    return PixPayload(chave_pix, valor, nome_recebedor, cidade_recebedor, txt_id).generate_payload()
+
 def generate_pix_payload(chave_pix, valor, nome_recebedor, cidade_recebedor, txt_id="OS000"):
+    """Payload PIX memoizado por (chave, valor, recebedor, cidade, txid)"""
     try:
-        pix = PixPayload(chave_pix, valor, nome_recebedor, cidade_recebedor, txt_id)
-        return pix.generate_payload()
+        return _cached_payload(chave_pix, valor, nome_recebedor, cidade_recebedor, txt_id)
     except Exception as e:
         logger.error(f"Erro ao gerar payload PIX: {e}")
         return None
+
+@lru_cache(maxsize=PIX_CACHE_SIZE)
+def _cached_qrcode(payload: str, formato: str) -> bytes:
+    _, image_factory = QRCODE_FORMATS[formato]
+    img = qrcode.make(payload, image_factory=image_factory)
+    buffer = io.BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+def generate_pix_qrcode(payload: str, formato: str = "png") -> Optional[bytes]:
+    """Imagem do QR Code (PNG ou SVG) para um payload PIX, memoizada"""
+    if formato not in QRCODE_FORMATS:
+        return None
+    try:
+        return _cached_qrcode(payload, formato)
+    except Exception as e:
+        logger.error(f"Erro ao gerar QR Code PIX: {e}")
+        return None
@@ -0,0 +1,98 @@
+"""
+Rate Limit Policies
+Limites por rota e por usuário aplicados pelo middleware (algoritmo em redis_utils).
+"""
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from jose import JWTError, jwt
+
+from auth import SECRET_KEY, ALGORITHM
+from redis_utils import check_rate_limit, acheck_rate_limit
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+DEFAULT_MAX_REQUESTS = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "1000"))
+DEFAULT_WINDOW_SECONDS = int(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60"))
+
+EXEMPT_PATHS = {"/", "/health", "/api/health", "/favicon.ico"}
+
+# (nome, prefixo da rota, métodos (None = todos), limite por usuário, limite anônimo (por IP), janela em s)
+# A primeira política que casar vale; cada uma tem seu próprio contador.
+RATE_LIMIT_POLICIES = [
+    ("login", "/api/token", {"POST"}, 10, 10, 60),
+    ("google", "/api/auth/google", {"POST"}, 10, 10, 60),
+    ("upload", "/api/upload", {"POST"}, 60, 10, 60),
+    ("exportar", "/api/solicitacoes/exportar/pdf", {"GET"}, 10, 2, 60),
+    ("busca", "/api/busca", None, 120, 30, 60),
+]
+DEFAULT_POLICY = ("api", "", None, DEFAULT_MAX_REQUESTS, DEFAULT_MAX_REQUESTS, DEFAULT_WINDOW_SECONDS)
+
+
+def match_policy(path: str, method: str) -> tuple:
+    for policy in RATE_LIMIT_POLICIES:
+        _, prefix, methods, *_ = policy
+        if path.startswith(prefix) and (methods is None or method in methods):
+            return policy
+    return DEFAULT_POLICY
+
+
+# Verifying the JWT signature dominates the limiter cost, so decoded tokens are
+# remembered (token -> (user id, exp)) until they expire
+TOKEN_CACHE_SIZE = 1024
+_token_ids = OrderedDict()
+_token_lock = threading.Lock()
+
+
+def request_user_id(authorization: Optional[str]) -> Optional[str]:
+    """ID do usuário do token Bearer, se válido (assinatura verificada, sem ir ao banco)"""
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    token = authorization[len("Bearer "):]
+    with _token_lock:
+        cached = _token_ids.get(token)
+    if cached is not None:
+        user_id, exp = cached
+        return user_id if exp is None or exp > time.time() else None
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    user_id = payload.get("id") or payload.get("sub")
+    user_id = str(user_id) if user_id else None
+    with _token_lock:
+        _token_ids[token] = (user_id, payload.get("exp"))
+        while len(_token_ids) > TOKEN_CACHE_SIZE:
+            _token_ids.popitem(last=False)
+    return user_id
+
+
+def _policy_identity(path: str, method: str, client_ip: str, authorization: Optional[str]) -> Tuple[str, int, int]:
+    """(chave do contador, limite, janela) para a requisição"""
+    name, _, _, user_limit, anon_limit, window_seconds = match_policy(path, method)
+    user_id = request_user_id(authorization)
+    if user_id:
+        return f"{name}:user:{user_id}", user_limit, window_seconds
+    return f"{name}:ip:{client_ip}", anon_limit, window_seconds
+
+
+def check_request(path: str, method: str, client_ip: str, authorization: Optional[str]) -> Tuple[bool, int, float, int]:
+    """
+    Aplica a política da rota ao usuário autenticado (ou ao IP, se anônimo).
+    Retorna (permitido, restantes, retry_after em s, limite).
+    """
+    identity, limit, window_seconds = _policy_identity(path, method, client_ip, authorization)
+    allowed, remaining, retry_after = check_rate_limit(identity, max_requests=limit, window_seconds=window_seconds)
+    return allowed, remaining, retry_after, limit
+
+
+async def acheck_request(path: str, method: str, client_ip: str, authorization: Optional[str]) -> Tuple[bool, int, float, int]:
+    """Versão assíncrona de check_request, para o middleware"""
+    identity, limit, window_seconds = _policy_identity(path, method, client_ip, authorization)
+    allowed, remaining, retry_after = await acheck_rate_limit(identity, max_requests=limit, window_seconds=window_seconds)
+    return allowed, remaining, retry_after, limit
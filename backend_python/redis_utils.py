@@ -2,61 +2,152 @@
 Redis Utilities - Simplified for Single Tenant
 """
 import redis
-import json
+import redis.asyncio as aioredis
 import os
+import math
+import asyncio
+import time
+import uuid
+import random
 import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 from functools import wraps
 from typing import Any, Optional, Callable
 import logging
 
+from cache_codec import encode as encode_value, decode as decode_value
+
 logger = logging.getLogger(__name__)
 
 # Redis Connection
 # Priority: 1. REDIS_URL, 2. KV_URL (Vercel Upstash), 3. Individual parameters
+# Nothing is contacted at import: the client connects on first use and
+# redis_breaker decides whether Redis is tried at all. Without any of these
+# variables there is no client and the cache/rate limit run locally.
 REDIS_URL = os.getenv("REDIS_URL") or os.getenv("KV_URL", "")
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", "")
+REDIS_CONFIGURED = bool(REDIS_URL or os.getenv("REDIS_HOST"))
+REDIS_CONNECT_TIMEOUT_SECONDS = float(os.getenv("REDIS_CONNECT_TIMEOUT_SECONDS", "2"))  # Short timeout for Vercel
+REDIS_SOCKET_TIMEOUT_SECONDS = float(os.getenv("REDIS_SOCKET_TIMEOUT_SECONDS", "2"))
 
-redis_client = None
-REDIS_AVAILABLE = False
+_connection_options = {
+    "decode_responses": False,  # Cache values are binary (cache_codec)
+    "socket_connect_timeout": REDIS_CONNECT_TIMEOUT_SECONDS,
+    "socket_timeout": REDIS_SOCKET_TIMEOUT_SECONDS
+}
 
-if REDIS_URL:
-    # Use REDIS_URL if provided (highest priority)
-    try:
-        redis_client = redis.from_url(
-            REDIS_URL, 
-            decode_responses=True, 
-            socket_connect_timeout=2
-        )
-        redis_client.ping()
-        REDIS_AVAILABLE = True
-        logger.info("✅ Redis connected via REDIS_URL")
-    except Exception as e:
-        logger.warning(f"⚠️ Redis connection failed (REDIS_URL): {e}")
-        REDIS_AVAILABLE = False
-        redis_client = None
-else:
-    # Fallback to individual parameters
-    REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-    REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
-    REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", "")
-    
-    try:
+redis_client = None
+try:
+    if REDIS_URL:
+        redis_client = redis.from_url(REDIS_URL, **_connection_options)
+    elif REDIS_CONFIGURED:
         redis_client = redis.Redis(
             host=REDIS_HOST,
             port=REDIS_PORT,
             password=REDIS_PASSWORD if REDIS_PASSWORD else None,
-            decode_responses=True,
-            socket_connect_timeout=2  # Short timeout for Vercel
+            **_connection_options
         )
+    else:
+        logger.info("ℹ️ Redis not configured: using the in-process cache only")
+except Exception as e:
+    logger.warning(f"⚠️ Invalid Redis configuration: {e}")
+
+# ==========================================
+# CIRCUIT BREAKER
+# ==========================================
+# closed: Redis is used. After BREAKER_FAILURE_THRESHOLD consecutive connection
+# failures the circuit opens and every call skips Redis (local cache / local
+# rate limit) without waiting on timeouts. After BREAKER_RESET_SECONDS one call
+# is let through (half-open): success closes the circuit, failure reopens it.
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("REDIS_BREAKER_FAILURES", "3"))
+BREAKER_RESET_SECONDS = float(os.getenv("REDIS_BREAKER_RESET_SECONDS", "30"))
+
+class CircuitBreaker:
+    """Circuito closed -> open -> half_open -> closed, thread-safe"""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        with self._lock:
+            # Open long enough (or a half-open probe never reported back): probe again
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._opened_at = time.monotonic()
+                logger.info("Redis circuit half-open: probing")
+                return True
+            return False
+
+    def record_success(self) -> bool:
+        """Retorna True quando o circuito estava aberto/meio-aberto e acabou de fechar"""
+        if self.state == "closed" and self.failures == 0:
+            return False
+        with self._lock:
+            recovered = self.state != "closed"
+            if recovered:
+                logger.info("✅ Redis circuit closed")
+            self.state = "closed"
+            self.failures = 0
+            return recovered
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"⚠️ Redis circuit open for {self.reset_seconds:.0f}s after {self.failures} failure(s)")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+redis_breaker = CircuitBreaker()
+
+def redis_available() -> bool:
+    """Redis configurado e circuito fechado (ou esta chamada é a sonda da meia-abertura)"""
+    if redis_client is None or not redis_breaker.allow():
+        return False
+    if redis_breaker.state == "half_open" and _pending_invalidations:
+        # The probe replays missed invalidations before anything is read
+        return _flush_pending_invalidations()
+    return True
+
+def _redis_ok():
+    if redis_breaker.record_success():
+        _flush_pending_invalidations()
+
+class RedisPoolExhausted(redis.exceptions.ConnectionError):
+    """Nenhuma conexão do pool liberou a tempo: estamos ocupados, o Redis não caiu"""
+
+def _redis_error(error: Exception):
+    # Only connectivity problems count; a bad command or a busy pool does not mean Redis is down
+    if isinstance(error, RedisPoolExhausted):
+        return
+    if isinstance(error, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError, OSError)):
+        redis_breaker.record_failure()
+
+def ping_redis() -> bool:
+    if not redis_available():
+        return False
+    try:
         redis_client.ping()
-        REDIS_AVAILABLE = True
-        logger.info(f"✅ Redis connected via parameters ({REDIS_HOST}:{REDIS_PORT})")
+        _redis_ok()
+        return True
     except Exception as e:
-        logger.warning(f"⚠️ Redis not available (no valid config): {e}")
-        REDIS_AVAILABLE = False
-        redis_client = None
-
-if not REDIS_AVAILABLE:
-    logger.info("ℹ️ Rate limiting and caching disabled (Redis not configured)")
+        _redis_error(e)
+        logger.warning(f"⚠️ Redis ping failed: {e}")
+        return False
 
 # ==========================================
 # CACHE UTILITIES
@@ -67,73 +158,784 @@ def cache_key(prefix: str, *args, **kwargs) -> str:
     key_data = f"{args}:{sorted(kwargs.items())}"
     return f"cache:{prefix}:{hashlib.md5(key_data.encode()).hexdigest()}"
 
-def get_cache(key: str) -> Optional[Any]:
-    if not REDIS_AVAILABLE:
+# Namespace generations: every "cache:a:b:c" value is stamped with the current
+# generation of "a", "a:b" and "a:b:c" (plus those of any extra tags, e.g.
+# "orders" for a key under "dashboard"). Invalidating a namespace replaces its
+# generation (one SET), so older entries no longer match their stamp and are
+# never read again. Generations are random tokens, never reused even if a
+# generation key expires.
+# The scripts only touch the key and its gen:* keys, all passed in KEYS
+# (required by Redis Cluster and by Upstash's script key checks).
+GEN_TTL_SECONDS = 7 * 24 * 3600  # Must outlive any cache TTL
+
+_STAMP = """
+local stamp = ""
+for i = 2, #KEYS do
+    stamp = stamp .. "@" .. (redis.call("GET", KEYS[i]) or "0")
+end
+stamp = stamp .. "|"
+"""
+_GET_SCRIPT = _STAMP + """
+local value = redis.call("GET", KEYS[1])
+if not value or string.sub(value, 1, #stamp) ~= stamp then
+    return false
+end
+return string.sub(value, #stamp + 1)
+"""
+_SET_SCRIPT = _STAMP + 'return redis.call("SET", KEYS[1], stamp .. ARGV[1], "EX", ARGV[2])'
+
+_scripts = {}
+
+def _script(source: str):
+    # Registered lazily; redis-py runs them with EVALSHA and reloads when needed
+    if source not in _scripts:
+        _scripts[source] = redis_client.register_script(source)
+    return _scripts[source]
+
+def _namespaces(key: str, tags=()) -> list:
+    """'cache:orders:detail:12' -> orders, orders:detail, orders:detail:12 (e o mesmo para cada tag)"""
+    names = [key[len("cache:"):]] if key.startswith("cache:") else []
+    namespaces = {}
+    for name in [*names, *tags]:
+        parts = name.split(":")
+        for i in range(1, len(parts) + 1):
+            namespaces[":".join(parts[:i])] = None
+    return list(namespaces)
+
+def _script_keys(key: str, namespaces: list) -> list:
+    """Todas as chaves que os scripts de cache acessam: a própria chave e as gerações"""
+    return [key, *[f"gen:{namespace}" for namespace in namespaces]]
+
+# ==========================================
+# LOCAL LAYER (in-process LRU in front of Redis)
+# ==========================================
+# Hot keys are served from memory for up to LOCAL_TTL_SECONDS. Invalidations are
+# broadcast on INVALIDATION_CHANNEL so every worker drops its local copies; the
+# short local TTL bounds staleness if a message is missed. Without Redis the
+# local layer keeps working on its own (per worker).
+
+LOCAL_TTL_SECONDS = int(os.getenv("CACHE_LOCAL_TTL_SECONDS", "10"))
+LOCAL_MAX_ENTRIES = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", "1000"))
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+class LocalCache:
+    """LRU em memória com TTL por entrada (thread-safe); guarda o payload já codificado"""
+
+    def __init__(self, max_entries: int = LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expira em (monotonic), payload, namespaces)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, payload: bytes, ttl_seconds: int, namespaces=()):
+        if ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl_seconds, payload, frozenset(namespaces))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, namespace: str):
+        """Remove as chaves do namespace (mesma regra das gerações no Redis)"""
+        with self._lock:
+            for key in [k for k, item in self._data.items() if namespace in item[2]]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+local_cache = LocalCache()
+
+_cache_stats = {"local_hits": 0, "local_misses": 0, "redis_hits": 0, "redis_misses": 0, "redis_errors": 0}
+
+_subscriber = None
+_subscriber_lock = threading.Lock()
+
+def _on_invalidation(message):
+    local_cache.invalidate(message["data"].decode())
+
+def _on_subscriber_error(error, pubsub, thread):
+    global _subscriber
+    logger.warning(f"⚠️ Cache invalidation listener stopped: {error}")
+    _redis_error(error)
+    thread.stop()
+    pubsub.close()
+    with _subscriber_lock:
+        _subscriber = None  # Restarted on the next cache access
+    local_cache.clear()  # Invalidations may have been missed meanwhile
+
+def _ensure_subscriber():
+    """Inicia (uma vez por processo) a thread que escuta as invalidações"""
+    global _subscriber
+    if _subscriber is not None or redis_client is None or redis_breaker.state != "closed":
+        return
+    with _subscriber_lock:
+        if _subscriber is not None:
+            return
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: _on_invalidation})
+            _subscriber = pubsub.run_in_thread(
+                sleep_time=1.0, daemon=True, exception_handler=_on_subscriber_error
+            )
+        except Exception as e:
+            _redis_error(e)
+            logger.error(f"Erro ao assinar invalidações de cache: {e}")
+
+def _local_get(key: str) -> Optional[bytes]:
+    payload = local_cache.get(key)
+    _cache_stats["local_hits" if payload is not None else "local_misses"] += 1
+    return payload
+
+def _redis_read(key: str, value: Optional[bytes], local: bool, namespaces: list) -> Optional[Any]:
+    """Contabiliza a leitura do Redis e popula a camada local"""
+    if not value:
+        _cache_stats["redis_misses"] += 1
         return None
+    _cache_stats["redis_hits"] += 1
+    if local:
+        local_cache.set(key, value, LOCAL_TTL_SECONDS, namespaces)
+    return decode_value(value)
+
+def _normalize_namespace(namespace: str) -> str:
+    return namespace[len("cache:"):] if namespace.startswith("cache:") else namespace
+
+def get_cache(key: str, local: bool = True, tags=()) -> Optional[Any]:
+    """
+    Lê da camada local e depois do Redis; local=False consulta sempre o Redis.
+    `tags`: namespaces extras que também invalidam a chave (os mesmos do set_cache).
+    """
+    if local:
+        payload = _local_get(key)
+        if payload is not None:
+            return decode_value(payload)
+    if not redis_available():
+        return None
+    _ensure_subscriber()
+    namespaces = _namespaces(key, tags)
     try:
-        value = redis_client.get(key)
-        if value:
-            return json.loads(value)
+        value = _script(_GET_SCRIPT)(keys=_script_keys(key, namespaces))
+        _redis_ok()
+        return _redis_read(key, value, local, namespaces)
     except Exception as e:
+        _cache_stats["redis_errors"] += 1
+        _redis_error(e)
         logger.error(f"Erro ao ler cache: {e}")
     return None
 
-def set_cache(key: str, value: Any, ttl_seconds: int = 300) -> bool:
-    if not REDIS_AVAILABLE:
+def set_cache(key: str, value: Any, ttl_seconds: int = 300, local: bool = True, tags=()) -> bool:
+    try:
+        payload = encode_value(key, value)
+    except Exception as e:
+        logger.error(f"Erro ao salvar cache: {e}")
         return False
+    namespaces = _namespaces(key, tags)
+    if local:
+        local_cache.set(key, payload, min(ttl_seconds, LOCAL_TTL_SECONDS), namespaces)
+    if not redis_available():
+        return local
+    _ensure_subscriber()
     try:
-        redis_client.setex(key, ttl_seconds, json.dumps(value, default=str))
+        _script(_SET_SCRIPT)(keys=_script_keys(key, namespaces), args=[payload, ttl_seconds])
+        _redis_ok()
         return True
     except Exception as e:
+        _cache_stats["redis_errors"] += 1
+        _redis_error(e)
         logger.error(f"Erro ao salvar cache: {e}")
+        return local
+
+def _queue_invalidations(pipe, namespaces: list):
+    for namespace in namespaces:
+        pipe.set(f"gen:{namespace}", uuid.uuid4().hex[:12], ex=GEN_TTL_SECONDS)
+        pipe.publish(INVALIDATION_CHANNEL, namespace)
+
+# Invalidations that could not reach Redis (circuit open or error) are replayed
+# when it recovers, so entries written before the outage are not served again.
+MAX_PENDING_INVALIDATIONS = 1000
+_pending_invalidations = set()
+_pending_lock = threading.Lock()
+
+def _defer_invalidations(namespaces: list):
+    with _pending_lock:
+        _pending_invalidations.update(namespaces)
+        if len(_pending_invalidations) > MAX_PENDING_INVALIDATIONS:
+            # Too many to track: fall back to the top-level namespaces (coarser, still correct)
+            top_level = {namespace.split(":")[0] for namespace in _pending_invalidations}
+            _pending_invalidations.clear()
+            _pending_invalidations.update(top_level)
+
+def _take_pending_invalidations() -> list:
+    with _pending_lock:
+        pending = list(_pending_invalidations)
+        _pending_invalidations.clear()
+    return pending
+
+def _flush_pending_invalidations() -> bool:
+    pending = _take_pending_invalidations()
+    if not pending:
+        return True
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        _queue_invalidations(pipe, pending)
+        pipe.execute()
+        redis_breaker.record_success()
+        logger.info(f"Replayed {len(pending)} cache invalidation(s) after Redis recovery")
+        return True
+    except Exception as e:
+        _defer_invalidations(pending)
+        _redis_error(e)
+        logger.error(f"Erro ao limpar cache: {e}")
         return False
 
-def delete_cache(pattern: str) -> int:
-    """Remove chaves do cache que correspondem ao padrão"""
-    if not REDIS_AVAILABLE:
+def delete_cache(*namespaces: str) -> int:
+    """
+    Invalida todas as chaves de cada namespace (ex.: "orders", "orders:detail:12")
+    com uma única escrita, independente do tamanho do keyspace, e avisa os
+    demais workers para descartarem suas cópias locais. Um round trip no total.
+    """
+    namespaces = [_normalize_namespace(namespace) for namespace in namespaces]
+    for namespace in namespaces:
+        local_cache.invalidate(namespace)
+    if not redis_available():
+        _defer_invalidations(namespaces)
         return 0
     try:
-        count = 0
-        for key in redis_client.scan_iter(match=f"cache:*{pattern}*"):
-            redis_client.delete(key)
-            count += 1
-        return count
+        pipe = redis_client.pipeline(transaction=False)
+        _queue_invalidations(pipe, namespaces)
+        pipe.execute()
+        _redis_ok()
+        return len(namespaces)
     except Exception as e:
+        _cache_stats["redis_errors"] += 1
+        _redis_error(e)
+        _defer_invalidations(namespaces)
         logger.error(f"Erro ao limpar cache: {e}")
     return 0
 
+def get_cache_stats() -> dict:
+    """Acertos/erros por camada"""
+    return {
+        "mode": "two-tier" if redis_client is not None and redis_breaker.state == "closed" else "local-only",
+        "circuit": redis_breaker.state,
+        "local": {
+            "hits": _cache_stats["local_hits"],
+            "misses": _cache_stats["local_misses"],
+            "entries": len(local_cache),
+            "max_entries": local_cache.max_entries,
+            "ttl_seconds": LOCAL_TTL_SECONDS
+        },
+        "redis": {
+            "hits": _cache_stats["redis_hits"],
+            "misses": _cache_stats["redis_misses"],
+            "errors": _cache_stats["redis_errors"]
+        },
+        "routes": get_route_cache_stats()
+    }
+
+# ==========================================
+# SINGLE-FLIGHT / STALE-WHILE-REVALIDATE
+# ==========================================
+# get_or_compute() stores {"v": value, "delta": compute time, "exp": logical expiry}
+# and keeps the key STALE_TTL_SECONDS past "exp". Refreshes start early with a
+# probability that grows as expiry nears (XFetch), and only one caller
+# recomputes: a Redis lock across workers plus a Future within the process.
+# Everyone else gets the stale value, or waits for the first fill on a cold miss.
+
+STALE_TTL_SECONDS = int(os.getenv("CACHE_STALE_TTL_SECONDS", "300"))
+LOCK_TIMEOUT_SECONDS = 30  # Longest a recompute may hold the lock
+LOCK_WAIT_SECONDS = 5  # Cold miss: how long to wait for another worker's fill
+XFETCH_BETA = 1.0  # > 1 refreshes earlier, < 1 later
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _read_entry(key: str) -> Optional[dict]:
+    entry = get_cache(key)
+    # Values written by set_cache() (no envelope) count as a miss
+    if isinstance(entry, dict) and "v" in entry and "exp" in entry:
+        return entry
+    return None
+
+def _should_refresh(entry: dict, beta: float) -> bool:
+    """XFetch: refresh early with probability rising as expiry approaches"""
+    delta = entry.get("delta") or 0.0
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= entry["exp"]
+
+def _compute_and_store(key: str, compute: Callable[[], Any], ttl_seconds: int, stale_ttl_seconds: int) -> Any:
+    start = time.perf_counter()
+    value = compute()
+    entry = {"v": value, "delta": round(time.perf_counter() - start, 4), "exp": time.time() + ttl_seconds}
+    set_cache(key, entry, ttl_seconds=ttl_seconds + stale_ttl_seconds)
+    return value
+
+def _single_flight(key: str, fn: Callable[[], Any]) -> Any:
+    """Runs fn once per key per process; concurrent callers share the result"""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[key] = future
+    if not owner:
+        return future.result()
+    try:
+        result = fn()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+def get_or_compute(
+    key: str,
+    compute: Callable[[], Any],
+    ttl_seconds: int = 60,
+    stale_ttl_seconds: int = STALE_TTL_SECONDS,
+    beta: float = XFETCH_BETA
+) -> Any:
+    """
+    Lê `key` do cache ou recalcula com `compute()`, sem estouro de recomputações
+    simultâneas (cache stampede) quando a chave expira ou é invalidada.
+    """
+    entry = _read_entry(key)
+    if entry is not None and not _should_refresh(entry, beta):
+        return entry["v"]
+
+    if entry is not None:
+        with _inflight_lock:
+            refreshing_here = key in _inflight
+        if refreshing_here:
+            return entry["v"]
+
+    def refresh():
+        if not redis_available():
+            return _compute_and_store(key, compute, ttl_seconds, stale_ttl_seconds)
+
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = redis_client.set(lock_key, token, nx=True, ex=LOCK_TIMEOUT_SECONDS)
+            _redis_ok()
+        except Exception as e:
+            _redis_error(e)
+            logger.error(f"Erro ao obter lock de cache: {e}")
+            acquired = True  # Redis trouble: just compute
+            token = None
+
+        if acquired:
+            try:
+                return _compute_and_store(key, compute, ttl_seconds, stale_ttl_seconds)
+            finally:
+                if token:
+                    try:
+                        redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                    except Exception as e:
+                        _redis_error(e)
+                        logger.error(f"Erro ao liberar lock de cache: {e}")
+
+        # Another worker is recomputing
+        if entry is not None:
+            return entry["v"]
+        deadline = time.monotonic() + LOCK_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            fresh = _read_entry(key)
+            if fresh is not None:
+                return fresh["v"]
+        # Lock holder is too slow (or died): compute ourselves
+        return _compute_and_store(key, compute, ttl_seconds, stale_ttl_seconds)
+
+    return _single_flight(key, refresh)
+
+# ==========================================
+# @cached ROUTE DECORATOR
+# ==========================================
+# Caches the JSON-ready response of a FastAPI handler. The key is
+# cache:<first tag>:<handler>:<hash of path/query params + vary_on>, so
+# delete_cache(<tag>) invalidates it; further tags add their generations.
+#
+#     @router.get("/clientes")
+#     @cached(ttl=300, tags=["clientes"])
+#     def list_clients(...): ...
+
+_route_stats = {}
+_route_stats_lock = threading.Lock()
+
+def _record_route(route: str, hit: bool, elapsed: float):
+    with _route_stats_lock:
+        stats = _route_stats.setdefault(route, {"hits": 0, "misses": 0, "hit_seconds": 0.0, "miss_seconds": 0.0})
+        if hit:
+            stats["hits"] += 1
+            stats["hit_seconds"] += elapsed
+        else:
+            stats["misses"] += 1
+            stats["miss_seconds"] += elapsed
+
+def get_route_cache_stats() -> dict:
+    """Acertos/erros e latência média (ms) por rota decorada com @cached"""
+    with _route_stats_lock:
+        return {
+            route: {
+                "hits": stats["hits"],
+                "misses": stats["misses"],
+                "hit_ratio": round(stats["hits"] / max(stats["hits"] + stats["misses"], 1), 4),
+                "avg_hit_ms": round(stats["hit_seconds"] * 1000 / max(stats["hits"], 1), 3),
+                "avg_miss_ms": round(stats["miss_seconds"] * 1000 / max(stats["misses"], 1), 3)
+            }
+            for route, stats in _route_stats.items()
+        }
+
+def _key_params(func: Callable) -> list:
+    """Parâmetros de path/query/body do handler (dependências ficam de fora)"""
+    from fastapi import params, Request, BackgroundTasks
+    from starlette.responses import Response
+    return [
+        name for name, param in inspect.signature(func).parameters.items()
+        if not isinstance(param.default, params.Depends)
+        and param.annotation not in (Request, Response, BackgroundTasks)
+    ]
+
+def cached(ttl: int = 60, tags: Optional[list] = None, vary_on: tuple = ("role",)):
+    """
+    Decorator de cache para handlers FastAPI (sync ou async).
+
+    ttl: segundos no Redis. tags: namespaces que invalidam a resposta; aceitam
+    parâmetros do handler (ex.: "orders:detail:{order_id}"). vary_on: "role"
+    e/ou "user" (de current_user) além dos parâmetros de path/query.
+    Respostas do tipo Response (arquivos, streams) não são cacheadas.
+    """
+    def decorator(func: Callable) -> Callable:
+        from fastapi.encoders import jsonable_encoder
+        from starlette.responses import Response
+
+        route = func.__name__
+        key_params = _key_params(func)
+        tag_templates = list(tags or [func.__module__])
+
+        def build_key(kwargs: dict):
+            parts = {name: jsonable_encoder(kwargs.get(name)) for name in key_params}
+            user = kwargs.get("current_user")
+            if "role" in vary_on:
+                parts["@role"] = getattr(user, "role", None)
+            if "user" in vary_on:
+                parts["@user"] = getattr(user, "id", None)
+            resolved = [tag.format(**kwargs) for tag in tag_templates]
+            return cache_key(f"{resolved[0]}:{route}", **parts), resolved[1:]
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                key, extra_tags = build_key(kwargs)
+                value = await aget_cache(key, tags=extra_tags)
+                if value is not None:
+                    _record_route(route, True, time.perf_counter() - start)
+                    return value
+                result = await func(*args, **kwargs)
+                if isinstance(result, Response):
+                    return result
+                value = jsonable_encoder(result)
+                await aset_cache(key, value, ttl_seconds=ttl, tags=extra_tags)
+                _record_route(route, False, time.perf_counter() - start)
+                return value
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            key, extra_tags = build_key(kwargs)
+            value = get_cache(key, tags=extra_tags)
+            if value is not None:
+                _record_route(route, True, time.perf_counter() - start)
+                return value
+            result = func(*args, **kwargs)
+            if isinstance(result, Response):
+                return result
+            value = jsonable_encoder(result)
+            set_cache(key, value, ttl_seconds=ttl, tags=extra_tags)
+            _record_route(route, False, time.perf_counter() - start)
+            return value
+        return wrapper
+
+    return decorator
+
 # ==========================================
 # STATS & MONITORING
 # ==========================================
 
 def get_redis_stats() -> dict:
-    if not REDIS_AVAILABLE:
-        return {"status": "offline"}
+    if not redis_available():
+        return {"status": "offline", "cache": get_cache_stats()}
     try:
         info = redis_client.info()
+        _redis_ok()
         return {
             "status": "online",
             "connected_clients": info.get("connected_clients", 0),
             "used_memory_human": info.get("used_memory_human", "N/A"),
-            "total_keys": redis_client.dbsize()
+            "total_keys": redis_client.dbsize(),
+            "cache": get_cache_stats()
         }
     except Exception as e:
+        _redis_error(e)
         return {"status": "error", "message": str(e)}
 
-def check_rate_limit(identifier: str, max_requests: int = 100, window_seconds: int = 60) -> tuple[bool, int]:
-    if not REDIS_AVAILABLE:
-        return True, max_requests
+# ==========================================
+# RATE LIMITING (GCRA)
+# ==========================================
+# Generic Cell Rate Algorithm: each key stores only its "theoretical arrival
+# time" (TAT). A request is allowed while TAT - now stays within the burst
+# window; one Lua call reads and updates it atomically using the Redis clock.
+# Without Redis (or when it fails) an in-process token bucket enforces the
+# same limits per worker.
+
+_GCRA_SCRIPT = """
+local t = redis.call("TIME")
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local tat = tonumber(redis.call("GET", KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval * cost
+local allow_at = new_tat - burst
+if allow_at > now then
+    return {0, 0, math.ceil(allow_at - now)}
+end
+redis.call("SET", KEYS[1], new_tat, "PX", math.ceil(new_tat - now))
+return {1, math.floor((burst - (new_tat - now)) / interval), 0}
+"""
+
+LOCAL_RATE_LIMIT_MAX_KEYS = 10000
+
+class TokenBucketLimiter:
+    """Token bucket em memória (fallback por worker), limitado a max_keys chaves"""
+
+    def __init__(self, max_keys: int = LOCAL_RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, último acesso (monotonic))
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, max_requests: int, window_seconds: float, cost: int = 1) -> tuple[bool, int, float]:
+        rate = max_requests / window_seconds  # tokens per second
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (max_requests, now))
+            tokens = min(max_requests, tokens + (now - last) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if allowed:
+            return True, int(tokens), 0.0
+        return False, 0, (cost - tokens) / rate
+
+local_rate_limiter = TokenBucketLimiter()
+
+def check_rate_limit(
+    identifier: str,
+    max_requests: int = 100,
+    window_seconds: int = 60,
+    cost: int = 1
+) -> tuple[bool, int, float]:
+    """
+    Permite até `max_requests` por `window_seconds` (com rajada do mesmo tamanho).
+    Retorna (permitido, restantes, segundos até a próxima tentativa).
+    """
     key = f"ratelimit:{identifier}"
+    if redis_available():
+        interval_ms = window_seconds * 1000 / max_requests
+        try:
+            allowed, remaining, retry_ms = _script(_GCRA_SCRIPT)(
+                keys=[key], args=[interval_ms, interval_ms * max_requests, cost]
+            )
+            _redis_ok()
+            return bool(allowed), int(remaining), retry_ms / 1000
+        except Exception as e:
+            _redis_error(e)
+            logger.error(f"Erro no rate limit: {e}")
+    return local_rate_limiter.hit(key, max_requests, window_seconds, cost)
+
+# ==========================================
+# ASYNC API (redis.asyncio)
+# ==========================================
+# For `async def` handlers and middleware: same keys, scripts and local layer
+# as the sync functions above, without blocking the event loop. Sync handlers
+# (run in the threadpool) and scripts keep using the sync API.
+
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "20"))
+REDIS_POOL_TIMEOUT_SECONDS = 5  # Wait for a free connection before failing
+
+_async_client = None
+_async_loop = None
+_async_scripts = {}
+
+class _BlockingConnectionPool(aioredis.BlockingConnectionPool):
+    """BlockingConnectionPool que sinaliza o pool esgotado com RedisPoolExhausted"""
+
+    async def get_connection(self, command_name, *keys, **options):
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        except redis.exceptions.ConnectionError as e:
+            # The wait for a free connection timed out (raised `from` asyncio.TimeoutError);
+            # a failed connect raises with its own cause and is left as is
+            if isinstance(e.__cause__, asyncio.TimeoutError):
+                raise RedisPoolExhausted(f"Redis pool exhausted ({self.max_connections} connections busy)") from e
+            raise
+
+def _make_async_client():
+    options = {
+        **_connection_options,
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "timeout": REDIS_POOL_TIMEOUT_SECONDS
+    }
+    if REDIS_URL:
+        pool = _BlockingConnectionPool.from_url(REDIS_URL, **options)
+    else:
+        pool = _BlockingConnectionPool(
+            host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD or None, **options
+        )
+    return aioredis.Redis(connection_pool=pool)
+
+def get_async_redis():
+    """Cliente assíncrono compartilhado (um pool por event loop)"""
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        _async_client = _make_async_client()
+        _async_loop = loop
+        _async_scripts.clear()
+    return _async_client
+
+def _ascript(source: str):
+    client = get_async_redis()
+    if source not in _async_scripts:
+        _async_scripts[source] = client.register_script(source)
+    return _async_scripts[source]
+
+async def aget_cache(key: str, local: bool = True, tags=()) -> Optional[Any]:
+    return (await aget_many([key], local=local, tags=tags))[0]
+
+async def aget_many(keys: list, local: bool = True, tags=()) -> list:
+    """Lê várias chaves; as que faltam na camada local vêm do Redis num único pipeline"""
+    results = [None] * len(keys)
+    missing = []
+    for i, key in enumerate(keys):
+        payload = _local_get(key) if local else None
+        if payload is not None:
+            results[i] = decode_value(payload)
+        else:
+            missing.append(i)
+    if not missing or not redis_available():
+        return results
+    _ensure_subscriber()
     try:
-        current = redis_client.get(key)
-        if current is None:
-            redis_client.setex(key, window_seconds, 1)
-            return True, max_requests - 1
-        current = int(current)
-        if current >= max_requests:
-            return False, 0
-        redis_client.incr(key)
-        return True, max_requests - current - 1
+        script = _ascript(_GET_SCRIPT)
+        namespaces = {i: _namespaces(keys[i], tags) for i in missing}
+        async with get_async_redis().pipeline(transaction=False) as pipe:
+            for i in missing:
+                await script(keys=_script_keys(keys[i], namespaces[i]), client=pipe)
+            values = await pipe.execute()
+        _redis_ok()
+        for i, value in zip(missing, values):
+            results[i] = _redis_read(keys[i], value, local, namespaces[i])
     except Exception as e:
-        logger.error(f"Erro no rate limit: {e}")
-        return True, max_requests
+        _cache_stats["redis_errors"] += 1
+        _redis_error(e)
+        logger.error(f"Erro ao ler cache: {e}")
+    return results
+
+async def aset_cache(key: str, value: Any, ttl_seconds: int = 300, local: bool = True, tags=()) -> bool:
+    try:
+        payload = encode_value(key, value)
+    except Exception as e:
+        logger.error(f"Erro ao salvar cache: {e}")
+        return False
+    namespaces = _namespaces(key, tags)
+    if local:
+        local_cache.set(key, payload, min(ttl_seconds, LOCAL_TTL_SECONDS), namespaces)
+    if not redis_available():
+        return local
+    _ensure_subscriber()
+    try:
+        await _ascript(_SET_SCRIPT)(keys=_script_keys(key, namespaces), args=[payload, ttl_seconds])
+        _redis_ok()
+        return True
+    except Exception as e:
+        _cache_stats["redis_errors"] += 1
+        _redis_error(e)
+        logger.error(f"Erro ao salvar cache: {e}")
+        return local
+
+async def adelete_cache(*namespaces: str) -> int:
+    """Versão assíncrona de delete_cache (todos os namespaces num único pipeline)"""
+    namespaces = [_normalize_namespace(namespace) for namespace in namespaces]
+    for namespace in namespaces:
+        local_cache.invalidate(namespace)
+    if not redis_available():
+        _defer_invalidations(namespaces)
+        return 0
+    try:
+        async with get_async_redis().pipeline(transaction=False) as pipe:
+            _queue_invalidations(pipe, namespaces)
+            await pipe.execute()
+        _redis_ok()
+        return len(namespaces)
+    except Exception as e:
+        _cache_stats["redis_errors"] += 1
+        _redis_error(e)
+        _defer_invalidations(namespaces)
+        logger.error(f"Erro ao limpar cache: {e}")
+    return 0
+
+async def acheck_rate_limit(
+    identifier: str,
+    max_requests: int = 100,
+    window_seconds: int = 60,
+    cost: int = 1
+) -> tuple[bool, int, float]:
+    """Versão assíncrona de check_rate_limit"""
+    key = f"ratelimit:{identifier}"
+    if redis_available():
+        interval_ms = window_seconds * 1000 / max_requests
+        try:
+            allowed, remaining, retry_ms = await _ascript(_GCRA_SCRIPT)(
+                keys=[key], args=[interval_ms, interval_ms * max_requests, cost]
+            )
+            _redis_ok()
+            return bool(allowed), int(remaining), retry_ms / 1000
+        except Exception as e:
+            _redis_error(e)
+            logger.error(f"Erro no rate limit: {e}")
+    return local_rate_limiter.hit(key, max_requests, window_seconds, cost)
@@ -42,6 +42,58 @@ async def trigger_maintenance_reminders(
         logger.error(f"❌ Cron Job Failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/reconcile-counters")
+def trigger_counter_reconciliation(
+    authorization: str = Header(None)
+):
+    """
+    Cron job endpoint to repair drift in the dashboard stat counters.
+    Should be called periodically (e.g. hourly).
+    """
+    cron_secret = os.getenv("CRON_SECRET")
+    if cron_secret:
+        if not authorization or authorization != f"Bearer {cron_secret}":
+            logger.warning(f"⚠️ Unauthorized Cron Job Attempt: {authorization}")
+            raise HTTPException(status_code=401, detail="Unauthorized")
+
+    logger.info("⏳ Cron Job Triggered: Stat Counter Reconciliation")
+
+    try:
+        from counter_utils import reconcile_counters
+        with Session(engine) as db:
+            drift = reconcile_counters(db)
+
+        return {"status": "success", "drift": drift}
+    except Exception as e:
+        logger.error(f"❌ Cron Job Failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/rebuild-analytics")
+def trigger_analytics_rebuild(
+    authorization: str = Header(None)
+):
+    """
+    Cron job endpoint to rebuild the daily analytics rollup from service_orders.
+    Repairs any drift from incremental updates; run nightly.
+    """
+    cron_secret = os.getenv("CRON_SECRET")
+    if cron_secret:
+        if not authorization or authorization != f"Bearer {cron_secret}":
+            logger.warning(f"⚠️ Unauthorized Cron Job Attempt: {authorization}")
+            raise HTTPException(status_code=401, detail="Unauthorized")
+
+    logger.info("⏳ Cron Job Triggered: Analytics Rollup Rebuild")
+
+    try:
+        from analytics_utils import rebuild_daily_stats
+        with Session(engine) as db:
+            rebuild_daily_stats(db)
+
+        return {"status": "success", "message": "Analytics rollup rebuilt"}
+    except Exception as e:
+        logger.error(f"❌ Cron Job Failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 async def process_maintenance_reminders(db: Session):
     """
     Core logic for checking maintenance reminders.
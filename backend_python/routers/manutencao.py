@@ -2,12 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
-from models import Client, Equipment, ServiceOrder
+from models import Client, Equipment, ServiceOrder, User
 from auth import get_current_user, get_operational_user
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 from sqlalchemy import func
-from redis_utils import get_cache, set_cache, delete_cache
+from redis_utils import cached
 
 router = APIRouter(prefix="/api/manutencao", tags=["Manutenção"])
 
@@ -17,15 +17,11 @@ class MaintenanceStats(BaseModel):
     total_equipamentos: int
 
 @router.get("/dashboard", response_model=MaintenanceStats)
+@cached(ttl=300, tags=["maintenance"])
 def get_maintenance_dashboard(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_operational_user)
 ):
-    cache_key = "cache:maintenance:dashboard"
-    cached = get_cache(cache_key)
-    if cached:
-        return cached
-
     today = datetime.utcnow()
     next_30 = today + timedelta(days=30)
     
@@ -61,25 +57,18 @@ def get_maintenance_dashboard(
 
     total = len(equipments)
 
-    result = {
+    return {
         "vencendo_30_dias": vencendo,
         "vencidas": vencidas,
         "total_equipamentos": total
     }
-    
-    set_cache(cache_key, result, ttl_seconds=300)
-    return result
 
 @router.get("/vencendo")
+@cached(ttl=300, tags=["maintenance"])
 def get_upcoming_maintenance(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_operational_user)
 ):
-    cache_key = "cache:maintenance:upcoming"
-    cached = get_cache(cache_key)
-    if cached:
-        return cached
-
     today = datetime.utcnow()
     next_30 = today + timedelta(days=30)
     interval_days = 180
@@ -110,5 +99,4 @@ def get_upcoming_maintenance(
                 "dias_restantes": (next_date - today).days
             })
 
-    set_cache(cache_key, result, ttl_seconds=300)
     return result
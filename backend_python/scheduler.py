@@ -89,6 +89,26 @@ async def check_maintenance_reminders():
     logger.info("=" * 50)
     logger.info("✅ Maintenance Check Complete.")
 
+def reconcile_stat_counters():
+    """Repairs drift in the dashboard stat counters"""
+    from counter_utils import reconcile_counters
+    with Session(engine) as db:
+        try:
+            reconcile_counters(db)
+        except Exception as e:
+            logger.error(f"❌ Error in reconcile_stat_counters: {e}")
+            db.rollback()
+
+def rebuild_analytics_rollup():
+    """Rebuilds the daily analytics rollup (repairs incremental drift)"""
+    from analytics_utils import rebuild_daily_stats
+    with Session(engine) as db:
+        try:
+            rebuild_daily_stats(db)
+        except Exception as e:
+            logger.error(f"❌ Error in rebuild_analytics_rollup: {e}")
+            db.rollback()
+
 def start_scheduler():
     """
     Start the AsyncIOScheduler for background tasks.
@@ -103,6 +123,24 @@ def start_scheduler():
         misfire_grace_time=3600  # Allow 1 hour grace period for missed jobs
     )
     
+    # Hourly stat counter reconciliation
+    scheduler.add_job(
+        reconcile_stat_counters,
+        CronTrigger(minute=15),
+        id="reconcile_stat_counters",
+        replace_existing=True,
+        misfire_grace_time=600
+    )
+
+    # Nightly analytics rollup rebuild
+    scheduler.add_job(
+        rebuild_analytics_rollup,
+        CronTrigger(hour=3, minute=30),
+        id="rebuild_analytics_rollup",
+        replace_existing=True,
+        misfire_grace_time=3600
+    )
+
     scheduler.start()
     logger.info("📅 Scheduler started successfully")
     logger.info("📅 Maintenance check scheduled for daily at 09:00 AM")
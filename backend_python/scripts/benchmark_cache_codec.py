@@ -0,0 +1,83 @@
+"""
+Benchmark: codecs de cache (serialização + compressão) nos payloads reais.
+
+Gera as respostas de verdade (listagem de OS, lista de clientes, dashboards)
+sobre um banco SQLite em memória populado por benchmark_order_list.seed e
+mede, para cada combinação disponível, tempo de encode/decode e bytes
+armazenados.
+
+Uso:
+    python scripts/benchmark_cache_codec.py          # 5000 OS
+    python scripts/benchmark_cache_codec.py 20000
+"""
+import os
+import sys
+import time
+
+# Add parent directory to path to import cache_codec and the routers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import Session, joinedload
+
+from models import Base, Client
+import cache_codec
+from cache_codec import SERIALIZERS, COMPRESSORS, encode, decode
+from clientes import ClientResponse
+from dashboard import _build_admin_dashboard, _build_prestador_dashboard
+from solicitacoes import _build_order_list
+from benchmark_order_list import make_engine, seed
+
+DEFAULT_ORDERS = 5_000
+REPEAT = 20
+
+
+def build_payloads(engine) -> dict:
+    with Session(engine) as db:
+        clients = db.query(Client).options(joinedload(Client.locations)).all()
+        return {
+            "OS (página de 100)": _build_order_list(db, None, None, None, None, None, None, None, 100),
+            "OS (lista completa)": _build_order_list(db, None, None, None, None, None, None, None, None),
+            "clientes": [ClientResponse.model_validate(c).model_dump(mode="json") for c in clients],
+            "dashboard admin": _build_admin_dashboard(db),
+            "dashboard prestador": _build_prestador_dashboard(db),
+        }
+
+
+def timed(fn, repeat: int = REPEAT) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ORDERS
+    engine = make_engine()
+    Base.metadata.create_all(bind=engine)
+    seed(engine, n)
+    payloads = build_payloads(engine)
+
+    # Compress everything so the table shows the effect even on small payloads
+    cache_codec.COMPRESS_MIN_BYTES = 0
+    codecs = [
+        (serializer, compression)
+        for serializer, spec in SERIALIZERS.items() if spec[3]
+        for compression, cspec in COMPRESSORS.items() if cspec[3]
+    ]
+
+    for label, value in payloads.items():
+        print(f"\n{label}")
+        print(f"{'codec':>16} | {'bytes':>10} | {'encode (ms)':>11} | {'decode (ms)':>11}")
+        print("-" * 58)
+        for serializer, compression in codecs:
+            payload = encode("cache:bench", value, serializer, compression)
+            assert decode(payload) == decode(encode("cache:bench", value, "json", "none"))
+            enc = timed(lambda: encode("cache:bench", value, serializer, compression))
+            dec = timed(lambda: decode(payload))
+            print(f"{serializer + '/' + compression:>16} | {len(payload):>10} | {enc * 1000:>11.3f} | {dec * 1000:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
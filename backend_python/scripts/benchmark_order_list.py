@@ -0,0 +1,154 @@
+"""
+Benchmark: listagem de OS via ORM (joinedload + mapeamento manual) vs
+projeção de colunas (Core select + tuplas -> JSON).
+
+Uso:
+    python scripts/benchmark_order_list.py               # 10k, 100k, 1M linhas
+    python scripts/benchmark_order_list.py 10000 50000   # tamanhos customizados
+
+Por padrão usa SQLite em memória. Defina BENCH_DATABASE_URL para medir contra
+outro banco (as tabelas são criadas e populadas nele, use um banco descartável).
+"""
+import os
+import sys
+import json
+import time
+import random
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import models and solicitacoes
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, delete
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.pool import StaticPool
+
+from models import Base, ServiceOrder, Client, Location, User
+from solicitacoes import _order_list_select, _serialize_order_row
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+CHUNK = 10_000
+
+
+def make_engine():
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        return create_engine(url)
+    return create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+
+
+def seed(engine, n_orders: int):
+    """Popula clientes, locais, técnicos e n_orders OS"""
+    with engine.begin() as conn:
+        for table in (ServiceOrder, Location, Client, User):
+            conn.execute(delete(table))
+
+        n_clients = max(n_orders // 20, 1)
+        conn.execute(insert(User), [
+            {"id": i, "email": f"tec{i}@bench", "full_name": f"Técnico {i}", "role": "prestador"}
+            for i in range(1, 21)
+        ])
+        conn.execute(insert(Client), [
+            {"id": i, "name": f"Cliente {i}", "document": f"{i:011d}"}
+            for i in range(1, n_clients + 1)
+        ])
+        conn.execute(insert(Location), [
+            {"id": i, "client_id": i, "nickname": "Sede", "address": "Rua X", "city": "SP",
+             "state": "SP", "zip_code": "01000-000", "street_number": "1", "neighborhood": "Centro"}
+            for i in range(1, n_clients + 1)
+        ])
+
+        base = datetime(2024, 1, 1)
+        statuses = ["aberto", "agendado", "em_andamento", "concluido", "faturado"]
+        for start in range(0, n_orders, CHUNK):
+            rows = []
+            for i in range(start + 1, min(start + CHUNK, n_orders) + 1):
+                client_id = random.randint(1, n_clients)
+                rows.append({
+                    "id": i,
+                    "sequential_id": 100 + i,
+                    "title": f"OS {i}",
+                    "status": random.choice(statuses),
+                    "priority": "media",
+                    "service_type": "preventiva" if i % 3 == 0 else "corretiva",
+                    "description": "Manutenção de rotina no equipamento",
+                    "client_id": client_id,
+                    "location_id": client_id,
+                    "user_id": random.randint(1, 20),
+                    "valor_total": round(random.uniform(100, 5000), 2),
+                    "created_at": base + timedelta(minutes=i),
+                    "scheduled_at": base + timedelta(minutes=i, days=2),
+                })
+            conn.execute(insert(ServiceOrder), rows)
+
+
+def run_orm(engine) -> int:
+    """Caminho antigo: entidades completas + mapeamento atributo a atributo"""
+    with Session(engine) as db:
+        orders = db.query(ServiceOrder).options(
+            joinedload(ServiceOrder.client),
+            joinedload(ServiceOrder.location),
+            joinedload(ServiceOrder.user)
+        ).order_by(ServiceOrder.created_at.desc()).all()
+        result = [
+            {
+                "id": o.id,
+                "sequential_id": o.sequential_id,
+                "titulo": o.title,
+                "status": o.status,
+                "priority": o.priority,
+                "service_type": o.service_type,
+                "description": o.description,
+                "cliente_id": o.client_id,
+                "local_id": o.location_id,
+                "equipment_id": o.equipment_id,
+                "agendado_para": o.scheduled_at.isoformat() if o.scheduled_at else None,
+                "created_at": o.created_at.isoformat() if o.created_at else None,
+                "valor_total": o.valor_total,
+                "client_name": o.client.name if o.client else None,
+                "location_name": o.location.nickname if o.location else None,
+                "technician_name": o.user.full_name if o.user else None
+            }
+            for o in orders
+        ]
+        return len(json.dumps(result))
+
+
+def run_projection(engine) -> int:
+    """Caminho novo: select() de colunas, tuplas serializadas direto"""
+    with Session(engine) as db:
+        query = _order_list_select().order_by(ServiceOrder.created_at.desc(), ServiceOrder.id.desc())
+        result = [_serialize_order_row(row) for row in db.execute(query)]
+        return len(json.dumps(result))
+
+
+def timed(fn, engine, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(engine)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    engine = make_engine()
+    Base.metadata.create_all(bind=engine)
+
+    print(f"{'linhas':>10} | {'ORM (s)':>9} | {'projeção (s)':>12} | {'ganho':>6}")
+    print("-" * 48)
+    for n in sizes:
+        seed(engine, n)
+        repeat = 3 if n <= 100_000 else 1
+        orm_s = timed(run_orm, engine, repeat)
+        proj_s = timed(run_projection, engine, repeat)
+        print(f"{n:>10} | {orm_s:>9.3f} | {proj_s:>12.3f} | {orm_s / proj_s:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
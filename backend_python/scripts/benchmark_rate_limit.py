@@ -0,0 +1,104 @@
+"""
+Benchmark: custo do rate limit por requisição.
+
+Mede check_request() isolado (anônimo por IP e autenticado com JWT) e uma
+app ASGI mínima sem middleware, com um middleware vazio e com o middleware
+equivalente ao de main.py (a diferença entre os dois últimos é o limiter).
+
+Uso:
+    python scripts/benchmark_rate_limit.py            # 20000 requisições
+    python scripts/benchmark_rate_limit.py 100000
+
+Sem REDIS_URL/REDIS_HOST acessível mede o fallback local (token bucket);
+com Redis mede o script GCRA (um round trip por requisição).
+"""
+import os
+import sys
+import math
+import time
+import asyncio
+
+# Add parent directory to path to import rate_limit_utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Limits high enough that the benchmark is never throttled
+os.environ.setdefault("RATE_LIMIT_MAX_REQUESTS", "1000000000")
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from auth import create_access_token
+from redis_utils import ping_redis
+from rate_limit_utils import check_request
+
+DEFAULT_REQUESTS = 20_000
+
+
+def bench_check(n: int, authorization) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        check_request("/api/solicitacoes", "GET", f"10.0.{i % 256}.1", authorization)
+    return (time.perf_counter() - start) / n
+
+
+def make_app(mode: str) -> FastAPI:
+    app = FastAPI()
+
+    if mode == "vazio":
+        @app.middleware("http")
+        async def passthrough_middleware(request: Request, call_next):
+            return await call_next(request)
+
+    if mode == "limite":
+        @app.middleware("http")
+        async def rate_limit_middleware(request: Request, call_next):
+            client_ip = request.client.host if request.client else "unknown"
+            allowed, remaining, retry_after, limit = check_request(
+                request.url.path, request.method, client_ip, request.headers.get("authorization")
+            )
+            if not allowed:
+                return JSONResponse(status_code=429, content={},
+                                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+            response = await call_next(request)
+            response.headers["X-RateLimit-Remaining"] = str(remaining)
+            return response
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def bench_app(app: FastAPI, n: int, headers: dict) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):  # Warm-up
+            await client.get("/api/ping", headers=headers)
+        start = time.perf_counter()
+        for _ in range(n):
+            await client.get("/api/ping", headers=headers)
+        return (time.perf_counter() - start) / n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS
+    token = create_access_token({"sub": "bench@inovar", "role": "admin", "id": 1})
+    bearer = f"Bearer {token}"
+
+    print(f"backend: {'redis (GCRA)' if ping_redis() else 'local (token bucket)'}, {n} requisições")
+    print(f"check_request anônimo:      {bench_check(n, None) * 1e6:8.1f} µs")
+    print(f"check_request autenticado:  {bench_check(n, bearer) * 1e6:8.1f} µs")
+
+    app_n = max(n // 10, 1000)
+    for label, headers in (("anônimo", {}), ("autenticado", {"authorization": bearer})):
+        base = asyncio.run(bench_app(make_app("nenhum"), app_n, headers))
+        empty = asyncio.run(bench_app(make_app("vazio"), app_n, headers))
+        limited = asyncio.run(bench_app(make_app("limite"), app_n, headers))
+        print(f"app ASGI {label:<12} sem middleware {base * 1e6:7.1f} µs | vazio {empty * 1e6:7.1f} µs | "
+              f"com limite {limited * 1e6:7.1f} µs | limiter {(limited - empty) * 1e6:6.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
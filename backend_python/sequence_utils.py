@@ -0,0 +1,108 @@
+"""
+Sequential ID Allocator
+Numeração sequencial (OS, clientes) sem MAX()+1 a cada insert.
+"""
+import os
+import threading
+import logging
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import IdCounter, ServiceOrder, Client
+
+logger = logging.getLogger(__name__)
+
+# Quantos IDs cada worker reserva por ida ao banco (PostgreSQL)
+BLOCK_SIZE = int(os.getenv("SEQUENCE_BLOCK_SIZE", "20"))
+
+# nome do contador -> (coluna usada para semear, valor inicial)
+SEQUENCES = {
+    "service_orders": (ServiceOrder.sequential_id, 100),  # OS começam em 101
+    "clients": (Client.sequential_id, 0),
+}
+
+
+class SequenceAllocator:
+    """
+    Distribui IDs sequenciais a partir da tabela id_counters.
+
+    PostgreSQL: cada worker reserva blocos de BLOCK_SIZE com um único
+    UPDATE ... RETURNING em conexão própria (commit imediato), então inserts
+    concorrentes nunca recebem o mesmo número nem disputam um MAX().
+    Blocos não usados viram lacunas na numeração quando o worker reinicia.
+
+    SQLite: escritas já são serializadas pelo banco; o incremento roda na
+    transação da requisição, sem cache de bloco (rollback desfaz a reserva).
+    """
+
+    def __init__(self, block_size: int = BLOCK_SIZE):
+        self.block_size = max(block_size, 1)
+        self._lock = threading.Lock()
+        # nome -> (próximo id livre, último id reservado)
+        self._blocks: Dict[str, Tuple[int, int]] = {}
+
+    def next_id(self, db: Session, name: str) -> int:
+        return self.next_ids(db, name, 1)[0]
+
+    def next_ids(self, db: Session, name: str, count: int) -> List[int]:
+        """Retorna `count` IDs consecutivos dentro de cada bloco reservado"""
+        if count <= 0:
+            return []
+
+        bind = db.get_bind()
+        if bind.dialect.name == "sqlite":
+            end = self._increment(db, name, count)
+            return list(range(end - count + 1, end + 1))
+
+        with self._lock:
+            ids: List[int] = []
+            while len(ids) < count:
+                current, end = self._blocks.get(name, (1, 0))
+                if current > end:
+                    size = max(self.block_size, count - len(ids))
+                    end = self._reserve(bind, name, size)
+                    current = end - size + 1
+                take = min(end - current + 1, count - len(ids))
+                ids.extend(range(current, current + take))
+                self._blocks[name] = (current + take, end)
+            return ids
+
+    def _reserve(self, bind, name: str, size: int) -> int:
+        # Conexão própria: a reserva é confirmada na hora e o lock da linha
+        # dura apenas o UPDATE, não a requisição inteira.
+        with Session(bind) as counter_db:
+            end = self._increment(counter_db, name, size)
+            counter_db.commit()
+        logger.debug(f"Sequence '{name}': reserved block ending at {end}")
+        return end
+
+    def _increment(self, db: Session, name: str, size: int) -> int:
+        stmt = (
+            update(IdCounter)
+            .where(IdCounter.name == name)
+            .values(value=IdCounter.value + size)
+            .returning(IdCounter.value)
+        )
+        end = db.execute(stmt).scalar()
+        if end is None:
+            self._seed(db, name)
+            end = db.execute(stmt).scalar()
+        return end
+
+    def _seed(self, db: Session, name: str):
+        """Cria o contador a partir do maior ID existente (executa uma única vez)"""
+        column, floor = SEQUENCES[name]
+        start = db.query(func.max(column)).scalar() or floor
+        try:
+            with db.begin_nested():
+                db.add(IdCounter(name=name, value=start))
+        except IntegrityError:
+            pass  # Outro worker criou o contador primeiro
+        logger.info(f"Sequence '{name}' seeded at {start}")
+
+
+# Singleton instance
+sequence_allocator = SequenceAllocator()
@@ -0,0 +1,59 @@
+"""
+Assinaturas (cliente, técnico, usuário): PNG compactado, endereçado por
+conteúdo no blob store. O banco guarda apenas a URL de referência.
+"""
+import io
+import hashlib
+import logging
+from typing import Optional
+
+from blob_store import BlobStore, get_blob_store
+from photo_utils import PIL_AVAILABLE, decode_data_url
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_BUCKET = "signatures"
+
+# Traço escuro sobre fundo transparente: poucas cores bastam
+SIGNATURE_COLORS = 16
+
+if PIL_AVAILABLE:
+    from PIL import Image
+
+
+def compact_signature(content: bytes) -> bytes:
+    """Reduz a assinatura a PNG paletizado; devolve o original se não for possível"""
+    if not PIL_AVAILABLE:
+        return content
+    try:
+        with Image.open(io.BytesIO(content)) as img:
+            img = img.convert("RGBA")
+            # Crop the empty canvas around the strokes
+            bbox = img.getbbox()
+            if bbox:
+                img = img.crop(bbox)
+            img = img.quantize(colors=SIGNATURE_COLORS, method=Image.Quantize.FASTOCTREE)
+            buffer = io.BytesIO()
+            img.save(buffer, format="PNG", optimize=True)
+            compacted = buffer.getvalue()
+        return compacted if len(compacted) < len(content) else content
+    except Exception as e:
+        logger.error(f"Signature compaction failed: {e}")
+        return content
+
+
+def store_signature(value: Optional[str], store: Optional[BlobStore] = None) -> Optional[str]:
+    """
+    Data URL -> URL do blob (idempotente: a mesma assinatura gera a mesma chave).
+    Valores que já são referências (URLs) ou vazios passam direto.
+    """
+    decoded = decode_data_url(value) if value else None
+    if not decoded:
+        return value
+
+    store = store or get_blob_store(SIGNATURE_BUCKET)
+    content = compact_signature(decoded[0])
+    key = f"assinaturas/{hashlib.sha256(content).hexdigest()}.png"
+    if not store.exists(key) and not store.put(key, content, "image/png"):
+        raise RuntimeError("Falha ao gravar a assinatura")
+    return store.public_url(key)
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from database import get_db
-from models import ServiceOrder, ItemOS, User, Client, Location, Equipment
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Query, Request, UploadFile
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, and_, or_, select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from database import get_db, SessionLocal
+from models import ServiceOrder, ServiceOrderEvent, ServiceOrderPhoto, ServiceOrderTombstone, ItemOS, User, Client, Location, Equipment
+from models import increment_counters, order_status_counter, apply_rollup_deltas
 
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
-from datetime import datetime
-from redis_utils import get_cache, set_cache, delete_cache
+from typing import List, Optional, Tuple, Union
+from datetime import datetime, timedelta
+from redis_utils import get_cache, set_cache, delete_cache, adelete_cache, cache_key, get_or_compute
+from sequence_utils import sequence_allocator
+import base64
+import hashlib
+import json
+import uuid
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,14 +22,17 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 from auth import get_current_user, get_operational_user
-from pix_utils import generate_pix_payload
-from pdf_utils import generate_os_pdf
-from fastapi.responses import Response
+from pix_utils import generate_pix_payload, generate_pix_qrcode, QRCODE_FORMATS
+from pdf_utils import get_or_generate_os_pdf, iter_pdf_zip
+from photo_utils import decode_data_url, store_photo
+from signature_utils import store_signature
+from fastapi.responses import Response, JSONResponse, StreamingResponse
 
 # Schemas
 
 class ItemOSSchema(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
+    id: Optional[int] = None # Existing item (for diff-based updates)
     descricao: str = Field(..., alias="descricao_tarefa")
     quantidade: float = 1.0
     valor_unitario: float = 0.0
@@ -55,6 +65,9 @@ class ServiceOrderUpdate(BaseModel):
     valor_total: Optional[float] = None
     itens_os: Optional[List[ItemOSSchema]] = None
     historico: Optional[List[dict]] = None
+    fotos: Optional[List[dict]] = None # [{url, description}]; only new entries are added
+    assinatura_cliente: Optional[str] = None # PNG data URL or an existing reference URL
+    assinatura_tecnico: Optional[str] = None
 
 class ServiceOrderResponse(ServiceOrderBase):
     id: int
@@ -69,79 +82,313 @@ class ServiceOrderResponse(ServiceOrderBase):
         from_attributes = True
         populate_by_name = True
 
+class OrderEventCreate(BaseModel):
+    descricao: str
+    tipo: Optional[str] = None
+    usuario: Optional[str] = None # Defaults to the current user's name
+
+class PixBatchRequest(BaseModel):
+    ids: List[int]
+    formato: Optional[str] = "png" # png, svg or None (payload only)
+
+class ServiceOrderPage(BaseModel):
+    items: List[ServiceOrderResponse]
+    next_cursor: Optional[str] = None
+
+# Helpers
+
+MAX_PAGE_SIZE = 200
+MAX_BATCH_SIZE = 500
+EXPORT_LOAD_BATCH = 50
+HISTORY_DETAIL_LIMIT = 50
+# Overlap between syncs: covers writes whose updated_at precedes their commit
+SYNC_OVERLAP = timedelta(seconds=5)
+
+def _encode_cursor(created_at: datetime, order_id: int) -> str:
+    """Cursor opaco para paginação keyset em (created_at, id)"""
+    raw = f"{created_at.isoformat()}|{order_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, order_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), int(order_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def _encode_sync_token(synced_at: datetime) -> str:
+    return base64.urlsafe_b64encode(synced_at.isoformat().encode()).decode().rstrip("=")
+
+def _decode_sync_token(token: str) -> datetime:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return datetime.fromisoformat(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Token de sincronização inválido")
+
+def _apply_order_filters(
+    query,
+    status: Optional[List[str]] = None,
+    cliente_id: Optional[int] = None,
+    tecnico_id: Optional[int] = None,
+    service_type: Optional[str] = None,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None
+):
+    if status:
+        query = query.filter(ServiceOrder.status.in_(status))
+    if cliente_id is not None:
+        query = query.filter(ServiceOrder.client_id == cliente_id)
+    if tecnico_id is not None:
+        query = query.filter(ServiceOrder.user_id == tecnico_id)
+    if service_type:
+        query = query.filter(ServiceOrder.service_type == service_type)
+    if data_inicio:
+        query = query.filter(ServiceOrder.created_at >= data_inicio)
+    if data_fim:
+        query = query.filter(ServiceOrder.created_at <= data_fim)
+    return query
+
+# Projeção de colunas para listagens: lê só os escalares necessários via Core,
+# sem hidratar ServiceOrder/Client/Location/User no identity map.
+ORDER_LIST_COLUMNS = (
+    ServiceOrder.id,
+    ServiceOrder.sequential_id,
+    ServiceOrder.title,
+    ServiceOrder.status,
+    ServiceOrder.priority,
+    ServiceOrder.service_type,
+    ServiceOrder.description,
+    ServiceOrder.client_id,
+    ServiceOrder.location_id,
+    ServiceOrder.equipment_id,
+    ServiceOrder.scheduled_at,
+    ServiceOrder.created_at,
+    ServiceOrder.valor_total,
+    Client.name.label("client_name"),
+    Location.nickname.label("location_name"),
+    User.full_name.label("technician_name"),
+)
+
+def _order_list_select():
+    return (
+        select(*ORDER_LIST_COLUMNS)
+        .select_from(ServiceOrder)
+        .outerjoin(Client, ServiceOrder.client_id == Client.id)
+        .outerjoin(Location, ServiceOrder.location_id == Location.id)
+        .outerjoin(User, ServiceOrder.user_id == User.id)
+    )
+
+def _serialize_order_row(row) -> dict:
+    """Serializa uma linha da projeção no mesmo formato de ServiceOrderResponse"""
+    return {
+        "titulo": row.title,
+        "status": row.status,
+        "priority": row.priority,
+        "service_type": row.service_type,
+        "description": row.description,
+        "cliente_id": row.client_id,
+        "local_id": row.location_id,
+        "equipment_id": row.equipment_id,
+        "agendado_para": row.scheduled_at.isoformat() if row.scheduled_at else None,
+        "id": row.id,
+        "sequential_id": row.sequential_id,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "valor_total": row.valor_total,
+        "client_name": row.client_name,
+        "location_name": row.location_name,
+        "technician_name": row.technician_name
+    }
+
+def _order_has_items(db: Session, order_id: int) -> bool:
+    return db.query(ItemOS.id).filter(ItemOS.solicitacao_id == order_id).first() is not None
+
+def _sync_order_items(db: Session, order_id: int, items: List[ItemOSSchema]):
+    """
+    Aplica a lista de itens enviada como diff sobre os itens gravados:
+    UPDATE só nos alterados, INSERT dos novos (sem id) e DELETE dos ausentes.
+    """
+    existing = {
+        row.id: row
+        for row in db.execute(
+            select(
+                ItemOS.id, ItemOS.descricao_tarefa, ItemOS.quantidade,
+                ItemOS.valor_unitario, ItemOS.status_item
+            ).where(ItemOS.solicitacao_id == order_id)
+        )
+    }
+
+    to_update, to_insert, kept_ids = [], [], set()
+    for item in items:
+        values = {
+            "descricao_tarefa": item.descricao,
+            "quantidade": item.quantidade,
+            "valor_unitario": item.valor_unitario,
+            "status_item": item.status
+        }
+        current = existing.get(item.id) if item.id is not None else None
+        if current is None:
+            to_insert.append({
+                "solicitacao_id": order_id,
+                "valor_total": item.quantidade * item.valor_unitario,
+                **values
+            })
+            continue
+
+        kept_ids.add(current.id)
+        if (current.descricao_tarefa, current.quantidade, current.valor_unitario, current.status_item) != (
+            item.descricao, item.quantidade, item.valor_unitario, item.status
+        ):
+            to_update.append({
+                "id": current.id,
+                "valor_total": item.quantidade * item.valor_unitario,
+                **values
+            })
+
+    to_delete = [item_id for item_id in existing if item_id not in kept_ids]
+
+    if to_update:
+        db.execute(update(ItemOS), to_update)
+    if to_insert:
+        db.execute(insert(ItemOS), to_insert)
+    if to_delete:
+        db.execute(delete(ItemOS).where(ItemOS.id.in_(to_delete)))
+
 # Routes
-@router.get("/solicitacoes", response_model=List[ServiceOrderResponse])
-async def list_orders(
+@router.get("/solicitacoes", response_model=Union[ServiceOrderPage, List[ServiceOrderResponse]])
+def list_orders(
+    status: Optional[List[str]] = Query(None),
+    cliente_id: Optional[int] = None,
+    tecnico_id: Optional[int] = None,
+    service_type: Optional[str] = None,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_operational_user)
 ):
-    # Try cache first
-    cache_key = "orders:list:all"
-    cached_data = get_cache(cache_key)
-    if cached_data:
-        return cached_data
+    """
+    Lista OS com filtros no servidor.
+    Com `limit` (ou `cursor`) retorna uma página {items, next_cursor} ordenada
+    por (created_at, id) desc; sem eles mantém a lista completa (legado).
+    """
+    paginated = limit is not None or cursor is not None
+    if paginated and limit is None:
+        limit = 50
 
-    orders = db.query(ServiceOrder).options(
-        joinedload(ServiceOrder.client),
-        joinedload(ServiceOrder.location),
-        joinedload(ServiceOrder.user)
-    ).order_by(ServiceOrder.created_at.desc()).all()
-    
-    # Manual mapping
-    result = [
-        {
-            "id": o.id,
-            "sequential_id": o.sequential_id,
-            "titulo": o.title,
-            "status": o.status,
-            "priority": o.priority,
-            "service_type": o.service_type,
-            "description": o.description,
-            "cliente_id": o.client_id,
-            "local_id": o.location_id,
-            "equipment_id": o.equipment_id,
-            "scheduled_at": o.scheduled_at.isoformat() if o.scheduled_at else None,
-            "created_at": o.created_at.isoformat() if o.created_at else None,
-            "valor_total": o.valor_total,
-            "client_name": o.client.name if o.client else None,
-            "location_name": o.location.nickname if o.location else None,
-            "technician_name": o.user.full_name if o.user else None
-        }
-        for o in orders
-    ]
-    
-    # Cache for 60 seconds
-    set_cache(cache_key, result, ttl_seconds=60)
-    return result
+    # One entry per filter/page combination. Single-flight: an expired list is refreshed
+    # by one request while the others get the stale copy; after an invalidation the
+    # concurrent requests wait for that one recompute instead of all hitting the database
+
+    cache_key_str = cache_key(
+        "orders:list:v2",
+        status=sorted(status) if status else None,
+        cliente_id=cliente_id,
+        tecnico_id=tecnico_id,
+        service_type=service_type,
+        data_inicio=data_inicio.isoformat() if data_inicio else None,
+        data_fim=data_fim.isoformat() if data_fim else None,
+        cursor=cursor,
+        limit=limit
+    )
+    result = get_or_compute(
+        cache_key_str,
+        lambda: _build_order_list(
+            db, status, cliente_id, tecnico_id, service_type, data_inicio, data_fim, cursor, limit
+        ),
+        ttl_seconds=60
+    )
+    # Rows are already JSON-ready; skip response_model re-validation
+    return JSONResponse(content=result)
+
+def _build_order_list(db: Session, status, cliente_id, tecnico_id, service_type,
+                      data_inicio, data_fim, cursor: Optional[str], limit: Optional[int]):
+    query = _order_list_select()
+    query = _apply_order_filters(
+        query, status, cliente_id, tecnico_id, service_type, data_inicio, data_fim
+    )
+
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        query = query.filter(or_(
+            ServiceOrder.created_at < cursor_created_at,
+            and_(ServiceOrder.created_at == cursor_created_at, ServiceOrder.id < cursor_id)
+        ))
+
+    query = query.order_by(ServiceOrder.created_at.desc(), ServiceOrder.id.desc())
+
+    if limit is None:
+        return [_serialize_order_row(row) for row in db.execute(query)]
+
+    # Fetch one extra row to know whether there is a next page
+    rows = db.execute(query.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id)
+    return {
+        "items": [_serialize_order_row(row) for row in rows],
+        "next_cursor": next_cursor
+    }
 
 @router.get("/meus-servicos", response_model=List[ServiceOrderResponse])
 def list_my_orders(current_user: User = Depends(get_operational_user), db: Session = Depends(get_db)):
-    orders = db.query(ServiceOrder).filter(ServiceOrder.user_id == current_user.id).options(
-        joinedload(ServiceOrder.client),
-        joinedload(ServiceOrder.location),
-        joinedload(ServiceOrder.user)
-    ).order_by(ServiceOrder.created_at.desc()).all()
-    return [
-        {
-            "id": o.id,
-            "sequential_id": o.sequential_id,
-            "titulo": o.title,
-            "status": o.status,
-            "priority": o.priority,
-            "service_type": o.service_type,
-            "description": o.description,
-            "cliente_id": o.client_id,
-            "local_id": o.location_id,
-            "equipment_id": o.equipment_id,
-            "scheduled_at": o.scheduled_at.isoformat() if o.scheduled_at else None,
-            "created_at": o.created_at,
-            "valor_total": o.valor_total,
-            "client_name": o.client.name if o.client else None,
-            "location_name": o.location.nickname if o.location else None,
-            "technician_name": o.user.full_name if o.user else None
-        }
-        for o in orders
-    ]
+    query = _order_list_select().filter(ServiceOrder.user_id == current_user.id).order_by(
+        ServiceOrder.created_at.desc(), ServiceOrder.id.desc()
+    )
+    return JSONResponse(content=[_serialize_order_row(row) for row in db.execute(query)])
+
+@router.get("/meus-servicos/sync")
+def sync_my_orders(
+    since: Optional[str] = None,
+    current_user: User = Depends(get_operational_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Sincronização incremental da lista do técnico.
+    Sem `since` devolve o snapshot completo; com o `sync_token` da resposta
+    anterior devolve só as OS alteradas e os ids removidos (tombstones).
+    """
+    # Read the clock before querying so changes committed meanwhile are not skipped
+    sync_started_at = datetime.utcnow()
+    since_dt = _decode_sync_token(since) if since else None
+
+    query = _order_list_select().add_columns(ServiceOrder.updated_at).filter(
+        ServiceOrder.user_id == current_user.id
+    )
+    if since_dt:
+        query = query.filter(ServiceOrder.updated_at > since_dt)
+    query = query.order_by(ServiceOrder.updated_at, ServiceOrder.id)
+
+    orders = []
+    for row in db.execute(query):
+        item = _serialize_order_row(row)
+        item["updated_at"] = row.updated_at.isoformat() if row.updated_at else None
+        orders.append(item)
+
+    deleted = []
+    if since_dt:
+        changed_ids = {o["id"] for o in orders}
+        deleted = [
+            order_id
+            for order_id in db.execute(
+                select(ServiceOrderTombstone.order_id).where(
+                    ServiceOrderTombstone.user_id == current_user.id,
+                    ServiceOrderTombstone.deleted_at > since_dt
+                ).distinct()
+            ).scalars()
+            if order_id not in changed_ids
+        ]
+
+    return JSONResponse(content={
+        "orders": orders,
+        "deleted": deleted,
+        "full": since_dt is None,
+        "sync_token": _encode_sync_token(sync_started_at - SYNC_OVERLAP)
+    })
 
 @router.post("/solicitacoes", response_model=ServiceOrderResponse)
 async def create_order(
@@ -149,9 +396,8 @@ async def create_order(
     current_user: User = Depends(get_operational_user), 
     db: Session = Depends(get_db)
 ):
-    # Sequential ID
-    max_id = db.query(func.max(ServiceOrder.sequential_id)).scalar()
-    sequential_id = (max_id or 100) + 1 # Start from 101 or similar
+    # Sequential ID (starts from 101)
+    sequential_id = sequence_allocator.next_id(db, "service_orders")
 
     db_order = ServiceOrder(
         title=order.titulo,
@@ -194,8 +440,7 @@ async def create_order(
     db.refresh(db_order)
     
     # Invalidate Cache
-    delete_cache("orders:list:all")
-    delete_cache(f"dashboard:prestador:v5") # Invalidate dashboard cache too
+    await adelete_cache("orders:list", "dashboard") # Dashboard: admin, prestador and analytics
     
     # Real-time Broadcast
     try:
@@ -229,10 +474,156 @@ async def create_order(
         "valor_total": db_order.valor_total
     }
 
+# (campo do schema, modelo referenciado, nome na mensagem de erro)
+BATCH_REFERENCES = [
+    ("cliente_id", Client, "cliente"),
+    ("local_id", Location, "local"),
+    ("equipment_id", Equipment, "equipamento"),
+]
+
+def _check_batch_references(db: Session, orders: List[ServiceOrderCreate]):
+    """Uma consulta por tabela; aponta a primeira OS do lote com referência inexistente"""
+    for field, model, label in BATCH_REFERENCES:
+        ids = {getattr(order, field) for order in orders} - {None}
+        if not ids:
+            continue
+        found = {row[0] for row in db.query(model.id).filter(model.id.in_(ids))}
+        for position, order in enumerate(orders, start=1):
+            value = getattr(order, field)
+            if value is not None and value not in found:
+                raise HTTPException(status_code=400, detail=f"OS {position} do lote: {label} {value} não encontrado")
+
+@router.post("/solicitacoes/batch", response_model=List[ServiceOrderResponse])
+async def create_orders_batch(
+    orders: List[ServiceOrderCreate],
+    current_user: User = Depends(get_operational_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Cria várias OS em uma única transação (ex.: importação de preventivas).
+    OS e itens são gravados com INSERT multi-linha; cache e broadcast uma vez só.
+    """
+    if not orders:
+        raise HTTPException(status_code=400, detail="Nenhuma OS informada")
+    if len(orders) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_BATCH_SIZE} OS por lote")
+    _check_batch_references(db, orders)
+
+    sequential_ids = sequence_allocator.next_ids(db, "service_orders", len(orders))
+
+    order_rows = []
+    for order, sequential_id in zip(orders, sequential_ids):
+        scheduled_at = None
+        if order.agendado_para:
+            try:
+                scheduled_at = datetime.fromisoformat(order.agendado_para.replace('Z', ''))
+            except (ValueError, TypeError):
+                pass
+
+        order_rows.append({
+            "title": order.titulo,
+            "status": order.status,
+            "priority": order.priority,
+            "service_type": order.service_type,
+            "description": order.description,
+            "client_id": order.cliente_id,
+            "location_id": order.local_id,
+            "equipment_id": order.equipment_id,
+            "user_id": current_user.id,
+            "sequential_id": sequential_id,
+            "scheduled_at": scheduled_at,
+            "valor_total": sum(i.quantidade * i.valor_unitario for i in order.itens)
+        })
+
+    try:
+        inserted = db.execute(
+            insert(ServiceOrder).returning(
+                ServiceOrder.id, ServiceOrder.created_at, sort_by_parameter_order=True
+            ),
+            order_rows
+        ).all()
+
+        item_rows = [
+            {
+                "solicitacao_id": row.id,
+                "descricao_tarefa": item.descricao,
+                "quantidade": item.quantidade,
+                "valor_unitario": item.valor_unitario,
+                "valor_total": item.quantidade * item.valor_unitario,
+                "status_item": item.status
+            }
+            for order, row in zip(orders, inserted)
+            for item in order.itens
+        ]
+        if item_rows:
+            db.execute(insert(ItemOS), item_rows)
+
+        # Bulk INSERT skips the mapper events that maintain the stat counters
+        deltas = {"orders:total": len(order_rows)}
+        for row in order_rows:
+            name = order_status_counter(row["status"])
+            deltas[name] = deltas.get(name, 0) + 1
+        increment_counters(db.connection(), deltas)
+        apply_rollup_deltas(db.connection(), *[
+            {(row.created_at.date(), values["service_type"] or "", current_user.id): [1, 0, 0.0]}
+            for row, values in zip(inserted, order_rows)
+        ])
+
+        db.commit()
+    except IntegrityError as e:
+        # References were checked above; this is a constraint hit by a concurrent change
+        db.rollback()
+        logger.error(f"Batch order creation failed: {e.orig}")
+        raise HTTPException(status_code=409, detail=f"Conflito de integridade ao criar OS em lote: {e.orig}")
+    except Exception:
+        db.rollback()
+        raise
+
+    # Invalidate Cache (once for the whole batch)
+    await adelete_cache("orders:list", "dashboard")
+
+    result = [
+        {
+            "id": row.id,
+            "sequential_id": data["sequential_id"],
+            "titulo": data["title"],
+            "status": data["status"],
+            "priority": data["priority"],
+            "service_type": data["service_type"],
+            "description": data["description"],
+            "cliente_id": data["client_id"],
+            "local_id": data["location_id"],
+            "equipment_id": data["equipment_id"],
+            "scheduled_at": data["scheduled_at"].isoformat() if data["scheduled_at"] else None,
+            "created_at": row.created_at,
+            "valor_total": data["valor_total"]
+        }
+        for data, row in zip(order_rows, inserted)
+    ]
+
+    # Real-time Broadcast (single coalesced message)
+    try:
+        from websocket_manager import manager
+        await manager.broadcast({
+            "type": "new_orders_batch",
+            "data": {
+                "count": len(result),
+                "orders": [
+                    {"id": o["id"], "sequential_id": o["sequential_id"], "titulo": o["titulo"], "status": o["status"]}
+                    for o in result
+                ]
+            }
+        })
+    except Exception as e:
+        logger.error(f"Failed to broadcast batch orders: {e}")
+
+    return result
+
 @router.put("/solicitacoes/{order_id}", response_model=ServiceOrderResponse)
 async def update_order(
     order_id: int,
     data: ServiceOrderUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_operational_user)
 ):
@@ -240,6 +631,8 @@ async def update_order(
     if not db_order:
         raise HTTPException(status_code=404, detail="OS não encontrada")
 
+    status_changed = data.status is not None and data.status != db_order.status
+
     # Update basic fields
     if data.titulo is not None: db_order.title = data.titulo
     if data.status is not None: db_order.status = data.status
@@ -248,24 +641,26 @@ async def update_order(
     if data.description is not None: db_order.description = data.description
     if data.descricao_detalhada is not None: db_order.descricao_detalhada = data.descricao_detalhada
     if data.technical_report is not None: db_order.relatorio_tecnico = data.technical_report
-    if data.valor_total is not None: db_order.valor_total = data.valor_total
-    if data.historico is not None: db_order.historico_json = data.historico
+    if data.historico is not None: _append_legacy_history(db, db_order, data.historico, current_user)
+    if data.fotos is not None: _add_order_photos(db, order_id, data.fotos, current_user)
+    try:
+        if data.assinatura_cliente is not None: db_order.assinatura_cliente = store_signature(data.assinatura_cliente)
+        if data.assinatura_tecnico is not None: db_order.assinatura_tecnico = store_signature(data.assinatura_tecnico)
+    except Exception as e:
+        logger.error(f"Failed to store signature for order {order_id}: {e}")
+        raise HTTPException(status_code=500, detail="Erro ao salvar assinatura")
 
-    # Update items if provided
+    # Update items if provided (only rows that actually changed)
     if data.itens_os is not None:
-        # Remove existing items
-        db.query(ItemOS).filter(ItemOS.solicitacao_id == order_id).delete()
-        # Add new items
-        for item in data.itens_os:
-            db_item = ItemOS(
-                solicitacao_id=order_id,
-                descricao_tarefa=item.descricao,
-                quantidade=item.quantidade,
-                valor_unitario=item.valor_unitario,
-                valor_total=item.quantidade * item.valor_unitario,
-                status_item=item.status
-            )
-            db.add(db_item)
+        _sync_order_items(db, order_id, data.itens_os)
+    # Total always derived from the stored items, never from the client;
+    # a manual valor_total is only accepted for orders without items
+    if data.itens_os is not None or (data.valor_total is not None and _order_has_items(db, order_id)):
+        db_order.valor_total = select(
+            func.coalesce(func.sum(ItemOS.valor_total), 0.0)
+        ).where(ItemOS.solicitacao_id == order_id).scalar_subquery()
+    elif data.valor_total is not None:
+        db_order.valor_total = data.valor_total
 
     # Set completed_at if status changed to concluded
     if data.status in ["concluido", "faturado"] and not db_order.completed_at:
@@ -275,10 +670,11 @@ async def update_order(
     db.refresh(db_order)
 
     # Invalidate Caches
-    delete_cache("orders:list:all")
-    delete_cache("dashboard:prestador")
-    delete_cache("dashboard:admin")
-    delete_cache("maintenance") # Invalidate all maintenance caches
+    await adelete_cache("orders:list", f"orders:detail:{order_id}", "dashboard", "maintenance")
+
+    # Pre-render the PDF so the next download is a blob store hit
+    if status_changed:
+        background_tasks.add_task(prerender_order_pdf, order_id)
 
     # Real-time Broadcast
     try:
@@ -311,20 +707,138 @@ async def update_order(
         "valor_total": db_order.valor_total
     }
 
-@router.get("/solicitacoes/{order_id}")
-def get_order(
-    order_id: int, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_operational_user)
-):
+def _serialize_photo(photo: ServiceOrderPhoto) -> dict:
+    # Detail/lists show the thumbnail; the full image is only fetched when opened
+    return {
+        "id": photo.id,
+        "url": photo.url,
+        "thumbnail_url": photo.thumbnail_url or photo.url,
+        "description": photo.description
+    }
+
+def _add_order_photos(db: Session, order_id: int, fotos: List[dict], current_user: User) -> List[ServiceOrderPhoto]:
+    """
+    Registra fotos enviadas como lista (wizard / clientes antigos).
+    Data URLs base64 vão para o blob store; URLs já registradas são ignoradas.
+    """
+    existing = {
+        url for (url,) in db.query(ServiceOrderPhoto.url).filter(ServiceOrderPhoto.order_id == order_id)
+    }
+    added = []
+    for foto in fotos:
+        url = foto.get("url") or foto.get("image_url")
+        if not url:
+            continue
+        thumbnail_url = None
+        decoded = decode_data_url(url)
+        if decoded:
+            try:
+                url, thumbnail_url = store_photo(*decoded)
+            except Exception as e:
+                logger.error(f"Failed to store photo for order {order_id}: {e}")
+                continue
+        if url in existing:
+            continue
+        existing.add(url)
+        photo = ServiceOrderPhoto(
+            order_id=order_id,
+            user_id=current_user.id,
+            url=url,
+            thumbnail_url=thumbnail_url,
+            description=foto.get("description")
+        )
+        db.add(photo)
+        added.append(photo)
+    return added
+
+def _serialize_event(event: ServiceOrderEvent) -> dict:
+    # Same keys the frontend already uses for history items
+    return {
+        "id": event.id,
+        "data": event.created_at.isoformat() if event.created_at else None,
+        "tipo": event.tipo,
+        "descricao": event.descricao,
+        "usuario": event.usuario
+    }
+
+def _recent_order_events(db: Session, order_id: int, limit: int = HISTORY_DETAIL_LIMIT) -> Optional[List[dict]]:
+    """Últimos eventos em ordem cronológica; None se a OS ainda não tem eventos (usa o JSON legado)"""
+    events = db.query(ServiceOrderEvent).filter(
+        ServiceOrderEvent.order_id == order_id
+    ).order_by(ServiceOrderEvent.id.desc()).limit(limit).all()
+    if not events:
+        return None
+    return [_serialize_event(e) for e in reversed(events)]
+
+def _parse_event_date(value, default: Optional[datetime]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '')).replace(tzinfo=None)
+    except ValueError:
+        return default
+
+def _append_legacy_history(db: Session, order: ServiceOrder, historico: List[dict], current_user: User):
+    """
+    Compatibilidade com clientes que enviam a lista inteira em `historico`:
+    grava apenas os itens que ainda não existem (nada é sobrescrito ou perdido).
+    Itens sem data usam a criação da OS, como na migração, para que reenviar
+    a mesma lista não os duplique.
+    """
+    order_id = order.id
+    existing = {
+        (created_at, descricao)
+        for created_at, descricao in db.query(
+            ServiceOrderEvent.created_at, ServiceOrderEvent.descricao
+        ).filter(ServiceOrderEvent.order_id == order_id)
+    }
+    new_events = []
+    for item in historico:
+        created_at = _parse_event_date(item.get("data"), order.created_at)
+        descricao = item.get("descricao")
+        if (created_at, descricao) in existing:
+            continue
+        existing.add((created_at, descricao))
+        new_events.append({
+            "order_id": order_id,
+            "user_id": current_user.id,
+            "created_at": created_at,
+            "tipo": item.get("tipo"),
+            "descricao": descricao,
+            "usuario": item.get("usuario") or current_user.full_name
+        })
+    if new_events:
+        db.execute(insert(ServiceOrderEvent), new_events)
+
+def _get_company_settings(db: Session) -> Optional[dict]:
+    """Dados da empresa (SystemSettings) usados em detalhe, PDF e PIX, com cache"""
     from models import SystemSettings
-    order = db.query(ServiceOrder).filter(ServiceOrder.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="OS não encontrada")
+    cache_key_str = "cache:settings:company"
+    cached = get_cache(cache_key_str)
+    if cached:
+        return cached
 
     settings = db.query(SystemSettings).filter(SystemSettings.id == 1).first()
+    if not settings:
+        return None
+
+    result = {
+        "business_name": settings.business_name,
+        "cnpj": settings.cnpj,
+        "email_contact": settings.email_contact,
+        "phone_contact": settings.phone_contact,
+        "cep": settings.cep,
+        "logradouro": settings.logradouro,
+        "numero": settings.numero,
+        "complemento": settings.complemento,
+        "bairro": settings.bairro,
+        "cidade": settings.cidade,
+        "estado": settings.estado,
+        "logo_url": settings.logo_url,
+        "pix_key": settings.pix_key
+    }
+    set_cache(cache_key_str, result, ttl_seconds=300)
+    return result
 
-    # Rich response with all fields for DetalhesSolicitacao.tsx
+def _build_order_detail(order: ServiceOrder, settings: Optional[dict], events: Optional[List[dict]] = None) -> dict:
     # Rich response with all fields for DetalhesSolicitacao.tsx and Documents
     return {
         "id": order.id,
@@ -336,7 +850,7 @@ def get_order(
         "description": order.description,
         "descricao_detalhada": order.descricao_detalhada,
         "technical_report": order.relatorio_tecnico,
-        "created_at": order.created_at,
+        "created_at": order.created_at.isoformat() if order.created_at else None,
         "scheduled_at": order.scheduled_at.isoformat() if order.scheduled_at else None,
         "valor_total": order.valor_total,
         "client_signature": order.assinatura_cliente,
@@ -387,54 +901,307 @@ def get_order(
             }
             for i in order.itens_os
         ],
-        "fotos": [
-            {
-                "id": f.get("id"),
-                "url": f.get("url") or f.get("image_url"),
-                "description": f.get("description")
-            }
-            for f in (order.fotos_os if order.fotos_os and isinstance(order.fotos_os, list) else [])
-        ],
-        "historico": order.historico_json if order.historico_json else [],
+        "fotos": [_serialize_photo(p) for p in order.photos],
+        "historico": events if events is not None else (order.historico_json or []),
         "nfse": order.nfse_json,
         "empresa": {
-            "nome_fantasia": settings.business_name if settings else "Inovar Refrigeração",
-            "cnpj": settings.cnpj if settings else None,
-            "email": settings.email_contact if settings else None,
-            "telefone": settings.phone_contact if settings else None,
+            "nome_fantasia": settings["business_name"] if settings else "Inovar Refrigeração",
+            "cnpj": settings["cnpj"] if settings else None,
+            "email": settings["email_contact"] if settings else None,
+            "telefone": settings["phone_contact"] if settings else None,
             "endereco": {
-                "cep": settings.cep,
-                "logradouro": settings.logradouro,
-                "numero": settings.numero,
-                "complemento": settings.complemento,
-                "bairro": settings.bairro,
-                "cidade": settings.cidade,
-                "estado": settings.estado
-            } if settings and (settings.cep or settings.logradouro) else None
+                "cep": settings["cep"],
+                "logradouro": settings["logradouro"],
+                "numero": settings["numero"],
+                "complemento": settings["complemento"],
+                "bairro": settings["bairro"],
+                "cidade": settings["cidade"],
+                "estado": settings["estado"]
+            } if settings and (settings["cep"] or settings["logradouro"]) else None
         }
     }
 
-@router.get("/solicitacoes/{order_id}/pdf")
-def get_order_pdf(
-    order_id: int, 
+def _get_order_detail(db: Session, order_id: int) -> dict:
+    """
+    Documento de detalhe da OS com seu version stamp (hash do conteúdo).
+    Cacheado em cache:orders:detail:{id}; no miss carrega o grafo inteiro de uma vez.
+    """
+    cache_key_str = f"cache:orders:detail:{order_id}"
+    cached = get_cache(cache_key_str)
+    if cached:
+        return cached
+
+    order = db.query(ServiceOrder).options(
+        joinedload(ServiceOrder.user),
+        joinedload(ServiceOrder.client),
+        joinedload(ServiceOrder.location),
+        joinedload(ServiceOrder.equipment),
+        selectinload(ServiceOrder.itens_os),
+        selectinload(ServiceOrder.photos)
+    ).filter(ServiceOrder.id == order_id).first()
+    if not order:
+        raise HTTPException(status_code=404, detail="OS não encontrada")
+
+    data = _build_order_detail(order, _get_company_settings(db), _recent_order_events(db, order_id))
+    version = hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+    result = {"version": version, "data": data}
+    set_cache(cache_key_str, result, ttl_seconds=300)
+    return result
+
+# In-process fallback for export progress when Redis is unavailable
+_export_progress = {}
+
+def _set_export_progress(job_id: str, **progress):
+    _export_progress[job_id] = progress
+    # Polled from any worker: skip the local layer so progress is never stale
+    set_cache(f"cache:export:{job_id}", progress, ttl_seconds=3600, local=False)
+
+def _iter_export_jobs(order_ids: List[int], settings: Optional[dict], settings_dict: dict):
+    """Carrega as OS em lotes (sessão própria) e produz (arquivo, os_data, empresa)"""
+    db = SessionLocal()
+    try:
+        for start in range(0, len(order_ids), EXPORT_LOAD_BATCH):
+            chunk = order_ids[start:start + EXPORT_LOAD_BATCH]
+            orders = db.query(ServiceOrder).options(
+                joinedload(ServiceOrder.user),
+                joinedload(ServiceOrder.client),
+                joinedload(ServiceOrder.location),
+                joinedload(ServiceOrder.equipment),
+                selectinload(ServiceOrder.itens_os),
+                selectinload(ServiceOrder.photos)
+            ).filter(ServiceOrder.id.in_(chunk)).all()
+            by_id = {o.id: o for o in orders}
+            for order_id in chunk:
+                order = by_id.get(order_id)
+                if order:
+                    filename = f"OS_{order.sequential_id or order.id}.pdf"
+                    yield filename, _pdf_order_data(_build_order_detail(order, settings)), settings_dict
+            db.expunge_all()
+    finally:
+        db.close()
+
+@router.get("/solicitacoes/exportar/pdf")
+def export_orders_pdf(
+    status: Optional[List[str]] = Query(None),
+    cliente_id: Optional[int] = None,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    job_id: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_operational_user)
 ):
-    from models import SystemSettings
-    order_data = get_order(order_id, db, current_user) # Pass current_user
-    settings = db.query(SystemSettings).filter(SystemSettings.id == 1).first()
+    """
+    Exporta os PDFs das OS filtradas em um ZIP transmitido conforme ficam prontos.
+    O progresso fica em GET /solicitacoes/exportar/{job_id}/progresso
+    (job_id pode ser informado pelo cliente ou lido do header X-Export-Job).
+    """
+    query = _apply_order_filters(
+        select(ServiceOrder.id), status, cliente_id, None, None, data_inicio, data_fim
+    ).order_by(ServiceOrder.created_at, ServiceOrder.id)
+    order_ids = list(db.execute(query).scalars())
+    if not order_ids:
+        raise HTTPException(status_code=404, detail="Nenhuma OS encontrada para os filtros informados")
+
+    job_id = job_id or uuid.uuid4().hex
+    total = len(order_ids)
+    settings = _get_company_settings(db)
+    settings_dict = _pdf_company_settings(settings)
+    _set_export_progress(job_id, status="running", total=total, done=0)
+
+    def on_progress(done: int, total: int):
+        _set_export_progress(job_id, status="running", total=total, done=done)
+
+    def stream():
+        try:
+            yield from iter_pdf_zip(
+                _iter_export_jobs(order_ids, settings, settings_dict), total, on_progress
+            )
+            _set_export_progress(job_id, status="done", total=total, done=total)
+        except Exception as e:
+            logger.error(f"PDF export {job_id} failed: {e}")
+            _set_export_progress(job_id, status="error", total=total, done=0)
+            raise
+
+    filename = f"OS_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        stream(),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Export-Job": job_id
+        }
+    )
 
-    settings_dict = {
-        "business_name": settings.business_name if settings else "Inovar Refrigeração",
-        "email_contact": settings.email_contact if settings else "",
-        "phone_contact": settings.phone_contact if settings else "",
-        "logradouro": settings.logradouro if settings else "",
-        "numero": settings.numero if settings else "",
-        "cidade": settings.cidade if settings else "",
-        "estado": settings.estado if settings else ""
+@router.get("/solicitacoes/exportar/{job_id}/progresso")
+def get_export_progress(
+    job_id: str,
+    current_user: User = Depends(get_operational_user)
+):
+    progress = get_cache(f"cache:export:{job_id}", local=False) or _export_progress.get(job_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada")
+    return {"job_id": job_id, **progress}
+
+@router.post("/solicitacoes/{order_id}/historico")
+async def append_order_event(
+    order_id: int,
+    event: OrderEventCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_operational_user)
+):
+    """Acrescenta um evento ao histórico da OS (um INSERT, independente do tamanho do histórico)"""
+    exists = db.execute(select(ServiceOrder.id).where(ServiceOrder.id == order_id)).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="OS não encontrada")
+
+    db_event = ServiceOrderEvent(
+        order_id=order_id,
+        user_id=current_user.id,
+        tipo=event.tipo,
+        descricao=event.descricao,
+        usuario=event.usuario or current_user.full_name
+    )
+    db.add(db_event)
+    db.commit()
+    db.refresh(db_event)
+
+    await adelete_cache(f"orders:detail:{order_id}")
+    return _serialize_event(db_event)
+
+@router.get("/solicitacoes/{order_id}/historico")
+def list_order_events(
+    order_id: int,
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_operational_user)
+):
+    """Histórico paginado, do mais recente para o mais antigo (cursor = último id recebido)"""
+    query = db.query(ServiceOrderEvent).filter(ServiceOrderEvent.order_id == order_id)
+    if cursor is not None:
+        query = query.filter(ServiceOrderEvent.id < cursor)
+    events = query.order_by(ServiceOrderEvent.id.desc()).limit(limit + 1).all()
+
+    has_more = len(events) > limit
+    events = events[:limit]
+    return {
+        "items": [_serialize_event(e) for e in events],
+        "next_cursor": events[-1].id if has_more and events else None
     }
 
-    pdf_content = generate_os_pdf(order_data, settings_dict)
+@router.post("/solicitacoes/{order_id}/fotos")
+def upload_order_photo(
+    order_id: int,
+    file: UploadFile = File(...),
+    description: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_operational_user)
+):
+    """Envia uma foto da OS: arquivo + miniatura no storage, só as URLs no banco"""
+    exists = db.execute(select(ServiceOrder.id).where(ServiceOrder.id == order_id)).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="OS não encontrada")
+
+    content_type = file.content_type or "application/octet-stream"
+    if not content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="Apenas imagens são suportadas")
+
+    try:
+        url, thumbnail_url = store_photo(file.file.read(), content_type)
+    except Exception as e:
+        logger.error(f"Failed to store photo for order {order_id}: {e}")
+        raise HTTPException(status_code=500, detail="Erro ao salvar foto")
+
+    photo = ServiceOrderPhoto(
+        order_id=order_id,
+        user_id=current_user.id,
+        url=url,
+        thumbnail_url=thumbnail_url,
+        description=description
+    )
+    db.add(photo)
+    db.commit()
+    db.refresh(photo)
+
+    delete_cache(f"orders:detail:{order_id}")
+    return _serialize_photo(photo)
+
+@router.delete("/solicitacoes/{order_id}/fotos/{photo_id}")
+def delete_order_photo(
+    order_id: int,
+    photo_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_operational_user)
+):
+    photo = db.query(ServiceOrderPhoto).filter(
+        ServiceOrderPhoto.id == photo_id,
+        ServiceOrderPhoto.order_id == order_id
+    ).first()
+    if not photo:
+        raise HTTPException(status_code=404, detail="Foto não encontrada")
+
+    # Blob is content-addressed and may be shared, so only the row is removed
+    db.delete(photo)
+    db.commit()
+
+    delete_cache(f"orders:detail:{order_id}")
+    return {"message": "Foto removida"}
+
+@router.get("/solicitacoes/{order_id}")
+def get_order(
+    order_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_operational_user)
+):
+    detail = _get_order_detail(db, order_id)
+    etag = f'"{detail["version"]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(content=detail["data"], headers=headers)
+
+def _pdf_company_settings(settings: Optional[dict]) -> dict:
+    return {
+        "business_name": settings["business_name"] if settings else "Inovar Refrigeração",
+        "email_contact": settings["email_contact"] if settings else "",
+        "phone_contact": settings["phone_contact"] if settings else "",
+        "logradouro": settings["logradouro"] if settings else "",
+        "numero": settings["numero"] if settings else "",
+        "cidade": settings["cidade"] if settings else "",
+        "estado": settings["estado"] if settings else ""
+    }
+
+def _pdf_order_data(order_data: dict) -> dict:
+    # History and photos are not printed; leaving them out keeps new events/photos from changing the PDF cache key
+    return {k: v for k, v in order_data.items() if k not in ("historico", "fotos")}
+
+def _render_order_pdf(db: Session, order_id: int) -> Tuple[Optional[bytes], dict]:
+    order_data = _pdf_order_data(_get_order_detail(db, order_id)["data"])
+    settings_dict = _pdf_company_settings(_get_company_settings(db))
+    return get_or_generate_os_pdf(order_data, settings_dict), order_data
+
+def prerender_order_pdf(order_id: int):
+    """Background task: deixa o PDF pronto no blob store após mudança de status"""
+    db = SessionLocal()
+    try:
+        _render_order_pdf(db, order_id)
+        logger.info(f"PDF pre-rendered for order {order_id}")
+    except Exception as e:
+        logger.error(f"Failed to pre-render PDF for order {order_id}: {e}")
+    finally:
+        db.close()
+
+@router.get("/solicitacoes/{order_id}/pdf")
+def get_order_pdf(
+    order_id: int, 
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_operational_user)
+):
+    pdf_content, order_data = _render_order_pdf(db, order_id)
     if not pdf_content:
         raise HTTPException(status_code=500, detail="Erro ao gerar PDF")
 
@@ -445,30 +1212,106 @@ def get_order_pdf(
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
+def _pix_settings(db: Session) -> dict:
+    settings = _get_company_settings(db)
+    if not settings or not settings["pix_key"]:
+        raise HTTPException(status_code=400, detail="Chave PIX não configurada na empresa")
+    return settings
+
+def _order_pix_payload(settings: dict, valor_total: float, sequential_id: int) -> str:
+    pix_payload = generate_pix_payload(
+        chave_pix=settings["pix_key"],
+        valor=valor_total,
+        nome_recebedor=settings["business_name"],
+        cidade_recebedor=settings["cidade"] or "SAO PAULO",
+        txt_id=f"OS{sequential_id}"
+    )
+    if not pix_payload:
+        raise HTTPException(status_code=500, detail="Erro ao gerar payload PIX")
+    return pix_payload
+
+def _qrcode_data_url(pix_payload: str, formato: str) -> str:
+    image = generate_pix_qrcode(pix_payload, formato)
+    if image is None:
+        raise HTTPException(status_code=500, detail="Erro ao gerar QR Code PIX")
+    media_type, _ = QRCODE_FORMATS[formato]
+    return f"data:{media_type};base64,{base64.b64encode(image).decode()}"
+
+@router.post("/solicitacoes/pix/batch")
+def get_orders_pix_batch(
+    data: PixBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_operational_user)
+):
+    """Payloads PIX (e QR Codes opcionais) de várias OS em uma chamada"""
+    if len(data.ids) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_BATCH_SIZE} OS por lote")
+    if data.formato is not None and data.formato not in QRCODE_FORMATS:
+        raise HTTPException(status_code=400, detail="Formato de QR Code inválido (png ou svg)")
+
+    settings = _pix_settings(db)
+    rows = db.execute(
+        select(ServiceOrder.id, ServiceOrder.sequential_id, ServiceOrder.valor_total)
+        .where(ServiceOrder.id.in_(data.ids))
+    ).all()
+    by_id = {row.id: row for row in rows}
+
+    itens = []
+    for order_id in dict.fromkeys(data.ids):
+        row = by_id.get(order_id)
+        if not row:
+            continue
+        pix_payload = _order_pix_payload(settings, row.valor_total, row.sequential_id)
+        item = {"id": row.id, "sequential_id": row.sequential_id, "pix_payload": pix_payload}
+        if data.formato:
+            item["qrcode"] = _qrcode_data_url(pix_payload, data.formato)
+        itens.append(item)
+
+    return {
+        "itens": itens,
+        "nao_encontradas": [order_id for order_id in data.ids if order_id not in by_id]
+    }
+
 @router.get("/solicitacoes/{order_id}/pix")
 def get_order_pix(
     order_id: int, 
+    formato: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_operational_user)
 ):
-    from models import SystemSettings
-    order = db.query(ServiceOrder).filter(ServiceOrder.id == order_id).first()
+    """Payload PIX da OS; com ?formato=png|svg inclui o QR Code como data URL"""
+    if formato is not None and formato not in QRCODE_FORMATS:
+        raise HTTPException(status_code=400, detail="Formato de QR Code inválido (png ou svg)")
+
+    order = db.execute(
+        select(ServiceOrder.sequential_id, ServiceOrder.valor_total).where(ServiceOrder.id == order_id)
+    ).first()
     if not order:
         raise HTTPException(status_code=404, detail="OS não encontrada")
 
-    settings = db.query(SystemSettings).filter(SystemSettings.id == 1).first()
-    if not settings or not settings.pix_key:
-        raise HTTPException(status_code=400, detail="Chave PIX não configurada na empresa")
+    settings = _pix_settings(db)
+    pix_payload = _order_pix_payload(settings, order.valor_total, order.sequential_id)
 
-    pix_payload = generate_pix_payload(
-        chave_pix=settings.pix_key,
-        valor=order.valor_total,
-        nome_recebedor=settings.business_name,
-        cidade_recebedor=settings.cidade or "SAO PAULO",
-        txt_id=f"OS{order.sequential_id}"
-    )
+    result = {"pix_payload": pix_payload}
+    if formato:
+        result["qrcode"] = _qrcode_data_url(pix_payload, formato)
+    return result
 
-    if not pix_payload:
-        raise HTTPException(status_code=500, detail="Erro ao gerar payload PIX")
+@router.get("/solicitacoes/{order_id}/pix/qrcode")
+def get_order_pix_qrcode(
+    order_id: int,
+    formato: str = "png",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_operational_user)
+):
+    """Imagem do QR Code PIX da OS (PNG ou SVG)"""
+    if formato not in QRCODE_FORMATS:
+        raise HTTPException(status_code=400, detail="Formato de QR Code inválido (png ou svg)")
+
+    pix_payload = get_order_pix(order_id, None, db, current_user)["pix_payload"]
+    image = generate_pix_qrcode(pix_payload, formato)
+    if image is None:
+        raise HTTPException(status_code=500, detail="Erro ao gerar QR Code PIX")
 
-    return {"pix_payload": pix_payload}
+    media_type, _ = QRCODE_FORMATS[formato]
+    return Response(content=image, media_type=media_type)
@@ -19,9 +19,13 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY", "")
 BUCKETS = {
     "avatars": "avatars",
     "signatures": "signatures", 
-    "os-photos": "os-photos"
+    "os-photos": "os-photos",
+    "os-pdfs": "os-pdfs"
 }
 
+# Buckets with client data, only readable with the service key
+PRIVATE_BUCKETS = {"os-pdfs"}
+
 
 def get_headers() -> dict:
     """Get headers for Supabase Storage API requests."""
@@ -164,6 +168,6 @@ async def create_bucket_if_not_exists(bucket_name: str, public: bool = True) ->
 async def init_storage_buckets():
     """Initialize all required storage buckets."""
     for bucket_name in BUCKETS.values():
-        success = await create_bucket_if_not_exists(bucket_name, public=True)
+        success = await create_bucket_if_not_exists(bucket_name, public=bucket_name not in PRIVATE_BUCKETS)
         status = "OK" if success else "FAILED"
         logger.info(f"[{status}] Bucket '{bucket_name}' initialization")
@@ -0,0 +1,109 @@
+"""
+Busca no SQLite (FTS5 trigram): o mesmo endpoint que no PostgreSQL roda com pg_trgm.
+
+Uso:
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Add parent directory to path to import busca and the models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from models import Base, Client, Equipment, ServiceOrder
+from busca import create_sqlite_search_index, search
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        create_sqlite_search_index(connection)
+    with Session(engine) as session:
+        client = Client(name="Padaria São João", document="12.345.678/0001-99")
+        session.add(client)
+        session.flush()
+        session.add_all([
+            ServiceOrder(title="Manutenção preventiva", description="Limpeza do split da padaria",
+                         relatorio_tecnico="Compressor com ruído", client_id=client.id),
+            ServiceOrder(title="Instalação", description="Ar-condicionado 12000 BTUs", client_id=client.id),
+            Equipment(name="Split Inverter", serial_number="SN-998877"),
+        ])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def run(db, q, tipo=None, limit=20, offset=0):
+    return search(q=q, tipo=tipo, limit=limit, offset=offset, db=db, current_user=None)
+
+
+def titles(result):
+    return [(item["tipo"], item["titulo"]) for item in result["items"]]
+
+
+def test_partial_match_inside_words(db):
+    assert titles(run(db, "9988")) == [("equipamento", "Split Inverter")]
+    assert titles(run(db, "ressor")) == [("os", "Manutenção preventiva")]
+
+
+def test_matches_all_targets_ranked(db):
+    result = run(db, "padaria")
+    assert ("cliente", "Padaria São João") in titles(result)
+    assert ("os", "Manutenção preventiva") in titles(result)
+    scores = [item["score"] for item in result["items"]]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_accented_terms_match_regardless_of_case(db):
+    assert titles(run(db, "são joão")) == [("cliente", "Padaria São João")]
+    assert titles(run(db, "MANUTENÇÃO")) == [("os", "Manutenção preventiva")]
+    assert titles(run(db, "instalação")) == [("os", "Instalação")]
+
+
+def test_accents_are_not_folded(db):
+    # Same as pg_trgm without unaccent: the accent is part of the term
+    assert run(db, "manutencao")["items"] == []
+
+
+def test_tipo_filter_and_pagination(db):
+    assert titles(run(db, "split", tipo=["equipamento"])) == [("equipamento", "Split Inverter")]
+    first = run(db, "split", limit=1)
+    assert len(first["items"]) == 1 and first["next_offset"] == 1
+    second = run(db, "split", limit=1, offset=1)
+    assert second["next_offset"] is None
+    assert titles(first) != titles(second)
+
+
+def test_index_follows_updates_and_deletes(db):
+    equipment = db.query(Equipment).one()
+    equipment.serial_number = "SN-112233"
+    db.commit()
+    assert run(db, "9988")["items"] == []
+    assert titles(run(db, "1122")) == [("equipamento", "Split Inverter")]
+    db.delete(equipment)
+    db.commit()
+    assert run(db, "1122")["items"] == []
+
+
+def test_rejects_short_or_unknown_queries(db):
+    with pytest.raises(HTTPException) as exc:
+        run(db, " ab ")
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        run(db, "split", tipo=["foo"])
+    assert exc.value.status_code == 400
+
+
+def test_index_creation_is_idempotent(db):
+    create_sqlite_search_index(db.connection())
+    assert len(run(db, "9988")["items"]) == 1
@@ -0,0 +1,99 @@
+"""
+Invalidação por geração: delete_cache troca a geração do namespace (uma
+escrita) e as entradas carimbadas com a anterior deixam de ser lidas.
+
+Uso:
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Add parent directory to path to import redis_utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Lua scripts in fakeredis
+
+import redis_utils
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(redis_utils, "redis_client", client)
+    monkeypatch.setattr(redis_utils, "redis_breaker", redis_utils.CircuitBreaker())
+    monkeypatch.setattr(redis_utils, "_subscriber", object())  # No listener thread
+    monkeypatch.setattr(redis_utils, "_scripts", {})
+    redis_utils.local_cache.clear()
+    redis_utils._take_pending_invalidations()
+    yield client
+    redis_utils.local_cache.clear()
+
+
+def get(key, **kwargs):
+    return redis_utils.get_cache(key, local=False, **kwargs)
+
+
+def test_namespace_invalidation_is_one_write(redis):
+    for i in range(50):
+        redis_utils.set_cache(f"cache:orders:detail:{i}", {"i": i})
+    redis_utils.set_cache("cache:clients:1", {"nome": "Padaria"})
+    keys = set(redis.keys("cache:*"))
+
+    assert redis_utils.delete_cache("orders") == 1
+    assert all(get(f"cache:orders:detail:{i}") is None for i in range(50))
+    assert get("cache:clients:1") == {"nome": "Padaria"}
+    # Nothing scanned or deleted: old entries just expire with their TTL
+    assert set(redis.keys("cache:*")) == keys
+
+
+def test_child_namespace_leaves_siblings(redis):
+    redis_utils.set_cache("cache:orders:detail:5", {"i": 5})
+    redis_utils.set_cache("cache:orders:detail:6", {"i": 6})
+    redis_utils.set_cache("cache:orders:list:abc", [5, 6])
+
+    redis_utils.delete_cache("cache:orders:detail:5")
+    assert get("cache:orders:detail:5") is None
+    assert get("cache:orders:detail:6") == {"i": 6}
+    assert get("cache:orders:list:abc") == [5, 6]
+
+    redis_utils.delete_cache("orders:detail")
+    assert get("cache:orders:detail:6") is None
+    assert get("cache:orders:list:abc") == [5, 6]
+
+
+def test_tags_invalidate_keys_in_other_namespaces(redis):
+    redis_utils.set_cache("cache:dashboard:admin", {"total": 3}, tags=["orders"])
+    assert get("cache:dashboard:admin", tags=["orders"]) == {"total": 3}
+    redis_utils.delete_cache("orders")
+    assert get("cache:dashboard:admin", tags=["orders"]) is None
+
+
+def test_set_after_invalidation_uses_new_generation(redis):
+    redis_utils.set_cache("cache:orders:detail:7", {"v": 1})
+    redis_utils.delete_cache("orders")
+    redis_utils.set_cache("cache:orders:detail:7", {"v": 2})
+    assert get("cache:orders:detail:7") == {"v": 2}
+    # Generations are never reused, even after a gen key expires
+    redis.delete("gen:orders")
+    assert get("cache:orders:detail:7") is None
+
+
+def test_local_layer_is_invalidated_too(redis):
+    redis_utils.set_cache("cache:orders:detail:8", {"v": 1})
+    assert redis_utils.get_cache("cache:orders:detail:8") == {"v": 1}
+    redis_utils.delete_cache("orders")
+    assert redis_utils.get_cache("cache:orders:detail:8") is None
+
+
+def test_invalidations_missed_while_open_are_replayed(redis):
+    redis_utils.set_cache("cache:orders:detail:9", {"v": 1}, local=False)
+    for _ in range(redis_utils.BREAKER_FAILURE_THRESHOLD):
+        redis_utils.redis_breaker.record_failure()
+    assert redis_utils.delete_cache("orders") == 0
+
+    redis_utils.redis_breaker.record_success()
+    assert redis_utils._flush_pending_invalidations()
+    assert get("cache:orders:detail:9") is None
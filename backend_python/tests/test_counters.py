@@ -0,0 +1,76 @@
+"""
+Contadores do dashboard: get_counters só lê (linhas ausentes valem 0);
+reconcile_counters semeia a tabela e os eventos a mantêm.
+
+Uso:
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Add parent directory to path to import counter_utils and the models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from models import Base, Client, ServiceOrder, StatCounter
+from counter_utils import get_counters, reconcile_counters
+
+NAMES = ["orders:total", "clients:total", "orders:status:aberto", "orders:status:concluido"]
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    with Session(engine) as session:
+        client = Client(name="Padaria São João")
+        session.add(client)
+        session.flush()
+        session.add_all([
+            ServiceOrder(title="Limpeza", status="aberto", client_id=client.id),
+            ServiceOrder(title="Reparo", status="aberto", client_id=client.id),
+        ])
+        session.commit()
+        yield session
+
+
+def test_get_counters_never_writes(engine, db):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert get_counters(db, NAMES) == dict.fromkeys(NAMES, 0)
+    assert len(statements) == 1 and statements[0].lstrip().upper().startswith("SELECT")
+    assert db.query(StatCounter).count() == 0
+
+
+def test_reconcile_seeds_and_events_keep_counts(db):
+    assert reconcile_counters(db) == {}
+    assert get_counters(db, NAMES) == {
+        "orders:total": 2, "clients:total": 1,
+        "orders:status:aberto": 2, "orders:status:concluido": 0,
+    }
+    # Known statuses have a zero row, so the first order in them is counted
+    order = db.query(ServiceOrder).first()
+    order.status = "concluido"
+    db.commit()
+    assert get_counters(db, NAMES)["orders:status:concluido"] == 1
+    assert get_counters(db, NAMES)["orders:status:aberto"] == 1
+
+
+def test_reconcile_repairs_drift(db):
+    reconcile_counters(db)
+    db.get(StatCounter, "orders:total").value = 7
+    db.commit()
+    assert reconcile_counters(db) == {"orders:total": {"stored": 7, "actual": 2}}
+    assert get_counters(db, ["orders:total"]) == {"orders:total": 2}
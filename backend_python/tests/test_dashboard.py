@@ -0,0 +1,84 @@
+"""
+Dashboards num cache miss: contadores + OS recentes com cliente, no máximo
+2 consultas ao banco, sem N+1.
+
+Uso:
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Add parent directory to path to import dashboard and the models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import dashboard
+from models import Base, Client, ServiceOrder, User
+from counter_utils import reconcile_counters
+
+MAX_QUERIES = 2
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        user = User(email="tecnico@inovar", full_name="Técnico", role="prestador")
+        clients = [Client(name=f"Cliente {i}", document=f"{i:011d}") for i in range(10)]
+        session.add_all([user, *clients])
+        session.flush()
+        session.add_all([
+            ServiceOrder(title=f"OS {i}", status=["pendente", "agendado", "concluido"][i % 3],
+                         client_id=clients[i % 10].id, user_id=user.id, sequential_id=101 + i)
+            for i in range(30)
+        ])
+        session.commit()
+        reconcile_counters(session)  # Counters already seeded, as in production
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def statements(engine, monkeypatch):
+    """SQL emitido durante o teste, sempre em cache miss"""
+    monkeypatch.setattr(dashboard, "get_or_compute", lambda key, compute, **kwargs: compute())
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_prestador_dashboard_cache_miss_queries(engine, statements):
+    with Session(engine) as db:
+        user = db.query(User).one()
+        statements.clear()
+        result = dashboard.get_prestador_dashboard(current_user=user, db=db)
+
+    assert len(statements) <= MAX_QUERIES, statements
+    assert result["stats"] == {
+        "total_clients": 10, "total_orders": 30, "open_orders": 20, "completed_orders": 10
+    }
+    assert len(result["recent_orders"]) == 5
+    assert all(o["client_name"].startswith("Cliente ") for o in result["recent_orders"])
+
+
+def test_admin_dashboard_cache_miss_queries(engine, statements):
+    with Session(engine) as db:
+        user = db.query(User).one()
+        statements.clear()
+        result = dashboard.get_admin_dashboard(db=db, current_user=user)
+
+    assert len(statements) <= MAX_QUERIES, statements
+    assert result["stats"]["total_orders"] == 30
+    assert result["stats"]["total_users"] == 1
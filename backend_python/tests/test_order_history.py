@@ -0,0 +1,85 @@
+"""
+PUT /solicitacoes/{id} com `historico` legado: a lista inteira reenviada
+grava só os eventos novos; itens sem data usam a criação da OS.
+
+Uso:
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Add parent directory to path to import solicitacoes and the models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import BackgroundTasks
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from models import Base, ServiceOrder, ServiceOrderEvent, User
+from solicitacoes import ServiceOrderUpdate, update_order
+
+CREATED_AT = datetime(2026, 3, 2, 8, 30)
+
+HISTORICO = [
+    {"data": "2026-03-02T09:00:00Z", "tipo": "status", "descricao": "Em andamento", "usuario": "Técnico"},
+    {"tipo": "nota", "descricao": "Cliente ausente"},
+    {"data": "não informada", "tipo": "nota", "descricao": "Peça encomendada"},
+]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        user = User(email="tecnico@inovar", full_name="Técnico", role="admin")
+        session.add(user)
+        session.flush()
+        session.add(ServiceOrder(title="Manutenção", user_id=user.id, sequential_id=101, created_at=CREATED_AT))
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def put(db, historico):
+    order = db.query(ServiceOrder).one()
+    user = db.query(User).one()
+    asyncio.run(update_order(order.id, ServiceOrderUpdate(historico=historico), BackgroundTasks(), db, user))
+
+
+def events(db):
+    return [
+        (e.created_at, e.descricao)
+        for e in db.query(ServiceOrderEvent).order_by(ServiceOrderEvent.id)
+    ]
+
+
+def test_undated_items_use_order_creation(db):
+    put(db, HISTORICO)
+    assert events(db) == [
+        (datetime(2026, 3, 2, 9, 0), "Em andamento"),
+        (CREATED_AT, "Cliente ausente"),
+        (CREATED_AT, "Peça encomendada"),
+    ]
+
+
+def test_repeated_legacy_put_is_idempotent(db):
+    put(db, HISTORICO)
+    first = events(db)
+    put(db, HISTORICO)
+    put(db, list(HISTORICO))
+    assert events(db) == first
+
+
+def test_resent_list_appends_only_new_items(db):
+    put(db, HISTORICO)
+    put(db, HISTORICO + [{"data": "2026-03-03T10:00:00", "tipo": "status", "descricao": "Concluída"}])
+    assert len(events(db)) == 4
+    assert events(db)[-1] == (datetime(2026, 3, 3, 10, 0), "Concluída")
@@ -0,0 +1,124 @@
+"""
+PUT /solicitacoes/{id}: itens aplicados como diff e valor_total sempre
+recalculado a partir dos itens gravados.
+
+Uso:
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Add parent directory to path to import solicitacoes and the models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+
+import pytest
+from fastapi import BackgroundTasks
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from models import Base, Client, ItemOS, ServiceOrder, User
+from solicitacoes import ServiceOrderUpdate, update_order
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    with Session(engine) as session:
+        client = Client(name="Padaria São João")
+        user = User(email="tecnico@inovar", full_name="Técnico", role="admin")
+        session.add_all([client, user])
+        session.flush()
+        order = ServiceOrder(title="Manutenção", client_id=client.id, user_id=user.id, sequential_id=101)
+        session.add(order)
+        session.flush()
+        session.add_all([
+            ItemOS(solicitacao_id=order.id, descricao_tarefa="Limpeza", quantidade=1,
+                   valor_unitario=100.0, valor_total=100.0, status_item="pendente"),
+            ItemOS(solicitacao_id=order.id, descricao_tarefa="Gás", quantidade=2,
+                   valor_unitario=50.0, valor_total=100.0, status_item="pendente"),
+            ItemOS(solicitacao_id=order.id, descricao_tarefa="Filtro", quantidade=1,
+                   valor_unitario=30.0, valor_total=30.0, status_item="pendente"),
+        ])
+        order.valor_total = 230.0
+        session.commit()
+        yield session
+
+
+@pytest.fixture
+def item_writes(engine):
+    """(comando, linhas) de cada escrita em service_order_items"""
+    writes = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        words = statement.split()
+        command = words[0].upper()
+        # Target table only (the order UPDATE mentions items in its SUM subquery)
+        target = words[1] if command == "UPDATE" else words[2] if len(words) > 2 else ""
+        if command in ("INSERT", "UPDATE", "DELETE") and target == "service_order_items":
+            writes.append((command, len(parameters) if executemany else 1))
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield writes
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def put(db, **fields):
+    order = db.query(ServiceOrder).one()
+    user = db.query(User).one()
+    return asyncio.run(update_order(order.id, ServiceOrderUpdate(**fields), BackgroundTasks(), db, user))
+
+
+def items(db):
+    return {
+        i.descricao_tarefa: (i.id, i.quantidade, i.valor_total)
+        for i in db.query(ItemOS).order_by(ItemOS.id)
+    }
+
+
+def test_only_changed_rows_are_written(db, item_writes):
+    before = items(db)
+    result = put(db, itens_os=[
+        {"id": before["Limpeza"][0], "descricao": "Limpeza", "quantidade": 1, "valor_unitario": 100.0},
+        {"id": before["Gás"][0], "descricao": "Gás", "quantidade": 3, "valor_unitario": 50.0},
+        {"descricao": "Dreno", "quantidade": 1, "valor_unitario": 40.0},
+    ])
+    after = items(db)
+
+    assert sorted(item_writes) == [("DELETE", 1), ("INSERT", 1), ("UPDATE", 1)]
+    assert after["Limpeza"] == before["Limpeza"]
+    assert after["Gás"] == (before["Gás"][0], 3, 150.0)
+    assert "Filtro" not in after
+    assert after["Dreno"][2] == 40.0
+    assert result["valor_total"] == 290.0 == sum(total for _, _, total in after.values())
+
+
+def test_unchanged_items_write_nothing(db, item_writes):
+    current = [
+        {"id": i.id, "descricao": i.descricao_tarefa, "quantidade": i.quantidade, "valor_unitario": i.valor_unitario}
+        for i in db.query(ItemOS)
+    ]
+    assert put(db, itens_os=current)["valor_total"] == 230.0
+    assert item_writes == []
+
+
+def test_client_total_is_ignored_when_order_has_items(db):
+    assert put(db, valor_total=1.0)["valor_total"] == 230.0
+    assert put(db, valor_total=1.0, itens_os=[])["valor_total"] == 0.0
+
+
+def test_manual_total_for_orders_without_items(db):
+    db.query(ItemOS).delete()
+    db.commit()
+    assert put(db, valor_total=500.0)["valor_total"] == 500.0
@@ -0,0 +1,67 @@
+"""
+Rate limit: GCRA no Redis e token bucket local com a mesma semântica —
+rajada de até max_requests, depois nega com retry_after, depois recupera.
+
+Uso:
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Add parent directory to path to import redis_utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+import pytest
+
+import redis_utils
+
+MAX_REQUESTS = 5
+WINDOW_SECONDS = 1  # One request every 200 ms after the burst
+
+
+@pytest.fixture(params=["redis", "local"])
+def limiter(request, monkeypatch):
+    if request.param == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")  # Lua scripts in fakeredis
+        monkeypatch.setattr(redis_utils, "redis_client", fakeredis.FakeRedis())
+        monkeypatch.setattr(redis_utils, "_scripts", {})
+    else:
+        monkeypatch.setattr(redis_utils, "redis_client", None)
+        monkeypatch.setattr(redis_utils, "local_rate_limiter", redis_utils.TokenBucketLimiter())
+    monkeypatch.setattr(redis_utils, "redis_breaker", redis_utils.CircuitBreaker())
+
+    def hit(identifier="ip:10.0.0.1", cost=1):
+        return redis_utils.check_rate_limit(identifier, MAX_REQUESTS, WINDOW_SECONDS, cost)
+    return hit
+
+
+def test_burst_then_deny_then_recover(limiter):
+    results = [limiter() for _ in range(MAX_REQUESTS)]
+    assert [allowed for allowed, _, _ in results] == [True] * MAX_REQUESTS
+    assert [remaining for _, remaining, _ in results] == [4, 3, 2, 1, 0]
+
+    allowed, remaining, retry_after = limiter()
+    assert (allowed, remaining) == (False, 0)
+    assert 0 < retry_after <= WINDOW_SECONDS / MAX_REQUESTS
+
+    time.sleep(retry_after + 0.05)
+    assert limiter()[0] is True
+    assert limiter()[0] is False
+
+
+def test_keys_are_independent(limiter):
+    for _ in range(MAX_REQUESTS):
+        limiter("ip:10.0.0.1")
+    assert limiter("ip:10.0.0.1")[0] is False
+    assert limiter("ip:10.0.0.2")[0] is True
+
+
+def test_cost_larger_than_remaining_is_denied(limiter):
+    assert limiter(cost=3)[:2] == (True, 2)
+    allowed, _, retry_after = limiter(cost=3)
+    assert allowed is False
+    assert retry_after > 0
+    assert limiter(cost=2)[:2] == (True, 0)
@@ -0,0 +1,77 @@
+"""
+Pool assíncrono esgotado (todas as conexões ocupadas) não abre o circuit
+breaker: só falhas de conexão com o Redis contam.
+
+Uso:
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Add parent directory to path to import redis_utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Lua scripts in fakeredis
+
+import redis
+import redis.asyncio as aioredis
+from fakeredis import aioredis as fake_aioredis
+
+import redis_utils
+
+# Renamed in newer fakeredis releases
+FakeConnection = getattr(fake_aioredis, "FakeAsyncRedisConnection", None) or fake_aioredis.FakeConnection
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Pool de uma conexão com espera curta, contra um servidor fakeredis"""
+    server = fakeredis.FakeServer()
+    pools = []
+
+    def make_client():
+        pools.append(redis_utils._BlockingConnectionPool(
+            connection_class=FakeConnection, server=server, max_connections=1, timeout=0.05
+        ))
+        return aioredis.Redis(connection_pool=pools[-1])
+
+    monkeypatch.setattr(redis_utils, "redis_client", fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(redis_utils, "redis_breaker", redis_utils.CircuitBreaker())
+    monkeypatch.setattr(redis_utils, "_subscriber", object())  # No listener thread
+    monkeypatch.setattr(redis_utils, "_make_async_client", make_client)
+    monkeypatch.setattr(redis_utils, "_async_client", None)
+    monkeypatch.setattr(redis_utils, "_async_scripts", {})
+    redis_utils.local_cache.clear()
+    yield pools
+    redis_utils.local_cache.clear()
+
+
+def test_exhausted_pool_keeps_breaker_closed(pool):
+    async def scenario():
+        assert await redis_utils.aset_cache("cache:orders:detail:1", {"v": 1}, local=False)
+        busy = await pool[-1].get_connection("GET")  # Hold the only connection
+
+        for _ in range(redis_utils.BREAKER_FAILURE_THRESHOLD + 2):
+            assert await redis_utils.aget_cache("cache:orders:detail:1", local=False) is None
+            allowed, _, _ = await redis_utils.acheck_rate_limit("ip:10.0.0.1", 5, 1)
+            assert allowed  # Local fallback
+
+        with pytest.raises(redis_utils.RedisPoolExhausted):
+            await pool[-1].get_connection("GET")
+        await pool[-1].release(busy)
+        return await redis_utils.aget_cache("cache:orders:detail:1", local=False)
+
+    assert asyncio.run(scenario()) == {"v": 1}
+    assert redis_utils.redis_breaker.state == "closed"
+    assert redis_utils.redis_breaker.failures == 0
+
+
+def test_connection_failures_still_open_the_breaker(pool):
+    for _ in range(redis_utils.BREAKER_FAILURE_THRESHOLD):
+        redis_utils._redis_error(redis.exceptions.ConnectionError("Error 111 connecting to redis:6379"))
+    assert redis_utils.redis_breaker.state == "open"
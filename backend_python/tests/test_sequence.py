@@ -0,0 +1,96 @@
+"""
+Alocador de sequential_id: IDs únicos, semeados a partir do maior existente,
+e lacunas apenas quando um bloco reservado não é usado até o fim.
+
+Uso:
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Add parent directory to path to import sequence_utils and the models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from models import Base, Client, IdCounter, ServiceOrder
+from sequence_utils import SequenceAllocator
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # File database: block reservations commit on their own connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'seq.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def block_engine(engine, monkeypatch):
+    """Same database, taking the PostgreSQL path (blocks reserved per worker)"""
+    monkeypatch.setattr(engine.dialect, "name", "postgresql")
+    return engine
+
+
+def counter(engine, name):
+    with Session(engine) as db:
+        return db.get(IdCounter, name).value
+
+
+def test_seeds_from_floor_and_increments(engine):
+    allocator = SequenceAllocator()
+    with Session(engine) as db:
+        assert allocator.next_id(db, "service_orders") == 101
+        assert allocator.next_ids(db, "service_orders", 3) == [102, 103, 104]
+        assert allocator.next_ids(db, "service_orders", 0) == []
+        db.commit()
+    assert counter(engine, "service_orders") == 104
+
+
+def test_seeds_from_existing_max(engine):
+    with Session(engine) as db:
+        client = Client(name="Cliente", sequential_id=41)
+        db.add(client)
+        db.flush()
+        db.add(ServiceOrder(title="OS antiga", sequential_id=250, client_id=client.id))
+        db.commit()
+        allocator = SequenceAllocator()
+        assert allocator.next_id(db, "clients") == 42
+        assert allocator.next_id(db, "service_orders") == 251
+
+
+def test_sqlite_rollback_releases_ids(engine):
+    allocator = SequenceAllocator()
+    with Session(engine) as db:
+        allocator.next_ids(db, "clients", 5)
+        db.commit()
+        allocator.next_ids(db, "clients", 3)
+        db.rollback()
+        assert allocator.next_id(db, "clients") == 6
+
+
+def test_workers_get_disjoint_blocks(block_engine):
+    workers = [SequenceAllocator(block_size=5), SequenceAllocator(block_size=5)]
+    ids = []
+    with Session(block_engine) as db:
+        for _ in range(7):
+            for worker in workers:
+                ids.append(worker.next_id(db, "service_orders"))
+    assert len(ids) == len(set(ids)) == 14
+    # Each worker numbers consecutively inside its own block
+    assert ids[0::2][:5] == [101, 102, 103, 104, 105]
+    assert ids[1::2][:5] == [106, 107, 108, 109, 110]
+    # 4 blocks of 5 reserved in total
+    assert counter(block_engine, "service_orders") == 120
+
+
+def test_large_request_and_restart_gap(block_engine):
+    worker = SequenceAllocator(block_size=5)
+    with Session(block_engine) as db:
+        assert worker.next_ids(db, "clients", 12) == list(range(1, 13))
+        assert worker.next_id(db, "clients") == 13
+        # A restarted worker never reuses the rest of the old block
+        assert SequenceAllocator(block_size=5).next_id(db, "clients") == 18
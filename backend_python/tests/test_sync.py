@@ -0,0 +1,111 @@
+"""
+GET /meus-servicos/sync: snapshot completo sem `since`, depois só as OS
+alteradas e os ids removidos da lista do técnico (exclusão ou reatribuição).
+
+Uso:
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Add parent directory to path to import solicitacoes and the models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from models import Base, ServiceOrder, ServiceOrderTombstone, User
+from solicitacoes import sync_my_orders
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        tecnico = User(email="tecnico@inovar", full_name="Técnico", role="tecnico")
+        outro = User(email="outro@inovar", full_name="Outro", role="tecnico")
+        session.add_all([tecnico, outro])
+        session.flush()
+        # Written well before the first sync, outside the token overlap window
+        an_hour_ago = datetime.utcnow() - timedelta(hours=1)
+        session.add_all([
+            ServiceOrder(title=title, user_id=tecnico.id, sequential_id=101 + n,
+                         created_at=an_hour_ago, updated_at=an_hour_ago)
+            for n, title in enumerate(["Limpeza", "Instalação", "Reparo", "Vistoria"])
+        ])
+        session.add(ServiceOrder(title="Alheia", user_id=outro.id, sequential_id=105,
+                                 created_at=an_hour_ago, updated_at=an_hour_ago))
+        session.add(ServiceOrderTombstone(order_id=99, user_id=tecnico.id, deleted_at=an_hour_ago))
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def sync(db, email, since=None):
+    user = db.query(User).filter(User.email == email).one()
+    return json.loads(sync_my_orders(since=since, current_user=user, db=db).body)
+
+
+def order(db, title):
+    return db.query(ServiceOrder).filter(ServiceOrder.title == title).one()
+
+
+def test_full_snapshot_without_since(db):
+    result = sync(db, "tecnico@inovar")
+    assert result["full"] is True
+    assert [o["titulo"] for o in result["orders"]] == ["Limpeza", "Instalação", "Reparo", "Vistoria"]
+    assert result["deleted"] == []
+    assert result["sync_token"]
+
+
+def test_delta_has_only_changes_after_since(db):
+    token = sync(db, "tecnico@inovar")["sync_token"]
+    order(db, "Reparo").status = "concluido"
+    db.commit()
+
+    result = sync(db, "tecnico@inovar", since=token)
+    assert result["full"] is False
+    assert [o["titulo"] for o in result["orders"]] == ["Reparo"]
+    # Tombstones older than `since` are not reported again
+    assert result["deleted"] == []
+
+
+def test_deleted_and_reassigned_orders_are_tombstoned(db):
+    token = sync(db, "tecnico@inovar")["sync_token"]
+    deleted = order(db, "Limpeza")
+    deleted_id = deleted.id
+    db.delete(deleted)
+    reassigned = order(db, "Instalação")
+    reassigned.user_id = db.query(User).filter(User.email == "outro@inovar").one().id
+    db.commit()
+
+    result = sync(db, "tecnico@inovar", since=token)
+    assert result["orders"] == []
+    assert sorted(result["deleted"]) == sorted([deleted_id, reassigned.id])
+
+    # The new owner gets the reassigned order as a change, not a tombstone
+    result = sync(db, "outro@inovar", since=token)
+    assert [o["id"] for o in result["orders"]] == [reassigned.id]
+    assert result["deleted"] == []
+
+
+def test_order_reassigned_back_is_a_change_not_a_deletion(db):
+    token = sync(db, "tecnico@inovar")["sync_token"]
+    vistoria = order(db, "Vistoria")
+    tecnico_id = vistoria.user_id
+    vistoria.user_id = db.query(User).filter(User.email == "outro@inovar").one().id
+    db.commit()
+    vistoria.user_id = tecnico_id
+    db.commit()
+
+    result = sync(db, "tecnico@inovar", since=token)
+    assert [o["id"] for o in result["orders"]] == [vistoria.id]
+    assert result["deleted"] == []
@@ -5,7 +5,8 @@ from database import get_db
 from models import User
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
-from redis_utils import get_cache, set_cache, delete_cache
+from redis_utils import cached, delete_cache
+from signature_utils import store_signature
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,8 +29,7 @@ class UserResponse(BaseModel):
     telefone: Optional[str] = Field(None, validation_alias="phone")
     cpf: Optional[str] = None
     avatar_url: Optional[str] = None
-    signature_base64: Optional[str] = None
-    signature_base64: Optional[str] = None
+    signature_base64: Optional[str] = None # Reference URL (kept under the old key for the frontend)
     endereco: Optional[dict] = None # Constructed manually in route
 
 class UserCreateRequest(BaseModel):
@@ -97,7 +97,7 @@ def update_current_user(
 
         logger.info(f"Usuário {current_user.id} atualizado com sucesso")
         
-        delete_cache("usuarios")
+        delete_cache("usuarios", "orders:detail")
 
         return {
             "id": current_user.id,
@@ -131,17 +131,13 @@ def change_password(
 
 # Routes
 @router.get("/usuarios")
+@cached(ttl=300, tags=["usuarios"])
 def list_users(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    cache_key = "cache:usuarios:all"
-    cached = get_cache(cache_key)
-    if cached:
-        return cached
-
     users = db.query(User).all()
-    result = [
+    return [
         {
             "id": u.id,
             "email": u.email,
@@ -165,9 +161,6 @@ def list_users(
         }
         for u in users
     ]
-    
-    set_cache(cache_key, result, ttl_seconds=300)
-    return result
 
 @router.get("/usuarios/{user_id}")
 def get_user(
@@ -221,8 +214,7 @@ def create_user(
     db.commit()
     db.refresh(db_user)
     
-    delete_cache("usuarios")
-    delete_cache("dashboard:admin")
+    delete_cache("usuarios", "dashboard:admin", "orders:detail")
     
     return db_user
 
@@ -244,7 +236,12 @@ def update_user(
     if user_data.telefone is not None: db_user.phone = user_data.telefone
     if user_data.cpf is not None: db_user.cpf = user_data.cpf
     if user_data.avatar_url is not None: db_user.avatar_url = user_data.avatar_url
-    if user_data.signature_url is not None: db_user.signature_url = user_data.signature_url
+    if user_data.signature_url is not None:
+        try:
+            db_user.signature_url = store_signature(user_data.signature_url)
+        except Exception as e:
+            logger.error(f"Failed to store signature for user {user_id}: {e}")
+            raise HTTPException(status_code=500, detail="Erro ao salvar assinatura")
 
     if user_data.endereco is not None:
         addr = user_data.endereco
@@ -259,8 +256,7 @@ def update_user(
     db.commit()
     db.refresh(db_user)
     
-    delete_cache("usuarios")
-    delete_cache("dashboard:admin")
+    delete_cache("usuarios", "dashboard:admin", "orders:detail") # Technician data is embedded in order details
 
     # Construct response manually to include address
     response_data = {
@@ -299,8 +295,7 @@ def delete_user(
     db.delete(user)
     db.commit()
     
-    delete_cache("usuarios")
-    delete_cache("dashboard:admin")
+    delete_cache("usuarios", "dashboard:admin", "orders:detail")
     
     return {"message": "Usuário removido"}
 